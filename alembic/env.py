@@ -20,7 +20,7 @@ if config.config_file_name is not None:
 # from myapp import mymodel
 # target_metadata = mymodel.Base.metadata
 
-from app.db import Base
+from app.models.base import Base
 from app.models import *
 target_metadata = Base.metadata
 
@@ -0,0 +1,29 @@
+"""add version to tournaments
+
+Revision ID: 0e0bf7b81234
+Revises: c31c3b9c9e1b
+Create Date: 2026-10-17 12:02:37.418530
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0e0bf7b81234'
+down_revision: Union[str, None] = 'c31c3b9c9e1b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('tournaments',
+                  sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('tournaments', 'version')
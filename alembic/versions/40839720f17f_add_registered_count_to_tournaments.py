@@ -0,0 +1,41 @@
+"""add registered_count to tournaments
+
+Revision ID: 40839720f17f
+Revises: 8cf8bf2d0b69
+Create Date: 2026-10-17 10:12:41.503218
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '40839720f17f'
+down_revision: Union[str, None] = '8cf8bf2d0b69'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('tournaments',
+                  sa.Column('registered_count', sa.Integer(), server_default='0', nullable=False))
+    op.execute(
+        """
+        UPDATE tournaments
+        SET registered_count = counts.players_count
+        FROM (
+            SELECT tournament_id, count(*) AS players_count
+            FROM players
+            GROUP BY tournament_id
+        ) AS counts
+        WHERE counts.tournament_id = tournaments.id
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('tournaments', 'registered_count')
@@ -0,0 +1,39 @@
+"""index player rosters and tournament start
+
+Revision ID: 7bffff57cef9
+Revises: 0e0bf7b81234
+Create Date: 2026-10-17 13:21:05.661042
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7bffff57cef9'
+down_revision: Union[str, None] = '0e0bf7b81234'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY cannot run inside a transaction, and keeps the tables writable
+    # while the indexes are built.
+    with op.get_context().autocommit_block():
+        op.create_index('ix_players_tournament_id_registered_at_id', 'players',
+                        ['tournament_id', 'registered_at', 'id'], unique=False,
+                        postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_tournaments_start_at', 'tournaments', ['start_at'],
+                        unique=False, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_tournaments_start_at', table_name='tournaments',
+                      postgresql_concurrently=True, if_exists=True)
+        op.drop_index('ix_players_tournament_id_registered_at_id', table_name='players',
+                      postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,54 @@
+"""index tournament search
+
+Revision ID: a4c1e9d27b63
+Revises: 7bffff57cef9
+Create Date: 2026-10-17 15:02:41.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4c1e9d27b63'
+down_revision: Union[str, None] = '7bffff57cef9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _has_pg_trgm() -> bool:
+    return bool(op.get_bind().scalar(sa.text(
+        "SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'"
+    )))
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    has_pg_trgm = _has_pg_trgm()
+    if has_pg_trgm:
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    with op.get_context().autocommit_block():
+        op.create_index('ix_tournaments_start_at_id', 'tournaments',
+                        ['start_at', 'id'], unique=False,
+                        postgresql_concurrently=True, if_not_exists=True)
+        op.drop_index('ix_tournaments_start_at', table_name='tournaments',
+                      postgresql_concurrently=True, if_exists=True)
+        # Without pg_trgm, name searches fall back to scanning the table.
+        if has_pg_trgm:
+            op.create_index('ix_tournaments_name_trgm', 'tournaments', ['name'],
+                            unique=False, postgresql_using='gin',
+                            postgresql_ops={'name': 'gin_trgm_ops'},
+                            postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_tournaments_name_trgm', table_name='tournaments',
+                      postgresql_concurrently=True, if_exists=True)
+        op.create_index('ix_tournaments_start_at', 'tournaments', ['start_at'],
+                        unique=False, postgresql_concurrently=True, if_not_exists=True)
+        op.drop_index('ix_tournaments_start_at_id', table_name='tournaments',
+                      postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,40 @@
+"""enforce tournament capacity in database
+
+Revision ID: c31c3b9c9e1b
+Revises: 40839720f17f
+Create Date: 2026-10-17 11:04:19.227614
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c31c3b9c9e1b'
+down_revision: Union[str, None] = '40839720f17f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Tournaments overbooked before capacity was enforced keep their players;
+    # their limit is raised to match so the constraint can be validated.
+    op.execute(
+        "UPDATE tournaments SET max_players = registered_count "
+        "WHERE registered_count > max_players"
+    )
+    op.create_check_constraint(
+        'registered_count_not_negative', 'tournaments', 'registered_count >= 0'
+    )
+    op.create_check_constraint(
+        'registered_count_within_capacity', 'tournaments', 'registered_count <= max_players'
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('registered_count_within_capacity', 'tournaments', type_='check')
+    op.drop_constraint('registered_count_not_negative', 'tournaments', type_='check')
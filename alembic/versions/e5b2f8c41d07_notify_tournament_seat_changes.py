@@ -0,0 +1,51 @@
+"""notify tournament seat changes
+
+Revision ID: e5b2f8c41d07
+Revises: a4c1e9d27b63
+Create Date: 2026-10-17 17:21:08.540917
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b2f8c41d07'
+down_revision: Union[str, None] = 'a4c1e9d27b63'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("""
+        CREATE OR REPLACE FUNCTION notify_tournament_seats() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('tournament_seats', json_build_object(
+                'id', NEW.id,
+                'registered_players', NEW.registered_count,
+                'max_players', NEW.max_players,
+                'version', NEW.version
+            )::text);
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER tournaments_notify_seats
+        AFTER UPDATE OF registered_count, max_players ON tournaments
+        FOR EACH ROW
+        WHEN (
+            OLD.registered_count IS DISTINCT FROM NEW.registered_count
+            OR OLD.max_players IS DISTINCT FROM NEW.max_players
+        )
+        EXECUTE FUNCTION notify_tournament_seats()
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER IF EXISTS tournaments_notify_seats ON tournaments")
+    op.execute("DROP FUNCTION IF EXISTS notify_tournament_seats()")
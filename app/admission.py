@@ -0,0 +1,226 @@
+import asyncio
+from collections import deque
+from math import ceil
+from time import monotonic
+from typing import AsyncIterator, Callable, Hashable
+
+from fastapi import HTTPException, Request
+from fastapi.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+from app.cache import TTLCache
+from app.config import (
+    ADMISSION_MAX_CONCURRENCY,
+    ADMISSION_MAX_QUEUE,
+    ADMISSION_QUEUE_TIMEOUT,
+    ADMISSION_RETRY_AFTER,
+    REGISTRATION_RATE_BURST,
+    REGISTRATION_RATE_LIMIT,
+)
+
+
+class ConcurrencyLimiter:
+    def __init__(self, limit: int, max_queue: int, queue_timeout: float):
+        """
+        Cap on the requests of a process running at the same time.
+
+        Requests over ``limit`` wait in arrival order. A request is turned away
+        when ``max_queue`` requests are already waiting, or when it waited
+        ``queue_timeout`` seconds without getting a slot.
+
+        :param limit: Requests running at the same time, 0 disables the limit
+        :type limit: int
+        :param max_queue: Requests allowed to wait for a slot
+        :type max_queue: int
+        :param queue_timeout: Seconds a request may wait for a slot
+        :type queue_timeout: float
+        """
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self._waiters: deque[asyncio.Future] = deque()
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self) -> bool:
+        """
+        Take a slot, waiting for one if needed.
+
+        :return: True when the request got a slot, False when it is turned away
+        :rtype: bool
+        """
+        if self.limit <= 0:
+            return True
+        if self.active < self.limit and not self._waiters:
+            self.active += 1
+            return True
+        if len(self._waiters) >= self.max_queue:
+            return False
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as the wait ended.
+                self.release()
+            elif waiter in self._waiters:
+                self._waiters.remove(waiter)
+            if isinstance(e, TimeoutError):
+                return False
+            raise
+        return True
+
+    def release(self) -> None:
+        """
+        Give a slot back, handing it to the longest waiting request if any.
+        """
+        if self.limit <= 0:
+            return
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+
+class TokenBuckets:
+    def __init__(self, rate: float, burst: int, max_clients: int = 10000):
+        """
+        Per-client token buckets: each client may send ``burst`` requests at once,
+        then ``rate`` requests per second.
+
+        Buckets of clients idle long enough to refill are forgotten, which is the
+        same as keeping them full.
+
+        :param rate: Tokens added per second, 0 disables the limit
+        :type rate: float
+        :param burst: Tokens a bucket holds
+        :type burst: int
+        :param max_clients: Maximum number of buckets kept
+        :type max_clients: int
+        """
+        self.rate = rate
+        self.burst = burst
+        self._buckets = TTLCache(
+            maxsize=max_clients, ttl=burst / rate if rate > 0 else 0
+        )
+
+    def take(self, client: Hashable | None) -> float:
+        """
+        Take a token from a client's bucket.
+
+        :param client: Key of the client, e.g. its address
+        :type client: Hashable | None
+        :return: 0 when a token was taken, else seconds until the next one
+        :rtype: float
+        """
+        if self.rate <= 0:
+            return 0.0
+        now = monotonic()
+        tokens, updated = self._buckets.get(client) or (self.burst, now)
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        if tokens < 1:
+            self._buckets.set(client, (tokens, now))
+            return (1 - tokens) / self.rate
+        self._buckets.set(client, (tokens - 1, now))
+        return 0.0
+
+
+class Admission:
+    def __init__(self, limiter: ConcurrencyLimiter):
+        """
+        Slot of an admitted request, given back once.
+
+        :param limiter: Limiter the slot was taken from
+        :type limiter: ConcurrencyLimiter
+        """
+        self.limiter = limiter
+        self.kept = False
+        self._released = False
+
+    def release(self) -> None:
+        if not self._released:
+            self._released = True
+            self.limiter.release()
+
+
+class AdmittedStreamingResponse(StreamingResponse):
+    """
+    Streaming response keeping the admission slot of its request until the body
+    is sent, for bodies read from the database while they are streamed.
+    """
+
+    def __init__(self, request: Request, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.admission: Admission | None = getattr(request.state, "admission", None)
+        if self.admission is not None:
+            self.admission.kept = True
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            if self.admission is not None:
+                self.admission.release()
+
+
+def admission_control(
+    limiter: ConcurrencyLimiter, buckets: TokenBuckets | None = None
+) -> Callable[[Request], AsyncIterator[None]]:
+    """
+    Build a route dependency shedding requests the database could not serve in time.
+
+    A client over its token bucket gets 429. A request finding the limiter's
+    queue full, or waiting past its timeout, gets 503. Both come with a
+    ``Retry-After`` header. Requests let in hold their slot until the route
+    returns, or until their body is sent if the route returns an
+    AdmittedStreamingResponse.
+
+    :param limiter: Limiter shared by the routes using the same connection pool
+    :type limiter: ConcurrencyLimiter
+    :param buckets: Per-client rate limit of the route, if any
+    :type buckets: TokenBuckets | None
+    :return: Dependency to add to the route
+    :rtype: Callable[[Request], AsyncIterator[None]]
+    """
+
+    async def admit(request: Request) -> AsyncIterator[None]:
+        if buckets is not None:
+            client = request.client.host if request.client else None
+            wait = buckets.take(client)
+            if wait:
+                raise HTTPException(
+                    status_code=429,
+                    detail="Too many requests",
+                    headers={"Retry-After": str(ceil(wait))},
+                )
+        if not await limiter.acquire():
+            raise HTTPException(
+                status_code=503,
+                detail="Server is busy",
+                headers={"Retry-After": str(ADMISSION_RETRY_AFTER)},
+            )
+        admission = request.state.admission = Admission(limiter)
+        try:
+            yield
+        except BaseException:
+            # The response is never sent, so it cannot give the slot back.
+            admission.release()
+            raise
+        if not admission.kept:
+            admission.release()
+
+    return admit
+
+
+# Shared by every route using the database, since they share its connection pool;
+# ADMISSION_POOL_HEADROOM connections stay free for work done outside of it.
+db_limiter = ConcurrencyLimiter(
+    ADMISSION_MAX_CONCURRENCY, ADMISSION_MAX_QUEUE, ADMISSION_QUEUE_TIMEOUT
+)
+registration_buckets = TokenBuckets(REGISTRATION_RATE_LIMIT, REGISTRATION_RATE_BURST)
@@ -0,0 +1,14 @@
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+from app.db import get_pool_status
+from app.metrics import DB_POOL_CONNECTIONS
+
+router = APIRouter()
+
+
+@router.get("/metrics", include_in_schema=False)
+async def metrics_api_view() -> Response:
+    for state, value in get_pool_status().items():
+        DB_POOL_CONNECTIONS.labels(state).set(value)
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
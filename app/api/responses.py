@@ -0,0 +1,44 @@
+from functools import lru_cache
+from typing import Any
+
+from fastapi import Response
+from pydantic import TypeAdapter
+
+
+@lru_cache
+def _adapter(schema: Any) -> TypeAdapter:
+    return TypeAdapter(schema)
+
+
+def json_response(
+    content: Any,
+    schema: Any,
+    status_code: int = 200,
+    headers: dict[str, str] | None = None,
+) -> Response:
+    """
+    Encode service output straight to JSON bytes.
+
+    Returning a Response from a route skips FastAPI's validation of the
+    response_model, which only repeats the validation the services already did,
+    and the encoding happens in one compiled pass instead of going through
+    jsonable_encoder and json.dumps. The bytes are the same as those of the
+    default JSONResponse.
+
+    :param content: Already validated output, e.g. a model or a list of models
+    :type content: Any
+    :param schema: Type of the content, as declared in the route's response_model
+    :type schema: Any
+    :param status_code: HTTP status code
+    :type status_code: int
+    :param headers: Extra response headers
+    :type headers: dict[str, str] | None
+    :return: JSON response
+    :rtype: Response
+    """
+    return Response(
+        content=_adapter(schema).dump_json(content),
+        status_code=status_code,
+        headers=headers,
+        media_type="application/json",
+    )
@@ -1,79 +1,397 @@
-from fastapi import APIRouter
+import asyncio
+import json
+from typing import AsyncIterator, Literal
 
-from app.schemas.player import PlayerInDBInput, PlayerInRequest, PlayerInDBOutput
-from app.schemas.tournament import TournamentInDBOutput, TournamentInDBInput
-from app.services.player import create_player, get_players_by_tournament
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.admission import (
+    AdmittedStreamingResponse,
+    admission_control,
+    db_limiter,
+    registration_buckets,
+)
+from app.api.responses import json_response
+from app.config import (
+    CAPACITY_LOOKUP_MAX,
+    IMPORT_BATCH_SIZE,
+    IMPORT_MAX,
+    PAGE_SIZE_DEFAULT,
+    PAGE_SIZE_MAX,
+    REGISTRATION_BATCH_MAX,
+    SEATS_STREAM_HEARTBEAT,
+)
+from app.db import get_db
+from app.events import SeatSubscription
+from app.query_budget import query_budget
+from app.schemas.pagination import Page
+from app.schemas.player import (
+    PlayerInDBInput,
+    PlayerInRequest,
+    PlayerInDBOutput,
+    PlayerRegistrationResult,
+)
+from app.schemas.tournament import (
+    TournamentCapacity,
+    TournamentFilters,
+    TournamentImportOutput,
+    TournamentInDBOutput,
+    TournamentInDBInput,
+)
+from app.services.player import (
+    create_player,
+    export_players_by_tournament,
+    get_roster_page,
+    register_players,
+)
 from app.services.tournament import (
     create_tournament,
     get_tournament,
+    get_tournament_capacities,
+    get_tournament_version,
     get_tournaments,
+    import_tournaments,
     update_tournament,
     delete_tournament,
+    subscribe_to_seats,
 )
 
 router = APIRouter()
 
+# Every route shares one limiter, as they share the connection pool; registrations
+# are also rate limited per client.
+admit = admission_control(db_limiter)
+admit_registration = admission_control(db_limiter, registration_buckets)
+
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+# Clients may keep these responses but must revalidate them with If-None-Match.
+TOURNAMENT_CACHE_CONTROL = "private, no-cache"
+ROSTER_CACHE_CONTROL = "private, no-cache"
+
+
+def version_etag(tournament_id: int, version: int) -> str:
+    """
+    Build the strong ETag of a version of a tournament and its roster.
+
+    :param tournament_id: ID of tournament
+    :type tournament_id: int
+    :param version: Version of the tournament
+    :type version: int
+    :return: Quoted entity tag
+    :rtype: str
+    """
+    return f'"{tournament_id}-{version}"'
+
+
+def tournament_etag(tournament: TournamentInDBOutput) -> str:
+    """
+    Build the strong ETag of a tournament and its roster.
+
+    :param tournament: Tournament data
+    :type tournament: TournamentInDBOutput
+    :return: Quoted entity tag
+    :rtype: str
+    """
+    return version_etag(tournament.id, tournament.version)
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """
+    Tell whether the client already holds the current version of a resource.
+
+    :param request: Incoming request
+    :type request: Request
+    :param etag: Current entity tag of the resource
+    :type etag: str
+    :return: True when If-None-Match lists the entity tag
+    :rtype: bool
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is None:
+        return False
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag in tags or "*" in tags
+
 
-@router.post("/tournaments", response_model=TournamentInDBOutput, status_code=201)
+@router.post(
+    "/tournaments",
+    response_model=TournamentInDBOutput,
+    status_code=201,
+    dependencies=[Depends(admit), Depends(query_budget(2))],
+)
 async def create_tournament_api_view(
-    tournament: TournamentInDBInput,
-) -> TournamentInDBOutput:
-    new_tournament = create_tournament(tournament)
-    return new_tournament
+    tournament: TournamentInDBInput, db: AsyncSession = Depends(get_db)
+) -> Response:
+    new_tournament = await create_tournament(db, tournament)
+    return json_response(new_tournament, TournamentInDBOutput, status_code=201)
+
+
+@router.post(
+    "/tournaments/import",
+    response_model=TournamentImportOutput,
+    status_code=200,
+    # One upsert per batch.
+    dependencies=[
+        Depends(admit),
+        Depends(query_budget(-(-IMPORT_MAX // IMPORT_BATCH_SIZE))),
+    ],
+)
+async def import_tournaments_api_view(
+    tournaments: list[TournamentInDBInput] = Body(
+        ..., min_length=1, max_length=IMPORT_MAX
+    ),
+    db: AsyncSession = Depends(get_db),
+) -> Response:
+    result = await import_tournaments(db, tournaments)
+    return json_response(result, TournamentImportOutput)
 
 
+def parse_ids(values: list[str]) -> list[int]:
+    """
+    Read tournament IDs given comma-separated, repeated, or both, dropping duplicates.
+
+    :param values: Values of the query parameter
+    :type values: list[str]
+    :return: IDs in the order first given
+    :rtype: list[int]
+    """
+    try:
+        ids = [int(part) for value in values for part in value.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(status_code=422, detail="ids must be integers")
+    ids = list(dict.fromkeys(ids))
+    if len(ids) > CAPACITY_LOOKUP_MAX:
+        raise HTTPException(
+            status_code=422, detail=f"At most {CAPACITY_LOOKUP_MAX} ids can be looked up"
+        )
+    return ids
+
+
+# Declared before /tournaments/{tournament_id}, which would otherwise match it.
 @router.get(
-    "/tournaments/{tournament_id}", response_model=TournamentInDBOutput, status_code=200
+    "/tournaments/capacity",
+    response_model=list[TournamentCapacity],
+    status_code=200,
+    dependencies=[Depends(admit), Depends(query_budget(1))],
 )
-async def get_tournament_api_view(tournament_id: int) -> TournamentInDBOutput:
-    tournament = get_tournament(tournament_id)
-    return tournament
+async def get_tournament_capacities_api_view(
+    ids: list[str] = Query(..., description="Tournament IDs, e.g. ids=1,2,3"),
+    db: AsyncSession = Depends(get_db),
+) -> Response:
+    capacities = await get_tournament_capacities(db, parse_ids(ids))
+    return json_response(capacities, list[TournamentCapacity])
 
 
-@router.get("/tournaments", response_model=list[TournamentInDBOutput], status_code=200)
-async def get_tournament_api_view() -> list[TournamentInDBOutput]:
-    tournaments = get_tournaments()
-    return tournaments
+@router.get(
+    "/tournaments/{tournament_id}",
+    response_model=TournamentInDBOutput,
+    status_code=200,
+    dependencies=[Depends(admit), Depends(query_budget(1))],
+)
+async def get_tournament_api_view(
+    tournament_id: int, request: Request, db: AsyncSession = Depends(get_db)
+) -> Response:
+    tournament = await get_tournament(db, tournament_id)
+    etag = tournament_etag(tournament)
+    headers = {"ETag": etag, "Cache-Control": TOURNAMENT_CACHE_CONTROL}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return json_response(tournament, TournamentInDBOutput, headers=headers)
+
+
+@router.get(
+    "/tournaments",
+    response_model=Page[TournamentInDBOutput],
+    status_code=200,
+    dependencies=[Depends(admit), Depends(query_budget(1))],
+)
+async def get_tournaments_api_view(
+    limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+    cursor: str | None = None,
+    filters: TournamentFilters = Depends(),
+    db: AsyncSession = Depends(get_db),
+) -> Response:
+    tournaments = await get_tournaments(db, limit, cursor, filters)
+    return json_response(tournaments, Page[TournamentInDBOutput])
 
 
 @router.put(
-    "/tournaments/{tournament_id}", response_model=TournamentInDBOutput, status_code=200
+    "/tournaments/{tournament_id}",
+    response_model=TournamentInDBOutput,
+    status_code=200,
+    dependencies=[Depends(admit), Depends(query_budget(3))],
 )
 async def update_tournament_api_view(
-    tournament_id: int, data: TournamentInDBInput
-) -> TournamentInDBOutput:
-    updated_tournament = update_tournament(tournament_id, data)
-    return updated_tournament
+    tournament_id: int, data: TournamentInDBInput, db: AsyncSession = Depends(get_db)
+) -> Response:
+    updated_tournament = await update_tournament(db, tournament_id, data)
+    return json_response(updated_tournament, TournamentInDBOutput)
 
 
 @router.get(
     "/tournaments/{tournament_id}/players",
-    response_model=list[PlayerInDBOutput],
+    response_model=Page[PlayerInDBOutput],
     status_code=200,
+    dependencies=[Depends(admit), Depends(query_budget(2))],
 )
 async def get_players_by_tournament_api_view(
     tournament_id: int,
-) -> list[PlayerInDBOutput]:
-    players = get_players_by_tournament(tournament_id)
-    return players
+    request: Request,
+    limit: int = Query(PAGE_SIZE_DEFAULT, ge=1, le=PAGE_SIZE_MAX),
+    cursor: str | None = None,
+    db: AsyncSession = Depends(get_db),
+) -> Response:
+    # A revalidation is answered from the tournament version alone, read past the
+    # cache. Otherwise the ETag takes the version read with the page, so the two
+    # always come from the same snapshot.
+    if request.headers.get("if-none-match") is not None:
+        etag = version_etag(tournament_id, await get_tournament_version(db, tournament_id))
+        if etag_matches(request, etag):
+            return Response(
+                status_code=304,
+                headers={"ETag": etag, "Cache-Control": ROSTER_CACHE_CONTROL},
+            )
+    version, players = await get_roster_page(db, tournament_id, limit, cursor)
+    headers = {
+        "ETag": version_etag(tournament_id, version),
+        "Cache-Control": ROSTER_CACHE_CONTROL,
+    }
+    return json_response(players, Page[PlayerInDBOutput], headers=headers)
+
+
+# Only the existence check runs within the route; the rows are streamed later,
+# still holding the admission slot as the stream keeps a pool connection.
+@router.get(
+    "/tournaments/{tournament_id}/players/export",
+    status_code=200,
+    dependencies=[Depends(admit), Depends(query_budget(1))],
+)
+async def export_players_by_tournament_api_view(
+    tournament_id: int,
+    request: Request,
+    export_format: Literal["ndjson", "csv"] = Query("ndjson", alias="format"),
+    db: AsyncSession = Depends(get_db),
+) -> StreamingResponse:
+    chunks = await export_players_by_tournament(db, tournament_id, export_format)
+    filename = f"tournament-{tournament_id}-players.{export_format}"
+    return AdmittedStreamingResponse(
+        request,
+        chunks,
+        media_type=EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+def seat_event(seats: dict) -> str:
+    data = {key: seats[key] for key in ("id", "registered_players", "max_players")}
+    return f"event: seats\ndata: {json.dumps(data)}\n\n"
+
+
+async def seat_events(
+    tournament: TournamentInDBOutput, subscription: SeatSubscription
+) -> AsyncIterator[str]:
+    """
+    Server-sent events with the current seat counts of a tournament, then every
+    change to them, until the client leaves or the feed is lost.
+
+    Changes not newer than the counts already sent are skipped, and a comment is
+    sent when nothing happened for SEATS_STREAM_HEARTBEAT seconds so proxies keep
+    the connection open.
+
+    :param tournament: Tournament as read after subscribing
+    :type tournament: TournamentInDBOutput
+    :param subscription: Subscription to the tournament's seat counts
+    :type subscription: SeatSubscription
+    :return: Events as sent on the wire
+    :rtype: AsyncIterator[str]
+    """
+    try:
+        version = tournament.version
+        yield "retry: 1000\n" + seat_event(tournament.model_dump())
+        while True:
+            try:
+                seats = await asyncio.wait_for(
+                    subscription.get(), SEATS_STREAM_HEARTBEAT
+                )
+            except TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            if seats is None:
+                # The client reconnects after the retry delay and reads afresh.
+                return
+            if seats["version"] > version:
+                version = seats["version"]
+                yield seat_event(seats)
+    finally:
+        subscription.close()
+
+
+@router.get(
+    "/tournaments/{tournament_id}/events",
+    status_code=200,
+    # Without admission control: the stream holds no database connection, and
+    # must not hold a slot for as long as the client watches. Its first read
+    # uses the pool headroom left by ADMISSION_POOL_HEADROOM.
+    dependencies=[Depends(query_budget(1))],
+)
+async def tournament_events_api_view(
+    tournament_id: int, db: AsyncSession = Depends(get_db)
+) -> StreamingResponse:
+    tournament, subscription = await subscribe_to_seats(db, tournament_id)
+    return StreamingResponse(
+        seat_events(tournament, subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # Also closes the subscription if the client left before the stream began.
+        background=BackgroundTask(subscription.close),
+    )
 
 
 @router.post(
     "/tournaments/{tournament_id}/register",
     response_model=TournamentInDBOutput,
     status_code=201,
+    dependencies=[Depends(admit_registration), Depends(query_budget(2))],
 )
 async def register_player_api_view(
-    tournament_id: int, player_data: PlayerInRequest
-) -> TournamentInDBOutput:
+    tournament_id: int, player_data: PlayerInRequest, db: AsyncSession = Depends(get_db)
+) -> Response:
     extended_player_data = PlayerInDBInput(
         **player_data.__dict__, tournament_id=tournament_id
     )
-    create_player(extended_player_data)
-    player_registered_tournament = get_tournament(tournament_id)
-    return player_registered_tournament
+    await create_player(db, extended_player_data)
+    player_registered_tournament = await get_tournament(db, tournament_id)
+    return json_response(
+        player_registered_tournament, TournamentInDBOutput, status_code=201
+    )
+
+
+@router.post(
+    "/tournaments/{tournament_id}/register/batch",
+    response_model=list[PlayerRegistrationResult],
+    status_code=200,
+    dependencies=[Depends(admit_registration), Depends(query_budget(5))],
+)
+async def register_players_api_view(
+    tournament_id: int,
+    players: list[PlayerInRequest] = Body(
+        ..., min_length=1, max_length=REGISTRATION_BATCH_MAX
+    ),
+    db: AsyncSession = Depends(get_db),
+) -> Response:
+    results = await register_players(db, tournament_id, players)
+    return json_response(results, list[PlayerRegistrationResult])
 
 
-@router.delete("/tournaments/{tournament_id}", status_code=204)
-async def delete_tournament_api_view(tournament_id: int) -> None:
-    delete_tournament(tournament_id)
\ No newline at end of file
+@router.delete(
+    "/tournaments/{tournament_id}",
+    status_code=204,
+    dependencies=[Depends(admit), Depends(query_budget(3))],
+)
+async def delete_tournament_api_view(
+    tournament_id: int, db: AsyncSession = Depends(get_db)
+) -> None:
+    await delete_tournament(db, tournament_id)
@@ -0,0 +1,134 @@
+from collections import OrderedDict
+from math import inf
+from time import monotonic
+from typing import Any, Hashable
+
+from app.config import TOURNAMENT_CACHE_SIZE, TOURNAMENT_CACHE_TTL
+
+# Invalidation counters are kept per slot of key hashes, so they take fixed memory.
+GENERATION_SLOTS = 1024
+
+
+class TTLCache:
+    def __init__(self, maxsize: int, ttl: float):
+        """
+        Bounded in-process cache that evicts the least recently used entry when full
+        and drops entries older than ``ttl`` seconds on read.
+
+        :param maxsize: Maximum number of entries kept, 0 disables the cache
+        :type maxsize: int
+        :param ttl: Seconds an entry stays valid after it is stored
+        :type ttl: float
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._generations = [0] * GENERATION_SLOTS
+        self._invalidated_at = [-inf] * GENERATION_SLOTS
+
+    def generation(self, key: Hashable) -> int:
+        """
+        Return a counter that changes whenever the key is invalidated.
+
+        :param key: Cache key
+        :type key: Hashable
+        :return: Current generation of the key
+        :rtype: int
+        """
+        return self._generations[hash(key) % GENERATION_SLOTS]
+
+    def invalidated_within(self, key: Hashable, seconds: float) -> bool:
+        """
+        Tell whether the key may have been invalidated in the last ``seconds``.
+
+        :param key: Cache key
+        :type key: Hashable
+        :param seconds: Length of the window
+        :type seconds: float
+        :return: True when the key was invalidated within the window
+        :rtype: bool
+        """
+        invalidated_at = self._invalidated_at[hash(key) % GENERATION_SLOTS]
+        return invalidated_at > monotonic() - seconds
+
+    def get(self, key: Hashable) -> Any | None:
+        """
+        Return the cached value for a key, or None when it is missing or expired.
+
+        :param key: Cache key
+        :type key: Hashable
+        :return: Cached value
+        :rtype: Any | None
+        """
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any, generation: int | None = None) -> None:
+        """
+        Store a value, evicting the least recently used entry if the cache is full.
+
+        :param key: Cache key
+        :type key: Hashable
+        :param value: Value to cache, never None
+        :type value: Any
+        :param generation: Generation of the key when the value was read; the value
+            is dropped if the key was invalidated since
+        :type generation: int | None
+        """
+        if self.maxsize <= 0:
+            return
+        if generation is not None and generation != self.generation(key):
+            return
+        self._entries[key] = (monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, *keys: Hashable) -> None:
+        """
+        Drop the given keys from the cache.
+
+        :param keys: Cache keys
+        :type keys: Hashable
+        """
+        now = monotonic()
+        for key in keys:
+            self._entries.pop(key, None)
+            self._generations[hash(key) % GENERATION_SLOTS] += 1
+            self._invalidated_at[hash(key) % GENERATION_SLOTS] = now
+
+    def clear(self) -> None:
+        """
+        Drop every entry and reset the counters.
+        """
+        self._entries.clear()
+        self._generations = [generation + 1 for generation in self._generations]
+        self._invalidated_at = [monotonic()] * GENERATION_SLOTS
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> dict:
+        """
+        Report the size of the cache and how often reads were served from it.
+
+        :return: Cache statistics
+        :rtype: dict
+        """
+        return {
+            "size": len(self._entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+tournament_cache = TTLCache(maxsize=TOURNAMENT_CACHE_SIZE, ttl=TOURNAMENT_CACHE_TTL)
@@ -2,5 +2,84 @@ import os
 from dotenv import load_dotenv
 load_dotenv()
 
+
+def _to_async_url(url: str | None) -> str | None:
+    """Point a PostgreSQL URL at the asyncpg driver used by the application."""
+    if url is None:
+        return None
+    for prefix in ("postgresql://", "postgresql+psycopg2://"):
+        if url.startswith(prefix):
+            return "postgresql+asyncpg://" + url[len(prefix):]
+    return url
+
+
 DATABASE_URL = os.getenv("DATABASE_URL")
-DATABASE_TEST_URL = os.getenv("DATABASE_TEST_URL")
\ No newline at end of file
+DATABASE_TEST_URL = os.getenv("DATABASE_TEST_URL")
+ASYNC_DATABASE_URL = _to_async_url(DATABASE_URL)
+ASYNC_DATABASE_TEST_URL = _to_async_url(DATABASE_TEST_URL)
+# Comma-separated read replicas of DATABASE_URL.
+DATABASE_REPLICA_URLS = [
+    url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()
+]
+ASYNC_DATABASE_REPLICA_URLS = [_to_async_url(url) for url in DATABASE_REPLICA_URLS]
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+DB_POOL_ECHO = os.getenv("DB_POOL_ECHO", "false").lower() == "true"
+# Prepared statements kept per asyncpg connection; 0 disables them (needed behind
+# PgBouncer in transaction pooling mode).
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "500"))
+# Connections opened per engine when a worker starts.
+DB_POOL_PREWARM = int(os.getenv("DB_POOL_PREWARM", str(DB_POOL_SIZE)))
+# Seconds a client's reads stay on the primary after it wrote.
+DB_REPLICA_STICKY_SECONDS = float(os.getenv("DB_REPLICA_STICKY_SECONDS", "5"))
+# Seconds a replica is skipped after its connection failed.
+DB_REPLICA_RETRY_SECONDS = float(os.getenv("DB_REPLICA_RETRY_SECONDS", "30"))
+
+PAGE_SIZE_DEFAULT = int(os.getenv("PAGE_SIZE_DEFAULT", "50"))
+PAGE_SIZE_MAX = int(os.getenv("PAGE_SIZE_MAX", "500"))
+CAPACITY_LOOKUP_MAX = int(os.getenv("CAPACITY_LOOKUP_MAX", "500"))
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+REGISTRATION_BATCH_MAX = int(os.getenv("REGISTRATION_BATCH_MAX", "5000"))
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "1000"))
+IMPORT_MAX = int(os.getenv("IMPORT_MAX", "100000"))
+
+TOURNAMENT_CACHE_SIZE = int(os.getenv("TOURNAMENT_CACHE_SIZE", "10000"))
+TOURNAMENT_CACHE_TTL = float(os.getenv("TOURNAMENT_CACHE_TTL", "5"))
+
+# Single registrations of a tournament arriving within the window are written as
+# one bulk registration.
+REGISTRATION_COALESCING = os.getenv("REGISTRATION_COALESCING", "false").lower() == "true"
+REGISTRATION_COALESCE_WINDOW = float(os.getenv("REGISTRATION_COALESCE_WINDOW", "0.005"))
+REGISTRATION_COALESCE_MAX_BATCH = int(os.getenv("REGISTRATION_COALESCE_MAX_BATCH", "500"))
+
+# Pool connections kept out of admission for database work no admitted request
+# accounts for: coalesced registration writes and the first read of seat streams.
+ADMISSION_POOL_HEADROOM = int(os.getenv("ADMISSION_POOL_HEADROOM", "2"))
+# Requests of a worker using the database at the same time (0 disables the limit),
+# and how many may wait for a turn, for how long, before getting a 503.
+ADMISSION_MAX_CONCURRENCY = int(
+    os.getenv(
+        "ADMISSION_MAX_CONCURRENCY",
+        str(max(1, DB_POOL_SIZE + DB_MAX_OVERFLOW - ADMISSION_POOL_HEADROOM)),
+    )
+)
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "200"))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "2"))
+ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", "1"))
+# Registrations per second per client after a burst (0 disables the limit).
+REGISTRATION_RATE_LIMIT = float(os.getenv("REGISTRATION_RATE_LIMIT", "0"))
+REGISTRATION_RATE_BURST = int(os.getenv("REGISTRATION_RATE_BURST", "10"))
+
+# Seconds without a seat change after which a live stream sends a keep-alive.
+SEATS_STREAM_HEARTBEAT = float(os.getenv("SEATS_STREAM_HEARTBEAT", "15"))
+
+# Responses kept for requests retried with the same Idempotency-Key header.
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000"))
+IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", "86400"))
+
+# "warn" logs requests over their route's query budget, "raise" fails them.
+QUERY_BUDGET_MODE = os.getenv("QUERY_BUDGET_MODE", "warn").lower()
@@ -1,7 +1,452 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, declarative_base
-from app.config import DATABASE_URL
+import asyncio
+import logging
+import secrets
+from functools import wraps
+from itertools import count
+from time import monotonic, perf_counter
+from typing import AsyncIterator, Hashable
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base = declarative_base()
+from fastapi import Request
+from sqlalchemy import Engine, event
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.cache import TTLCache
+from app.config import (
+    ASYNC_DATABASE_URL,
+    ASYNC_DATABASE_REPLICA_URLS,
+    DB_POOL_SIZE,
+    DB_MAX_OVERFLOW,
+    DB_POOL_TIMEOUT,
+    DB_POOL_RECYCLE,
+    DB_POOL_PRE_PING,
+    DB_POOL_ECHO,
+    DB_STATEMENT_CACHE_SIZE,
+    DB_REPLICA_STICKY_SECONDS,
+    DB_REPLICA_RETRY_SECONDS,
+)
+from app.metrics import DB_POOL_CHECKOUT_WAIT, request_stats
+# Re-exported for the tests and migrations importing it from here.
+from app.models.base import Base as Base
+
+logger = logging.getLogger(__name__)
+
+# Cookie naming a client for read-your-writes, so clients sharing an address (behind
+# a proxy or NAT) do not pin each other's reads to the primary. Clients that do not
+# keep cookies can send their own stable ID in the header instead.
+CLIENT_COOKIE = "db_client"
+CLIENT_HEADER = "x-client-id"
+CLIENT_ID_MAX_LENGTH = 128
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long callers wait for a connection."""
+
+    def _do_get(self):
+        started = perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_CHECKOUT_WAIT.observe(perf_counter() - started)
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """
+    Count the statements of an engine and their time against the current request.
+
+    :param engine: Engine to instrument
+    :type engine: AsyncEngine
+    """
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def start_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(perf_counter())
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def stop_timer(conn, cursor, statement, parameters, context, executemany):
+        elapsed = perf_counter() - conn.info["query_started"].pop()
+        stats = request_stats.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.db_time += elapsed
+            stats.statements[statement] += 1
+
+
+class ReplicaSet:
+    def __init__(
+        self,
+        engines: list[AsyncEngine],
+        sticky_seconds: float,
+        retry_seconds: float,
+        max_clients: int = 10000,
+    ):
+        """
+        Read replicas picked round-robin, skipping the ones whose connections failed.
+
+        Clients that wrote within the last ``sticky_seconds`` are remembered so
+        their reads can stay on the primary until the replicas caught up.
+
+        :param engines: Engines of the replicas
+        :type engines: list[AsyncEngine]
+        :param sticky_seconds: Seconds a client's reads stay on the primary after it wrote
+        :type sticky_seconds: float
+        :param retry_seconds: Seconds a failed replica is skipped
+        :type retry_seconds: float
+        :param max_clients: Maximum number of recent writers remembered
+        :type max_clients: int
+        """
+        self.async_engines = engines
+        self.engines: list[Engine] = [engine.sync_engine for engine in engines]
+        self.retry_seconds = retry_seconds
+        self.recent_writers = TTLCache(maxsize=max_clients, ttl=sticky_seconds)
+        self._down_until: dict[Engine, float] = {}
+        self._turn = count()
+        for engine in self.engines:
+            event.listen(engine, "handle_error", self._on_error)
+
+    def _on_error(self, context) -> None:
+        if context.is_disconnect:
+            self.mark_down(context.engine)
+
+    def pick(self) -> Engine | None:
+        """
+        Return the next healthy replica.
+
+        :return: Replica engine, or None when no replica is healthy
+        :rtype: Engine | None
+        """
+        for _ in range(len(self.engines)):
+            engine = self.engines[next(self._turn) % len(self.engines)]
+            if not self.is_down(engine):
+                return engine
+        return None
+
+    def mark_down(self, engine: Engine) -> None:
+        self._down_until[engine] = monotonic() + self.retry_seconds
+
+    def is_down(self, engine: Engine) -> bool:
+        return self._down_until.get(engine, 0.0) > monotonic()
+
+    def failed(self, engine: Engine, error: Exception) -> bool:
+        """
+        Tell whether an error raised while reading from a replica was the replica's
+        fault, marking it down for connection errors.
+
+        :param engine: Replica the read was sent to
+        :type engine: Engine
+        :param error: Error raised by the read
+        :type error: Exception
+        :return: True when the read should be retried on the primary
+        :rtype: bool
+        """
+        # asyncpg raises connection failures as plain OS errors, before SQLAlchemy
+        # gets a chance to wrap them.
+        if isinstance(error, (OSError, TimeoutError)):
+            self.mark_down(engine)
+        return self.is_down(engine)
+
+    def wrote(self, client: Hashable | None) -> None:
+        if client is not None:
+            self.recent_writers.set(client, True)
+
+    def wrote_recently(self, client: Hashable | None) -> bool:
+        return client is not None and self.recent_writers.get(client) is not None
+
+
+class RoutingSession(Session):
+    def __init__(
+        self,
+        *args,
+        replicas: ReplicaSet | None = None,
+        client: Hashable | None = None,
+        **kwargs,
+    ):
+        """
+        Session sending the statements of read-only repository methods to a replica.
+
+        Reads stay on the primary once the session or its client wrote, and while
+        the session has a transaction open on the primary.
+
+        :param replicas: Replicas to read from
+        :type replicas: ReplicaSet | None
+        :param client: Key of the client the session works for, e.g. its cookie
+        :type client: Hashable | None
+        """
+        super().__init__(*args, **kwargs)
+        self.replicas = replicas
+        self.client = client
+        self.read_only = False
+        self.replica: Engine | None = None
+        self.wrote = False
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self.read_only:
+            if self.replica is None and self._can_read_replica():
+                self.replica = self.replicas.pick()
+            if self.replica is not None:
+                return self.replica
+        elif clause is None or not getattr(clause, "is_select", False):
+            # Flushes and DML; plain selects outside read-only methods do not count.
+            self.mark_written()
+        return super().get_bind(mapper, clause=clause, **kwargs)
+
+    def _can_read_replica(self) -> bool:
+        return (
+            self.replicas is not None
+            and not self.wrote
+            and not self.in_transaction()
+            and not self.replicas.wrote_recently(self.client)
+        )
+
+    def mark_written(self) -> None:
+        self.wrote = True
+        if self.replicas is not None:
+            self.replicas.wrote(self.client)
+
+
+def read_only(method):
+    """
+    Let the statements of a repository method be read from a replica.
+
+    The replica transaction is ended when the method returns, so later statements
+    of the session go to the primary and objects read from the replica are
+    reloaded. When the replica's connection fails, the method is run again on the
+    primary.
+    """
+
+    @wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        session = self.db.sync_session
+        if not isinstance(session, RoutingSession) or session.replicas is None:
+            return await method(self, *args, **kwargs)
+        session.read_only = True
+        try:
+            return await method(self, *args, **kwargs)
+        except Exception as e:
+            if session.replica is None or not session.replicas.failed(
+                session.replica, e
+            ):
+                raise
+        finally:
+            session.read_only = False
+            if session.replica is not None:
+                session.replica = None
+                await self.db.rollback()
+        return await method(self, *args, **kwargs)
+
+    return wrapper
+
+
+def read_from_replica(db: AsyncSession) -> bool:
+    """
+    Tell whether the statements of the running read-only method went to a replica.
+
+    Rows read from a lagging replica must not be cached, or they could replace
+    an entry a write just invalidated.
+
+    :param db: Session of the current request
+    :type db: AsyncSession
+    :return: True when the method reads from a replica
+    :rtype: bool
+    """
+    session = db.sync_session
+    return isinstance(session, RoutingSession) and session.replica is not None
+
+
+def mark_written(db: AsyncSession) -> None:
+    """
+    Keep later reads of a session and its client on the primary after a write
+    made through another session.
+
+    :param db: Session of the current request
+    :type db: AsyncSession
+    """
+    if isinstance(db.sync_session, RoutingSession):
+        db.sync_session.mark_written()
+
+
+def _create_engine(url: str) -> AsyncEngine:
+    # asyncpg prepares every statement on the server; caching the prepared
+    # statements per connection saves a round trip per execution.
+    connect_args = (
+        {"prepared_statement_cache_size": DB_STATEMENT_CACHE_SIZE}
+        if url.startswith("postgresql+asyncpg://")
+        else {}
+    )
+    engine = create_async_engine(
+        url,
+        connect_args=connect_args,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+        echo_pool=DB_POOL_ECHO,
+        poolclass=TimedQueuePool,
+    )
+    instrument_engine(engine)
+    return engine
+
+
+# Engines are created per process on first use (normally by the lifespan of the
+# app), so pre-forked workers never share pooled connections.
+engine: AsyncEngine | None = None
+replicas: ReplicaSet | None = None
+SessionLocal = async_sessionmaker(autoflush=False, sync_session_class=RoutingSession)
+
+
+def init_engine() -> AsyncEngine:
+    """
+    Create the engines of this process if needed and bind SessionLocal to them.
+
+    :return: Engine of the primary database
+    :rtype: AsyncEngine
+    """
+    global engine, replicas
+    if engine is None:
+        engine = _create_engine(ASYNC_DATABASE_URL)
+        if ASYNC_DATABASE_REPLICA_URLS:
+            replicas = ReplicaSet(
+                [_create_engine(url) for url in ASYNC_DATABASE_REPLICA_URLS],
+                sticky_seconds=DB_REPLICA_STICKY_SECONDS,
+                retry_seconds=DB_REPLICA_RETRY_SECONDS,
+            )
+        SessionLocal.configure(bind=engine, replicas=replicas)
+    return engine
+
+
+async def prewarm_pools(connections: int) -> int:
+    """
+    Open connections to the primary and every replica up front, so the first
+    requests do not pay for connecting.
+
+    Connections that cannot be opened are logged and left to be opened on demand.
+
+    :param connections: Connections to open per engine
+    :type connections: int
+    :return: Number of connections opened
+    :rtype: int
+    """
+    engines = [init_engine()] + (replicas.async_engines if replicas else [])
+    opened = 0
+    for target in engines:
+        # Held at the same time, so the pool has to open distinct connections.
+        results = await asyncio.gather(
+            *(target.connect().start() for _ in range(connections)),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, BaseException):
+                logger.warning("Could not prewarm %s: %s", target.url, result)
+            else:
+                opened += 1
+                await result.close()
+    return opened
+
+
+async def dispose_engine() -> None:
+    """
+    Close every pooled connection of this process and forget the engines.
+    """
+    global engine, replicas
+    if engine is None:
+        return
+    for target in [engine] + (replicas.async_engines if replicas else []):
+        await target.dispose()
+    engine = replicas = None
+    SessionLocal.configure(bind=None, replicas=None)
+
+
+def client_id(request: Request) -> str | None:
+    """
+    Return the ID a client sent in the CLIENT_HEADER or the CLIENT_COOKIE.
+
+    :param request: Current request
+    :type request: Request
+    :return: Client ID, or None when the client sent none or an overlong one
+    :rtype: str | None
+    """
+    client = request.headers.get(CLIENT_HEADER) or request.cookies.get(CLIENT_COOKIE)
+    if client is None or len(client) > CLIENT_ID_MAX_LENGTH:
+        return None
+    return client
+
+
+async def get_db(request: Request) -> AsyncIterator[AsyncSession]:
+    """
+    Provides one database session per request and closes it when the request ends.
+
+    :param request: Current request; its client ID keys read-your-writes. A
+        client without one that writes is given a CLIENT_COOKIE by
+        ClientCookieMiddleware.
+    :type request: Request
+
+    :return: Database session shared by the services and repositories of a request.
+    :rtype: AsyncIterator[AsyncSession]
+    """
+    init_engine()
+    client = client_id(request)
+    new_client = client is None
+    if new_client:
+        client = secrets.token_urlsafe(16)
+    async with SessionLocal(client=client) as db:
+        try:
+            yield db
+        finally:
+            session = db.sync_session
+            if new_client and session.wrote and session.replicas is not None:
+                request.state.new_db_client = client
+
+
+class ClientCookieMiddleware:
+    def __init__(self, app: ASGIApp):
+        """
+        ASGI middleware setting the CLIENT_COOKIE that get_db issued to a client
+        on its first write, so its next reads stay on the primary.
+
+        :param app: Application to wrap
+        :type app: ASGIApp
+        """
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message: Message) -> None:
+            client = scope.get("state", {}).get("new_db_client")
+            if message["type"] == "http.response.start" and client is not None:
+                headers = MutableHeaders(scope=message)
+                headers.append(
+                    "Set-Cookie",
+                    f"{CLIENT_COOKIE}={client}; Path=/; HttpOnly; SameSite=Lax",
+                )
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
+
+
+def get_pool_status() -> dict[str, int]:
+    """
+    Reports the current state of the connection pool.
+
+    :return: Pool size, idle connections, connections in use and current overflow.
+    :rtype: dict[str, int]
+    """
+    if engine is None:
+        return {"size": 0, "checked_in": 0, "checked_out": 0, "overflow": 0}
+    pool = engine.pool
+    return {
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+    }
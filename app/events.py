@@ -0,0 +1,158 @@
+import asyncio
+import json
+import logging
+from typing import TYPE_CHECKING
+
+from sqlalchemy.engine import make_url
+
+from app.cache import tournament_cache
+from app.config import ASYNC_DATABASE_URL
+from app.exceptions.tournament import TournamentSeatFeedError
+from app.models.tournament import SEATS_CHANNEL
+
+if TYPE_CHECKING:
+    import asyncpg
+
+logger = logging.getLogger(__name__)
+
+
+class SeatSubscription:
+    def __init__(self, broadcaster: "SeatBroadcaster", tournament_id: int):
+        """
+        Seat counts of one tournament received by one client.
+
+        Only the latest counts are kept, so a slow client skips intermediate
+        changes instead of holding them in memory.
+
+        :param broadcaster: Broadcaster the subscription belongs to
+        :type broadcaster: SeatBroadcaster
+        :param tournament_id: ID of the tournament
+        :type tournament_id: int
+        """
+        self.broadcaster = broadcaster
+        self.tournament_id = tournament_id
+        self._latest: asyncio.Queue[dict | None] = asyncio.Queue(maxsize=1)
+
+    def offer(self, seats: dict | None) -> None:
+        if self._latest.full():
+            self._latest.get_nowait()
+        self._latest.put_nowait(seats)
+
+    async def get(self) -> dict | None:
+        """
+        Wait for the next seat counts.
+
+        :return: ``id``, ``registered_players``, ``max_players`` and ``version`` of
+            the tournament, or None when the feed was lost
+        :rtype: dict | None
+        """
+        return await self._latest.get()
+
+    def close(self) -> None:
+        self.broadcaster.unsubscribe(self)
+
+
+class SeatBroadcaster:
+    def __init__(self, url: str | None):
+        """
+        Fans the seat counts published by the database out to the subscriptions of
+        this process, over a single LISTEN connection.
+
+        When that connection is lost, every subscription gets None, so its client
+        reconnects and starts again from a fresh read.
+
+        :param url: Database URL, as used by the engine
+        :type url: str | None
+        """
+        self.url = url
+        self._subscriptions: dict[int, set[SeatSubscription]] = {}
+        self._connection: "asyncpg.Connection | None" = None
+        self._connecting: asyncio.Future | None = None
+
+    @property
+    def subscribers(self) -> int:
+        return sum(len(subscriptions) for subscriptions in self._subscriptions.values())
+
+    async def subscribe(self, tournament_id: int) -> SeatSubscription:
+        """
+        Start receiving the seat counts of a tournament.
+
+        :param tournament_id: ID of the tournament
+        :type tournament_id: int
+        :return: Subscription to read the counts from and close when done
+        :rtype: SeatSubscription
+        :raises TournamentSeatFeedError: If the database cannot be listened to
+        """
+        await self._listen()
+        subscription = SeatSubscription(self, tournament_id)
+        self._subscriptions.setdefault(tournament_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: SeatSubscription) -> None:
+        subscriptions = self._subscriptions.get(subscription.tournament_id)
+        if subscriptions is None:
+            return
+        subscriptions.discard(subscription)
+        if not subscriptions:
+            del self._subscriptions[subscription.tournament_id]
+
+    async def _listen(self) -> None:
+        # Imported on first use, like the engine's driver, so importing the app
+        # stays light for pre-forked workers.
+        import asyncpg
+
+        if self._connection is not None and not self._connection.is_closed():
+            return
+        # Subscribers arriving while the connection is opened share it.
+        if self._connecting is None:
+            self._connecting = asyncio.ensure_future(self._connect())
+        connecting = self._connecting
+        try:
+            self._connection = await asyncio.shield(connecting)
+        except (OSError, asyncpg.PostgresError) as e:
+            logger.warning("Could not listen for seat counts: %s", e)
+            raise TournamentSeatFeedError()
+        finally:
+            if self._connecting is connecting and connecting.done():
+                self._connecting = None
+
+    async def _connect(self) -> "asyncpg.Connection":
+        import asyncpg
+
+        url = make_url(self.url).set(drivername="postgresql")
+        connection = await asyncpg.connect(url.render_as_string(hide_password=False))
+        connection.add_termination_listener(self._on_lost)
+        await connection.add_listener(SEATS_CHANNEL, self._on_notify)
+        return connection
+
+    def _on_notify(self, connection, pid, channel, payload: str) -> None:
+        seats = json.loads(payload)
+        # The change may come from another process; drop what this one cached.
+        tournament_cache.invalidate(seats["id"])
+        for subscription in self._subscriptions.get(seats["id"], ()):
+            subscription.offer(seats)
+
+    def _on_lost(self, connection) -> None:
+        if connection is not self._connection:
+            return
+        logger.warning("Lost the connection listening for seat counts")
+        self._connection = None
+        self._end_subscriptions()
+
+    def _end_subscriptions(self) -> None:
+        for subscriptions in self._subscriptions.values():
+            for subscription in subscriptions:
+                subscription.offer(None)
+        self._subscriptions.clear()
+
+    async def close(self) -> None:
+        """
+        End every subscription and close the LISTEN connection.
+        """
+        connection, self._connection = self._connection, None
+        self._end_subscriptions()
+        if connection is not None and not connection.is_closed():
+            await connection.close()
+
+
+seat_broadcaster = SeatBroadcaster(ASYNC_DATABASE_URL)
@@ -0,0 +1,6 @@
+class InvalidCursorError(Exception):
+    """Raised when a pagination cursor is malformed or was not issued by the API."""
+    def __init__(self, cursor=None):
+        self.cursor = cursor
+        self.message = f"Invalid pagination cursor '{cursor}'" if cursor else "Invalid pagination cursor"
+        super().__init__(self.message)
@@ -0,0 +1,12 @@
+class QueryBudgetExceededError(Exception):
+    """Raised when a request runs more SQL statements than its route allows."""
+    def __init__(self, route=None, budget=None, queries=None, repeated=None):
+        self.route = route
+        self.budget = budget
+        self.queries = queries
+        self.repeated = repeated or []
+        self.message = f"Route {route} ran {queries} queries, over its budget of {budget}"
+        if self.repeated:
+            shapes = "; ".join(f"{count}x {statement}" for statement, count in self.repeated)
+            self.message += f". Repeated statements: {shapes}"
+        super().__init__(self.message)
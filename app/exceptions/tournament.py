@@ -51,4 +51,21 @@ class TournamentNameExistsError(TournamentBaseException):
     def __init__(self, name=None):
         self.name = name
         self.message = f"Tournament with name '{name}' already exists" if name else "Tournament with this name already exists in the database"
-        super().__init__(self.message)
\ No newline at end of file
+        super().__init__(self.message)
+
+class TournamentCapacityError(TournamentBaseException):
+    """Raised when max_players would drop below the number of registered players."""
+    def __init__(self, tournament_id=None, registered_players=None):
+        self.tournament_id = tournament_id
+        self.registered_players = registered_players
+        if tournament_id is not None and registered_players is not None:
+            self.message = f"Tournament {tournament_id} already has {registered_players} registered players"
+        else:
+            self.message = "Tournament already has more registered players than max_players"
+        super().__init__(self.message)
+
+class TournamentSeatFeedError(TournamentBaseException):
+    """Raised when the live feed of seat counts cannot be listened to."""
+    def __init__(self, message="Live seat counts are unavailable"):
+        self.message = message
+        super().__init__(self.message)
@@ -0,0 +1,162 @@
+import hashlib
+import json
+from dataclasses import dataclass
+
+from starlette.requests import Request
+from starlette.routing import Match
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.cache import TTLCache
+from app.config import IDEMPOTENCY_CACHE_SIZE, IDEMPOTENCY_TTL
+from app.db import client_id
+
+IDEMPOTENCY_KEY_MAX_LENGTH = 255
+# Statuses telling the client to retry later, never replayed: the retry must run.
+RETRYABLE_STATUSES = {429}
+
+
+@dataclass
+class InFlight:
+    fingerprint: str
+
+
+@dataclass
+class StoredResponse:
+    fingerprint: str
+    status: int
+    headers: list[tuple[bytes, bytes]]
+    body: bytes
+
+
+class IdempotencyMiddleware:
+    def __init__(self, app: ASGIApp, paths: set[str], cache: TTLCache | None = None):
+        """
+        ASGI middleware replaying the stored response of POST requests retried with
+        the same ``Idempotency-Key`` header.
+
+        The first request with a key runs normally. If it does not fail with a
+        server error or get turned away with 429, its response is stored for
+        IDEMPOTENCY_TTL seconds. A retry with the same key and body then gets that
+        response again, without reaching the route. Reusing a key with a different
+        body is rejected with 422. A retry while the first request is still running
+        is rejected with 409.
+
+        Keys are scoped to the client, named by its client ID or else its address,
+        so clients cannot see each other's responses. Stored responses are replayed
+        without their Set-Cookie headers.
+
+        Responses are kept in process memory, so a retry handled by another worker
+        runs the request again.
+
+        :param app: Application to wrap
+        :type app: ASGIApp
+        :param paths: Path templates of the routes accepting the header
+        :type paths: set[str]
+        :param cache: Store of the responses, a new bounded one if omitted
+        :type cache: TTLCache | None
+        """
+        self.app = app
+        self.paths = paths
+        self.cache = cache or TTLCache(maxsize=IDEMPOTENCY_CACHE_SIZE, ttl=IDEMPOTENCY_TTL)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+        key = dict(scope["headers"]).get(b"idempotency-key")
+        route = self._match_route(scope) if key is not None else None
+        if route is None:
+            await self.app(scope, receive, send)
+            return
+        if len(key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+            await _send_error(send, 400, "Idempotency-Key is too long")
+            return
+
+        body = await _read_body(receive)
+        fingerprint = hashlib.sha256(body).hexdigest()
+        request = Request(scope)
+        client = client_id(request) or (request.client.host if request.client else None)
+        cache_key = (client, scope["path"], key)
+        entry = self.cache.get(cache_key)
+        if entry is not None:
+            # Label the request with its route although the router never sees it.
+            scope["route"] = route
+            if entry.fingerprint != fingerprint:
+                await _send_error(
+                    send, 422, "Idempotency-Key was already used with another request body"
+                )
+            elif isinstance(entry, InFlight):
+                await _send_error(
+                    send, 409, "A request with this Idempotency-Key is still in progress"
+                )
+            else:
+                await _replay(send, entry)
+            return
+
+        self.cache.set(cache_key, InFlight(fingerprint))
+        response = StoredResponse(fingerprint, 500, [], b"")
+
+        async def replay_body() -> Message:
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        async def send_and_record(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                response.status = message["status"]
+                response.headers = [
+                    (name, value)
+                    for name, value in message.get("headers", [])
+                    if name.lower() != b"set-cookie"
+                ]
+            elif message["type"] == "http.response.body":
+                response.body += message.get("body", b"")
+            await send(message)
+
+        try:
+            await self.app(scope, replay_body, send_and_record)
+        finally:
+            if response.status < 500 and response.status not in RETRYABLE_STATUSES:
+                self.cache.set(cache_key, response)
+            else:
+                self.cache.invalidate(cache_key)
+
+    def _match_route(self, scope: Scope):
+        for route in scope["app"].router.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return route if route.path in self.paths else None
+        return None
+
+
+async def _read_body(receive: Receive) -> bytes:
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body", False):
+            return body
+
+
+async def _replay(send: Send, response: StoredResponse) -> None:
+    await send(
+        {
+            "type": "http.response.start",
+            "status": response.status,
+            "headers": response.headers + [(b"idempotent-replayed", b"true")],
+        }
+    )
+    await send({"type": "http.response.body", "body": response.body})
+
+
+async def _send_error(send: Send, status: int, detail: str) -> None:
+    body = json.dumps({"detail": detail}).encode()
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
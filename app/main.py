@@ -1,10 +1,36 @@
+from contextlib import asynccontextmanager
 from typing import Union
 
 from fastapi import FastAPI
 
+from app.api.metrics import router as metrics_router
 from app.api.tournament import router as tournament_router
+from app.config import DB_POOL_PREWARM
+from app.db import ClientCookieMiddleware, dispose_engine, init_engine, prewarm_pools
+from app.events import seat_broadcaster
+from app.idempotency import IdempotencyMiddleware
+from app.metrics import MetricsMiddleware
 
-app = FastAPI()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Runs in every worker after it is forked, so each one gets its own pools.
+    init_engine()
+    await prewarm_pools(DB_POOL_PREWARM)
+    yield
+    await seat_broadcaster.close()
+    await dispose_engine()
 
-app.include_router(tournament_router)
\ No newline at end of file
+
+app = FastAPI(lifespan=lifespan)
+
+
+app.add_middleware(ClientCookieMiddleware)
+# Added before the metrics middleware so it wraps it and also measures replays.
+app.add_middleware(
+    IdempotencyMiddleware,
+    paths={"/tournaments", "/tournaments/{tournament_id}/register"},
+)
+app.add_middleware(MetricsMiddleware)
+app.include_router(tournament_router)
+app.include_router(metrics_router)
\ No newline at end of file
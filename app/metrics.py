@@ -0,0 +1,105 @@
+from collections import Counter as StatementCounter
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from time import perf_counter
+
+from prometheus_client import Counter, Gauge, Histogram
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route.",
+    ["method", "route", "status"],
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "HTTP requests currently being handled.",
+    ["method"],
+)
+DB_QUERIES_PER_REQUEST = Histogram(
+    "db_queries_per_request",
+    "Database statements executed while handling a request.",
+    ["route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50, 100),
+)
+DB_TIME_PER_REQUEST = Histogram(
+    "db_time_per_request_seconds",
+    "Time spent executing database statements while handling a request.",
+    ["route"],
+)
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a connection from the pool.",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10),
+)
+DB_POOL_CONNECTIONS = Gauge(
+    "db_pool_connections",
+    "Connections of the pool by state.",
+    ["state"],
+)
+REGISTRATIONS = Counter(
+    "player_registrations_total",
+    "Player registration attempts by outcome.",
+    ["outcome"],
+)
+
+
+@dataclass
+class RequestStats:
+    queries: int = 0
+    db_time: float = 0.0
+    # Executions per SQL text; parameters are bound separately, so a statement
+    # repeated with different values has one shape.
+    statements: StatementCounter[str] = field(default_factory=StatementCounter)
+
+
+# Statistics of the request being handled; None outside of a request.
+request_stats: ContextVar[RequestStats | None] = ContextVar(
+    "request_stats", default=None
+)
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp):
+        """
+        ASGI middleware recording latency and database usage of every HTTP request.
+
+        Requests are labelled with the path template of the matched route, so IDs
+        in URLs do not create new series; requests that match no route share the
+        "unmatched" label.
+
+        :param app: Application to wrap
+        :type app: ASGIApp
+        """
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        stats = RequestStats()
+        token = request_stats.set(stats)
+        in_progress = REQUESTS_IN_PROGRESS.labels(method)
+        in_progress.inc()
+        started = perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = perf_counter() - started
+            in_progress.dec()
+            request_stats.reset(token)
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            REQUEST_LATENCY.labels(method, path, str(status)).observe(elapsed)
+            DB_QUERIES_PER_REQUEST.labels(path).observe(stats.queries)
+            DB_TIME_PER_REQUEST.labels(path).observe(stats.db_time)
@@ -0,0 +1,5 @@
+from sqlalchemy.orm import declarative_base
+
+# Kept apart from app.db so that importing the models (schemas, Alembic, seed
+# scripts) does not pull in the engine and its driver.
+Base = declarative_base()
@@ -3,11 +3,12 @@ from sqlalchemy import (
     String,
     ForeignKey,
     DateTime,
+    Index,
     func,
     UniqueConstraint,
 )
 from sqlalchemy.orm import mapped_column, relationship
-from app.db import Base
+from app.models.base import Base
 
 
 class Player(Base):
@@ -21,6 +22,13 @@ class Player(Base):
 
     __table_args__ = (
         UniqueConstraint("email", "tournament_id", name="unique_player_per_tournament"),
+        # Serves roster pages, exports and the tournament foreign key.
+        Index(
+            "ix_players_tournament_id_registered_at_id",
+            "tournament_id",
+            "registered_at",
+            "id",
+        ),
     )
 
     tournament = relationship("Tournament", back_populates="players")
\ No newline at end of file
@@ -1,6 +1,6 @@
-from sqlalchemy import Integer, String, DateTime, func
+from sqlalchemy import DDL, CheckConstraint, Index, Integer, String, DateTime, event, func
 from sqlalchemy.orm import mapped_column, relationship
-from app.db import Base
+from app.models.base import Base
 
 
 class Tournament(Base):
@@ -11,5 +11,61 @@ class Tournament(Base):
     max_players = mapped_column(Integer, nullable=False)
     start_at = mapped_column(DateTime, nullable=False)
     created_at = mapped_column(DateTime, server_default=func.now())
+    registered_count = mapped_column(
+        Integer, nullable=False, default=0, server_default="0"
+    )
+    # Bumped on every change to the tournament or its roster; used for ETags.
+    version = mapped_column(Integer, nullable=False, default=1, server_default="1")
 
-    players = relationship("Player", back_populates="tournament")
\ No newline at end of file
+    __table_args__ = (
+        CheckConstraint(
+            "registered_count >= 0", name="registered_count_not_negative"
+        ),
+        CheckConstraint(
+            "registered_count <= max_players", name="registered_count_within_capacity"
+        ),
+        # Serves start_at ranges and the (start_at, id) keyset of date-sorted pages.
+        # Name searches use the ix_tournaments_name_trgm trigram index, which
+        # needs the pg_trgm extension and is only created by the migrations.
+        Index("ix_tournaments_start_at_id", "start_at", "id"),
+    )
+
+    players = relationship("Player", back_populates="tournament")
+
+
+# Channel the seat counts of a tournament are published on, as JSON, when a
+# change to them commits.
+SEATS_CHANNEL = "tournament_seats"
+
+NOTIFY_SEATS_FUNCTION = f"""
+CREATE OR REPLACE FUNCTION notify_tournament_seats() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('{SEATS_CHANNEL}', json_build_object(
+        'id', NEW.id,
+        'registered_players', NEW.registered_count,
+        'max_players', NEW.max_players,
+        'version', NEW.version
+    )::text);
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql
+"""
+
+NOTIFY_SEATS_TRIGGER = """
+CREATE TRIGGER tournaments_notify_seats
+AFTER UPDATE OF registered_count, max_players ON tournaments
+FOR EACH ROW
+WHEN (
+    OLD.registered_count IS DISTINCT FROM NEW.registered_count
+    OR OLD.max_players IS DISTINCT FROM NEW.max_players
+)
+EXECUTE FUNCTION notify_tournament_seats()
+"""
+
+# The migrations create the same trigger; this covers schemas built by create_all.
+for statement in (NOTIFY_SEATS_FUNCTION, NOTIFY_SEATS_TRIGGER):
+    event.listen(
+        Tournament.__table__,
+        "after_create",
+        DDL(statement).execute_if(dialect="postgresql"),
+    )
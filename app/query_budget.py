@@ -0,0 +1,52 @@
+import logging
+from typing import AsyncIterator, Callable
+
+from fastapi import Request
+
+from app.config import QUERY_BUDGET_MODE
+from app.exceptions.query_budget import QueryBudgetExceededError
+from app.metrics import request_stats
+
+logger = logging.getLogger(__name__)
+
+# Statements shown in a budget report; only shapes executed more than once count.
+REPEATED_STATEMENTS_REPORTED = 3
+
+
+def query_budget(max_queries: int) -> Callable[[Request], AsyncIterator[None]]:
+    """
+    Build a route dependency that caps the SQL statements a request may run.
+
+    Statements are counted by the engine hooks into the request statistics opened
+    by MetricsMiddleware. When the route returns having run more than
+    ``max_queries`` statements, the most repeated statement shapes (the usual sign
+    of an N+1 pattern) are logged as a warning, or raised when QUERY_BUDGET_MODE is
+    "raise". QUERY_BUDGET_MODE "off" disables the check.
+
+    :param max_queries: Statements allowed per request
+    :type max_queries: int
+    :return: Dependency to add to the route
+    :rtype: Callable[[Request], AsyncIterator[None]]
+    """
+
+    async def enforce_query_budget(request: Request) -> AsyncIterator[None]:
+        yield
+        stats = request_stats.get()
+        if QUERY_BUDGET_MODE == "off" or stats is None:
+            return
+        if stats.queries <= max_queries:
+            return
+        repeated = [
+            (statement, count)
+            for statement, count in stats.statements.most_common(
+                REPEATED_STATEMENTS_REPORTED
+            )
+            if count > 1
+        ]
+        route = getattr(request.scope.get("route"), "path", request.url.path)
+        error = QueryBudgetExceededError(route, max_queries, stats.queries, repeated)
+        if QUERY_BUDGET_MODE == "raise":
+            raise error
+        logger.warning(error.message)
+
+    return enforce_query_budget
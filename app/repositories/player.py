@@ -1,29 +1,184 @@
-from app.db import SessionLocal
-from app.models import Player
-from app.schemas.player import PlayerInDBInput, PlayerInDBOutput
+from datetime import datetime
+from typing import AsyncIterator
+
+from app.cache import tournament_cache
+from app.config import EXPORT_BATCH_SIZE, PAGE_SIZE_DEFAULT
+from app.db import read_only
+from app.models import Player, Tournament
+from app.repositories.tournament import TournamentRepo
+from app.schemas.pagination import Page, decode_cursor, encode_cursor
+from app.schemas.player import (
+    PlayerInDBInput,
+    PlayerInDBOutput,
+    PlayerInRequest,
+    PlayerRegistrationResult,
+)
+from sqlalchemy import (
+    DateTime,
+    Integer,
+    String,
+    bindparam,
+    insert,
+    select,
+    true,
+    tuple_,
+    update,
+)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
 from app.exceptions.player import (
-    PlayerDatabaseConnectionError,
     PlayerFetchError,
     PlayerNotFoundError,
     PlayerCreationError,
     PlayerUpdateError,
     PlayerDeletionError,
     PlayerEmailExistsError,
+    TournamentPlayerLimitError,
+)
+from app.exceptions.tournament import TournamentNotFoundError
+
+# The hot statements are built once with bound parameters. SQLAlchemy memoizes the
+# cache key of a statement object, so reusing it skips rebuilding the expression
+# and traversing it to find its compiled SQL on every call.
+PLAYERS_BY_TOURNAMENT = (
+    select(Player)
+    .where(Player.tournament_id == bindparam("tournament_id"))
+    .order_by(Player.registered_at, Player.id)
+    .limit(bindparam("limit", type_=Integer))
+)
+PLAYERS_BY_TOURNAMENT_AFTER = PLAYERS_BY_TOURNAMENT.where(
+    tuple_(Player.registered_at, Player.id)
+    > tuple_(
+        bindparam("last_registered_at", type_=DateTime),
+        bindparam("last_id", type_=Integer),
+    )
+)
+
+
+def _roster_statement(players):
+    # The tournament row comes with the page in one statement, so its version is
+    # read from the same snapshot as the players, and is there for empty pages.
+    page = players.subquery("page")
+    return (
+        select(Tournament.version, aliased(Player, page))
+        .select_from(Tournament)
+        .outerjoin(page, true())
+        .where(Tournament.id == bindparam("tournament_id"))
+        .order_by(page.c.registered_at, page.c.id)
+    )
+
+
+ROSTER_PAGE = _roster_statement(PLAYERS_BY_TOURNAMENT)
+ROSTER_PAGE_AFTER = _roster_statement(PLAYERS_BY_TOURNAMENT_AFTER)
+REGISTERED_COUNT = select(Tournament.registered_count).where(
+    Tournament.id == bindparam("tournament_id")
 )
 
 
+def _registration_statement():
+    """
+    Build the single statement that takes a seat and inserts the player.
+
+    The seat is taken by a conditional increment of the tournament counter in a
+    CTE, and the player row is inserted only when that increment matched. The row
+    lock taken by the update serializes concurrent registrations of a tournament,
+    so capacity is enforced by the database and cannot be overbooked.
+    """
+    seat = (
+        update(Tournament)
+        .where(
+            Tournament.id == bindparam("seat_tournament_id"),
+            Tournament.registered_count < Tournament.max_players,
+        )
+        .values(
+            registered_count=Tournament.registered_count + 1,
+            version=Tournament.version + 1,
+        )
+        .returning(Tournament.id)
+        .cte("seat")
+    )
+    return (
+        insert(Player)
+        .add_cte(seat)
+        .from_select(
+            [Player.name, Player.email, Player.tournament_id],
+            select(
+                bindparam("player_name", type_=String),
+                bindparam("player_email", type_=String),
+                seat.c.id,
+            ),
+        )
+        .returning(
+            Player.id,
+            Player.name,
+            Player.email,
+            Player.tournament_id,
+            Player.registered_at,
+        )
+        # Parameters fill the bind parameters above instead of being taken as the
+        # rows of an ORM bulk insert. Their names must not match a column name, or
+        # they would be taken as values of the statements.
+        .execution_options(dml_strategy="raw")
+    )
+
+
+REGISTER_PLAYER = _registration_statement()
+
+
+def _page_params(tournament_id: int, limit: int, cursor: str | None) -> dict:
+    # One row more than the page tells whether there is a next page.
+    params = {"tournament_id": tournament_id, "limit": limit + 1}
+    if cursor is not None:
+        last_registered_at, last_id = decode_cursor(cursor, datetime, int)
+        params.update(last_registered_at=last_registered_at, last_id=last_id)
+    return params
+
+
+def _to_page(players: list[Player], limit: int) -> Page[PlayerInDBOutput]:
+    next_cursor = None
+    if len(players) > limit:
+        players = players[:limit]
+        next_cursor = encode_cursor(players[-1].registered_at, players[-1].id)
+    return Page[PlayerInDBOutput](
+        items=[PlayerInDBOutput.model_validate(player) for player in players],
+        next_cursor=next_cursor,
+    )
+
+
 class PlayerRepo:
-    def __init__(self):
-        """Initialize database connection."""
-        try:
-            self.db = SessionLocal()
-        except SQLAlchemyError as e:
-            raise PlayerDatabaseConnectionError(
-                f"Failed to connect to database: {str(e)}"
+    def __init__(self, db: AsyncSession):
+        """
+        Initialize repository with the session of the current request.
+
+        :param db: Database session
+        :type db: AsyncSession
+        """
+        self.db = db
+
+    async def _adjust_registered_count(self, tournament_id: int, delta: int) -> None:
+        """
+        Shift the denormalized player counter of a tournament and bump its version.
+
+        The update joins the caller's transaction, so the counter is committed or
+        rolled back together with the player row it accounts for.
+
+        :param tournament_id: ID of tournament
+        :type tournament_id: int
+        :param delta: Number of players added (positive) or removed (negative)
+        :type delta: int
+        """
+        await self.db.execute(
+            update(Tournament)
+            .where(Tournament.id == tournament_id)
+            .values(
+                registered_count=Tournament.registered_count + delta,
+                version=Tournament.version + 1,
             )
+        )
 
-    def get_players(self) -> list[PlayerInDBOutput]:
+    async def get_players(self) -> list[PlayerInDBOutput]:
         """
         Get all players.
 
@@ -31,35 +186,121 @@ class PlayerRepo:
         :rtype: list[PlayerInDBOutput]
         """
         try:
-            players = self.db.query(Player).all()
+            players = await self.db.scalars(select(Player))
             return [PlayerInDBOutput.model_validate(player) for player in players]
         except SQLAlchemyError as e:
-            self.db.rollback()
+            await self.db.rollback()
             raise PlayerFetchError(f"Failed to fetch players: {str(e)}")
 
-    def get_players_by_tournament(self, tournament_id: int) -> list[PlayerInDBOutput]:
+    @read_only
+    async def get_players_by_tournament(
+        self,
+        tournament_id: int,
+        limit: int = PAGE_SIZE_DEFAULT,
+        cursor: str | None = None,
+    ) -> Page[PlayerInDBOutput]:
         """
-        Get players in a tournament.
+        Get one page of players in a tournament, in registration order.
+
+        Pages are keyset-based on (registered_at, id), so every page costs the same
+        no matter how deep it is.
 
         :param tournament_id: ID of tournament
         :type tournament_id: int
-        :return: List of players in tournament
-        :rtype: list[PlayerInDBOutput]
+        :param limit: Maximum number of players on the page
+        :type limit: int
+        :param cursor: Cursor returned with the previous page, if any
+        :type cursor: str | None
+        :return: Page of players in tournament
+        :rtype: Page[PlayerInDBOutput]
+        :raises: InvalidCursorError if the cursor cannot be decoded
         """
+        params = _page_params(tournament_id, limit, cursor)
+        query = PLAYERS_BY_TOURNAMENT if cursor is None else PLAYERS_BY_TOURNAMENT_AFTER
         try:
-            players = (
-                self.db.query(Player)
-                .filter(Player.tournament_id == tournament_id)
-                .all()
+            players = (await self.db.scalars(query, params)).all()
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            raise PlayerFetchError(
+                f"Failed to fetch players for tournament {tournament_id}: {str(e)}"
             )
-            return [PlayerInDBOutput.model_validate(player) for player in players]
+        return _to_page(players, limit)
+
+    @read_only
+    async def get_roster_page(
+        self,
+        tournament_id: int,
+        limit: int = PAGE_SIZE_DEFAULT,
+        cursor: str | None = None,
+    ) -> tuple[int, Page[PlayerInDBOutput]]:
+        """
+        Get one page of players in a tournament with the version of the roster it
+        was read at, both from one statement and never from the cache.
+
+        :param tournament_id: ID of tournament
+        :type tournament_id: int
+        :param limit: Maximum number of players on the page
+        :type limit: int
+        :param cursor: Cursor returned with the previous page, if any
+        :type cursor: str | None
+        :return: Tournament version and page of players in tournament
+        :rtype: tuple[int, Page[PlayerInDBOutput]]
+        :raises: InvalidCursorError if the cursor cannot be decoded
+        :raises: TournamentNotFoundError if the tournament does not exist
+        """
+        params = _page_params(tournament_id, limit, cursor)
+        query = ROSTER_PAGE if cursor is None else ROSTER_PAGE_AFTER
+        try:
+            rows = (await self.db.execute(query, params)).all()
         except SQLAlchemyError as e:
-            self.db.rollback()
+            await self.db.rollback()
             raise PlayerFetchError(
                 f"Failed to fetch players for tournament {tournament_id}: {str(e)}"
             )
+        if not rows:
+            raise TournamentNotFoundError(tournament_id)
+        players = [player for _, player in rows if player is not None]
+        return rows[0][0], _to_page(players, limit)
+
+    async def stream_players_by_tournament(
+        self, tournament_id: int, batch_size: int = EXPORT_BATCH_SIZE
+    ) -> AsyncIterator[list[PlayerInDBOutput]]:
+        """
+        Stream all players in a tournament in batches, in registration order.
+
+        Rows are read through a server-side cursor, so only one batch is held in
+        memory at a time regardless of the roster size.
+
+        :param tournament_id: ID of tournament
+        :type tournament_id: int
+        :param batch_size: Number of rows fetched per round trip
+        :type batch_size: int
+        :return: Batches of players in tournament
+        :rtype: AsyncIterator[list[PlayerInDBOutput]]
+        """
+        try:
+            result = await self.db.stream(
+                select(
+                    Player.id,
+                    Player.name,
+                    Player.email,
+                    Player.tournament_id,
+                    Player.registered_at,
+                )
+                .where(Player.tournament_id == tournament_id)
+                .order_by(Player.registered_at, Player.id)
+                .execution_options(yield_per=batch_size)
+            )
+            async for rows in result.partitions():
+                yield [PlayerInDBOutput.model_validate(row) for row in rows]
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            raise PlayerFetchError(
+                f"Failed to export players for tournament {tournament_id}: {str(e)}"
+            )
 
-    def get_players_count_by_tournament(self, tournament_id: int) -> int:
+    @read_only
+    async def get_players_count_by_tournament(self, tournament_id: int) -> int:
         """
         Get number of players in a tournament.
 
@@ -69,38 +310,53 @@ class PlayerRepo:
         :rtype: int
         """
         try:
-            players_count = (
-                self.db.query(Player)
-                .filter(Player.tournament_id == tournament_id)
-                .count()
+            players_count = await self.db.scalar(
+                REGISTERED_COUNT, {"tournament_id": tournament_id}
             )
-            return players_count
+            return players_count or 0
         except SQLAlchemyError as e:
-            self.db.rollback()
+            await self.db.rollback()
             raise PlayerFetchError(
-                "Failed to fetch players for tournament {tournament_id}: {str(e)}"
+                f"Failed to fetch players for tournament {tournament_id}: {str(e)}"
             )
 
-    def _validate_player_registration(self, tournament_id: int):
+    async def _reserve_seat(self, tournament_id: int) -> None:
         """
-        Check if tournament has space for another player.
+        Take a seat in a tournament within the caller's transaction.
 
         :param tournament_id: ID of tournament
         :type tournament_id: int
-        :raises: PlayerCreationError if tournament is full
+        :raises: TournamentNotFoundError if tournament does not exist
+        :raises: TournamentPlayerLimitError if tournament is full
         """
-        from app.services.tournament import get_tournament
+        result = await self.db.execute(
+            update(Tournament)
+            .where(
+                Tournament.id == tournament_id,
+                Tournament.registered_count < Tournament.max_players,
+            )
+            .values(
+                registered_count=Tournament.registered_count + 1,
+                version=Tournament.version + 1,
+            )
+        )
+        if result.rowcount == 0:
+            await self._raise_registration_rejected(tournament_id)
 
-        tournament = get_tournament(tournament_id)
+    async def _raise_registration_rejected(self, tournament_id: int) -> None:
+        """
+        Explain why no seat could be taken in a tournament.
 
-        allowed_num_of_players = tournament.max_players
-        registered_num_of_players = self.get_players_count_by_tournament(tournament_id)
-        if allowed_num_of_players <= registered_num_of_players:
-            raise PlayerCreationError(
-                f"Tournament {tournament.name} already has {registered_num_of_players} players."
-            )
+        :param tournament_id: ID of tournament
+        :type tournament_id: int
+        :raises: TournamentNotFoundError if tournament does not exist
+        :raises: TournamentPlayerLimitError if tournament is full
+        """
+        await self.db.rollback()
+        await TournamentRepo(self.db).get_tournament(tournament_id)
+        raise TournamentPlayerLimitError(tournament_id)
 
-    def create_player(self, data: PlayerInDBInput) -> PlayerInDBOutput:
+    async def create_player(self, data: PlayerInDBInput) -> PlayerInDBOutput:
         """
         Create a new player.
 
@@ -108,27 +364,140 @@ class PlayerRepo:
         :type data: PlayerInDBInput
         :return: Created player
         :rtype: PlayerInDBOutput
+        :raises: TournamentPlayerLimitError if tournament is full
         """
         try:
-            self._validate_player_registration(data.tournament_id)
-
-            new_player = Player(
-                name=data.name, email=data.email, tournament_id=data.tournament_id
+            new_players = await self.db.execute(
+                REGISTER_PLAYER,
+                {
+                    "player_name": data.name,
+                    "player_email": data.email,
+                    "seat_tournament_id": data.tournament_id,
+                },
             )
-            self.db.add(new_player)
-            self.db.commit()
-            self.db.refresh(new_player)
-            return PlayerInDBOutput.model_validate(new_player)
+            new_player = new_players.first()
+            if new_player is None:
+                await self._raise_registration_rejected(data.tournament_id)
+            player = PlayerInDBOutput.model_validate(new_player)
+            await self.db.commit()
+            tournament_cache.invalidate(data.tournament_id)
+            return player
         except IntegrityError:
-            self.db.rollback()
+            await self.db.rollback()
             raise PlayerEmailExistsError(
                 email=data.email, tournament_id=data.tournament_id
             )
         except SQLAlchemyError as e:
-            self.db.rollback()
+            await self.db.rollback()
             raise PlayerCreationError(f"Failed to create player: {str(e)}")
 
-    def get_player(self, player_id: int) -> PlayerInDBOutput:
+    async def register_players(
+        self, tournament_id: int, players: list[PlayerInRequest]
+    ) -> list[PlayerRegistrationResult]:
+        """
+        Register a batch of players in one transaction.
+
+        The tournament row is locked once so the free seats cannot change under the
+        batch. Emails already registered are looked up in one query, and the rest are
+        inserted with a multi-row statement that still skips conflicting emails as a
+        safeguard. Seats left free by skipped rows are offered to the next players in
+        the batch until the tournament is full.
+
+        :param tournament_id: ID of tournament
+        :type tournament_id: int
+        :param players: Players to register, in order of priority
+        :type players: list[PlayerInRequest]
+        :return: Outcome for each player, in request order
+        :rtype: list[PlayerRegistrationResult]
+        :raises: TournamentNotFoundError if tournament does not exist
+        """
+        try:
+            free_seats = await self.db.scalar(
+                select(Tournament.max_players - Tournament.registered_count)
+                .where(Tournament.id == tournament_id)
+                .with_for_update()
+            )
+            if free_seats is None:
+                await self.db.rollback()
+                raise TournamentNotFoundError(tournament_id)
+
+            results: list[PlayerRegistrationResult | None] = [None] * len(players)
+            positions: dict[str, int] = {}
+            for position, player in enumerate(players):
+                if player.email in positions:
+                    results[position] = PlayerRegistrationResult(
+                        email=player.email, status="duplicate"
+                    )
+                else:
+                    positions[player.email] = position
+
+            # Every insert into a tournament takes its row lock first, so the
+            # emails registered now cannot change until this transaction ends.
+            registered_emails = set(
+                await self.db.scalars(
+                    select(Player.email).where(
+                        Player.tournament_id == tournament_id,
+                        Player.email.in_(list(positions)),
+                    )
+                )
+            )
+            for email in registered_emails:
+                results[positions[email]] = PlayerRegistrationResult(
+                    email=email, status="duplicate"
+                )
+            pending = [email for email in positions if email not in registered_emails]
+            registered = 0
+            while pending and free_seats > 0:
+                emails, pending = pending[:free_seats], pending[free_seats:]
+                inserted = await self.db.execute(
+                    pg_insert(Player)
+                    .values(
+                        [
+                            {
+                                "name": players[positions[email]].name,
+                                "email": email,
+                                "tournament_id": tournament_id,
+                            }
+                            for email in emails
+                        ]
+                    )
+                    .on_conflict_do_nothing(constraint="unique_player_per_tournament")
+                    .returning(
+                        Player.id,
+                        Player.name,
+                        Player.email,
+                        Player.tournament_id,
+                        Player.registered_at,
+                    )
+                )
+                for row in inserted:
+                    results[positions[row.email]] = PlayerRegistrationResult(
+                        email=row.email,
+                        status="registered",
+                        player=PlayerInDBOutput.model_validate(row),
+                    )
+                    registered += 1
+                    free_seats -= 1
+                for email in emails:
+                    if results[positions[email]] is None:
+                        results[positions[email]] = PlayerRegistrationResult(
+                            email=email, status="duplicate"
+                        )
+
+            for email in pending:
+                results[positions[email]] = PlayerRegistrationResult(
+                    email=email, status="full"
+                )
+            if registered:
+                await self._adjust_registered_count(tournament_id, registered)
+            await self.db.commit()
+            tournament_cache.invalidate(tournament_id)
+            return results
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            raise PlayerCreationError(f"Failed to register players: {str(e)}")
+
+    async def get_player(self, player_id: int) -> PlayerInDBOutput:
         """
         Get a player by ID.
 
@@ -138,15 +507,17 @@ class PlayerRepo:
         :rtype: PlayerInDBOutput
         """
         try:
-            player = self.db.query(Player).filter(Player.id == player_id).first()
+            player = await self.db.get(Player, player_id)
             if not player:
                 raise PlayerNotFoundError(player_id)
             return PlayerInDBOutput.model_validate(player)
         except SQLAlchemyError as e:
-            self.db.rollback()
+            await self.db.rollback()
             raise PlayerFetchError(f"Failed to fetch player {player_id}: {str(e)}")
 
-    def update_player(self, player_id: int, data: PlayerInDBInput) -> PlayerInDBOutput:
+    async def update_player(
+        self, player_id: int, data: PlayerInDBInput
+    ) -> PlayerInDBOutput:
         """
         Update a player's data.
 
@@ -158,25 +529,33 @@ class PlayerRepo:
         :rtype: PlayerInDBOutput
         """
         try:
-            player = self.db.query(Player).filter(Player.id == player_id).first()
+            player = await self.db.get(Player, player_id)
             if not player:
                 raise PlayerNotFoundError(player_id)
+            previous_tournament_id = player.tournament_id
+            if previous_tournament_id != data.tournament_id:
+                await self._reserve_seat(data.tournament_id)
+                await self._adjust_registered_count(previous_tournament_id, -1)
+            else:
+                # The count is unchanged, but the roster still needs a new version.
+                await self._adjust_registered_count(previous_tournament_id, 0)
             player.name = data.name
             player.email = data.email
             player.tournament_id = data.tournament_id
-            self.db.commit()
-            self.db.refresh(player)
+            await self.db.commit()
+            tournament_cache.invalidate(previous_tournament_id, data.tournament_id)
+            await self.db.refresh(player)
             return PlayerInDBOutput.model_validate(player)
         except IntegrityError:
-            self.db.rollback()
+            await self.db.rollback()
             raise PlayerEmailExistsError(
                 email=data.email, tournament_id=data.tournament_id
             )
         except SQLAlchemyError as e:
-            self.db.rollback()
+            await self.db.rollback()
             raise PlayerUpdateError(f"Failed to update player {player_id}: {str(e)}")
 
-    def delete_player(self, player_id: int) -> bool:
+    async def delete_player(self, player_id: int) -> bool:
         """
         Delete a player.
 
@@ -186,13 +565,16 @@ class PlayerRepo:
         :rtype: bool
         """
         try:
-            player = self.db.query(Player).filter(Player.id == player_id).first()
+            player = await self.db.get(Player, player_id)
             if not player:
                 raise PlayerNotFoundError(player_id)
 
-            self.db.delete(player)
-            self.db.commit()
+            tournament_id = player.tournament_id
+            await self.db.delete(player)
+            await self._adjust_registered_count(tournament_id, -1)
+            await self.db.commit()
+            tournament_cache.invalidate(tournament_id)
             return True
         except SQLAlchemyError as e:
-            self.db.rollback()
+            await self.db.rollback()
             raise PlayerDeletionError(f"Failed to delete player {player_id}: {str(e)}")
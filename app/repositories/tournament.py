@@ -1,68 +1,299 @@
+from datetime import datetime
+
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
-from app.db import SessionLocal
+from sqlalchemy import ARRAY, Integer, any_, bindparam, literal_column, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.cache import tournament_cache
+from app.db import read_from_replica, read_only
+from app.config import (
+    DB_REPLICA_STICKY_SECONDS,
+    IMPORT_BATCH_SIZE,
+    PAGE_SIZE_DEFAULT,
+)
 from app.models import Tournament
-from app.schemas.tournament import TournamentInDBInput, TournamentInDBOutput
+from app.schemas.pagination import Page, decode_cursor, encode_cursor
+from app.schemas.tournament import (
+    TournamentCapacity,
+    TournamentFilters,
+    TournamentImportOutput,
+    TournamentInDBInput,
+    TournamentInDBOutput,
+)
 from app.exceptions.tournament import (
-    TournamentDatabaseConnectionError,
     TournamentFetchError,
     TournamentNotFoundError,
     TournamentCreationError,
     TournamentUpdateError,
     TournamentDeletionError,
     TournamentNameExistsError,
+    TournamentCapacityError,
 )
 
+# Columns each sort order pages on, with the types of their cursor values. Every
+# key is unique and backed by an index, so any page is one index range scan.
+TOURNAMENT_SORTS = {
+    "id": ((Tournament.id,), (int,)),
+    "start_at": ((Tournament.start_at, Tournament.id), (datetime, int)),
+    "-start_at": ((Tournament.start_at, Tournament.id), (datetime, int)),
+    "name": ((Tournament.name,), (str,)),
+}
+
+# Built once so each lookup reuses its memoized cache key, like the hot statements
+# of app/repositories/player.py.
+TOURNAMENT_BY_ID = select(Tournament).where(Tournament.id == bindparam("tournament_id"))
+TOURNAMENT_VERSION = select(Tournament.version).where(
+    Tournament.id == bindparam("tournament_id")
+)
+# One array parameter instead of an expanding IN, so any number of ids runs the
+# same prepared statement.
+TOURNAMENTS_BY_IDS = select(Tournament).where(
+    Tournament.id == any_(bindparam("tournament_ids", type_=ARRAY(Integer)))
+)
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _filter_clauses(filters: TournamentFilters) -> list:
+    clauses = []
+    if filters.starts_from is not None:
+        clauses.append(Tournament.start_at >= filters.starts_from)
+    if filters.starts_before is not None:
+        clauses.append(Tournament.start_at < filters.starts_before)
+    # ILIKE, unlike lower() LIKE, can use the trigram index on name.
+    if filters.name is not None:
+        clauses.append(
+            Tournament.name.ilike(f"%{_escape_like(filters.name)}%", escape="\\")
+        )
+    if filters.name_prefix is not None:
+        clauses.append(
+            Tournament.name.ilike(f"{_escape_like(filters.name_prefix)}%", escape="\\")
+        )
+    if filters.has_free_seats is True:
+        clauses.append(Tournament.registered_count < Tournament.max_players)
+    elif filters.has_free_seats is False:
+        clauses.append(Tournament.registered_count >= Tournament.max_players)
+    return clauses
+
+
+# SQLSTATE of unique constraint violations; the only one on tournaments is the name.
+UNIQUE_VIOLATION = "23505"
+
+
+def _is_unique_violation(error: IntegrityError) -> bool:
+    return getattr(error.orig, "pgcode", None) == UNIQUE_VIOLATION
+
 
 class TournamentRepo:
-    def __init__(self):
-        """Initialize database connection."""
-        try:
-            self.db = SessionLocal()
-        except SQLAlchemyError as e:
-            raise TournamentDatabaseConnectionError(
-                f"Failed to connect to database: {str(e)}"
-            )
+    def __init__(self, db: AsyncSession):
+        """
+        Initialize repository with the session of the current request.
 
-    def get_tournaments(self) -> list[TournamentInDBOutput]:
+        :param db: Database session
+        :type db: AsyncSession
         """
-        Fetch all tournaments from the database.
+        self.db = db
 
-        :return: List of tournament data objects
-        :rtype: list[TournamentInDBOutput]
+    @read_only
+    async def get_tournaments(
+        self,
+        limit: int = PAGE_SIZE_DEFAULT,
+        cursor: str | None = None,
+        filters: TournamentFilters | None = None,
+    ) -> Page[TournamentInDBOutput]:
         """
+        Fetch one page of the tournaments matching the filters, in the requested order.
+
+        Pages are keyset-based: the cursor carries the sort key of the last
+        tournament already returned, so every page is an index range scan no
+        matter how deep it is. A cursor is only valid with the sort it came from.
+
+        :param limit: Maximum number of tournaments on the page
+        :type limit: int
+        :param cursor: Cursor returned with the previous page, if any
+        :type cursor: str | None
+        :param filters: Filters and sort order, all tournaments by ID if omitted
+        :type filters: TournamentFilters | None
+        :return: Page of tournament data objects
+        :rtype: Page[TournamentInDBOutput]
+        :raises: InvalidCursorError if the cursor cannot be decoded
+        """
+        filters = filters or TournamentFilters()
+        columns, types = TOURNAMENT_SORTS[filters.sort]
+        descending = filters.sort.startswith("-")
+        query = (
+            select(Tournament)
+            .where(*_filter_clauses(filters))
+            .order_by(*(column.desc() if descending else column for column in columns))
+            .limit(limit + 1)
+        )
+        if cursor is not None:
+            last = decode_cursor(cursor, *types)
+            if len(columns) == 1:
+                key, last = columns[0], last[0]
+            else:
+                key, last = tuple_(*columns), tuple_(*last)
+            query = query.where(key < last if descending else key > last)
         try:
-            tournaments = self.db.query(Tournament).all()
-            return [
-                TournamentInDBOutput.model_validate(tournament)
-                for tournament in tournaments
-            ]
+            tournaments = (await self.db.scalars(query)).all()
         except SQLAlchemyError as e:
-            self.db.rollback()
+            await self.db.rollback()
             raise TournamentFetchError(f"Failed to fetch tournaments: {str(e)}")
 
-    def get_tournament(self, tournament_id: int) -> TournamentInDBOutput:
+        next_cursor = None
+        if len(tournaments) > limit:
+            tournaments = tournaments[:limit]
+            next_cursor = encode_cursor(
+                *(getattr(tournaments[-1], column.key) for column in columns)
+            )
+        return Page[TournamentInDBOutput](
+            items=[
+                TournamentInDBOutput.model_validate(tournament)
+                for tournament in tournaments
+            ],
+            next_cursor=next_cursor,
+        )
+
+    @read_only
+    async def get_tournament(self, tournament_id: int) -> TournamentInDBOutput:
         """
         Fetch a single tournament by ID.
 
+        Reads go through the in-process tournament cache. Writes made by this
+        process invalidate their entries, and changes made elsewhere become
+        visible within TOURNAMENT_CACHE_TTL seconds. Tournaments read from a
+        replica are not cached while the replica may still lag behind a write.
+
         :param tournament_id: ID of tournament to fetch
         :type tournament_id: int
         :return: Tournament data object
         :rtype: TournamentInDBOutput
         """
+        cached = tournament_cache.get(tournament_id)
+        if cached is not None:
+            return cached
+        generation = tournament_cache.generation(tournament_id)
+        output = await self._fetch_tournament(tournament_id)
+        if self._cacheable(tournament_id):
+            tournament_cache.set(tournament_id, output, generation)
+        return output
+
+    async def get_current_tournament(self, tournament_id: int) -> TournamentInDBOutput:
+        """
+        Fetch a single tournament by ID from the primary, bypassing the tournament
+        cache.
+
+        :param tournament_id: ID of tournament to fetch
+        :type tournament_id: int
+        :return: Tournament data object
+        :rtype: TournamentInDBOutput
+        """
+        return await self._fetch_tournament(tournament_id)
+
+    async def _fetch_tournament(self, tournament_id: int) -> TournamentInDBOutput:
         try:
-            tournament = (
-                self.db.query(Tournament).filter(Tournament.id == tournament_id).first()
+            tournament = await self.db.scalar(
+                TOURNAMENT_BY_ID, {"tournament_id": tournament_id}
+            )
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            raise TournamentFetchError(
+                f"Failed to fetch tournament {tournament_id}: {str(e)}"
+            )
+        if not tournament:
+            raise TournamentNotFoundError(tournament_id)
+        return TournamentInDBOutput.model_validate(tournament)
+
+    def _cacheable(self, tournament_id: int) -> bool:
+        # A replica is assumed to catch up with a write within the time its writer
+        # is kept on the primary; until then its rows may predate the write.
+        if not read_from_replica(self.db):
+            return True
+        return not tournament_cache.invalidated_within(
+            tournament_id, DB_REPLICA_STICKY_SECONDS
+        )
+
+    @read_only
+    async def get_tournament_version(self, tournament_id: int) -> int:
+        """
+        Read the current version of a tournament and its roster, bypassing the
+        tournament cache.
+
+        :param tournament_id: ID of tournament
+        :type tournament_id: int
+        :return: Version of the tournament
+        :rtype: int
+        """
+        try:
+            version = await self.db.scalar(
+                TOURNAMENT_VERSION, {"tournament_id": tournament_id}
             )
-            if not tournament:
-                raise TournamentNotFoundError(tournament_id)
-            return TournamentInDBOutput.model_validate(tournament)
         except SQLAlchemyError as e:
-            self.db.rollback()
+            await self.db.rollback()
             raise TournamentFetchError(
                 f"Failed to fetch tournament {tournament_id}: {str(e)}"
             )
+        if version is None:
+            raise TournamentNotFoundError(tournament_id)
+        return version
 
-    def create_tournament(self, data: TournamentInDBInput) -> TournamentInDBOutput:
+    @read_only
+    async def get_capacities(self, tournament_ids: list[int]) -> list[TournamentCapacity]:
+        """
+        Fetch the seat counts of many tournaments.
+
+        Tournaments in the tournament cache are not read again; the others are read
+        with a single primary key lookup and cached, unless read from a replica
+        that may still lag behind a write.
+
+        :param tournament_ids: IDs of the tournaments, without duplicates
+        :type tournament_ids: list[int]
+        :return: Seat counts of the tournaments found, in the order of the IDs
+        :rtype: list[TournamentCapacity]
+        """
+        tournaments = {}
+        missing = []
+        for tournament_id in tournament_ids:
+            cached = tournament_cache.get(tournament_id)
+            if cached is None:
+                missing.append(tournament_id)
+            else:
+                tournaments[tournament_id] = cached
+        if missing:
+            generations = {
+                tournament_id: tournament_cache.generation(tournament_id)
+                for tournament_id in missing
+            }
+            try:
+                rows = await self.db.scalars(
+                    TOURNAMENTS_BY_IDS, {"tournament_ids": missing}
+                )
+            except SQLAlchemyError as e:
+                await self.db.rollback()
+                raise TournamentFetchError(
+                    f"Failed to fetch tournament capacities: {str(e)}"
+                )
+            for row in rows:
+                output = TournamentInDBOutput.model_validate(row)
+                if self._cacheable(output.id):
+                    tournament_cache.set(output.id, output, generations[output.id])
+                tournaments[output.id] = output
+        return [
+            TournamentCapacity(
+                id=tournament.id,
+                max_players=tournament.max_players,
+                registered_players=tournament.registered_players,
+                free_seats=max(tournament.max_players - tournament.registered_players, 0),
+            )
+            for tournament_id in tournament_ids
+            if (tournament := tournaments.get(tournament_id)) is not None
+        ]
+
+    async def create_tournament(
+        self, data: TournamentInDBInput
+    ) -> TournamentInDBOutput:
         """
         Create a new tournament.
 
@@ -76,17 +307,76 @@ class TournamentRepo:
                 name=data.name, max_players=data.max_players, start_at=data.start_at
             )
             self.db.add(new_tournament)
-            self.db.commit()
-            self.db.refresh(new_tournament)
+            await self.db.commit()
+            await self.db.refresh(new_tournament)
             return TournamentInDBOutput.model_validate(new_tournament)
-        except IntegrityError:
-            self.db.rollback()
-            raise TournamentNameExistsError(data.name)
+        except IntegrityError as e:
+            await self.db.rollback()
+            if _is_unique_violation(e):
+                raise TournamentNameExistsError(data.name)
+            raise TournamentCreationError(f"Failed to create tournament: {str(e)}")
         except SQLAlchemyError as e:
-            self.db.rollback()
+            await self.db.rollback()
             raise TournamentCreationError(f"Failed to create tournament: {str(e)}")
 
-    def update_tournament(
+    async def import_tournaments(
+        self, data: list[TournamentInDBInput], batch_size: int = IMPORT_BATCH_SIZE
+    ) -> TournamentImportOutput:
+        """
+        Insert or update many tournaments, matched on their unique name.
+
+        Rows are written with one multi-row INSERT ... ON CONFLICT (name) DO UPDATE
+        per batch and committed together, so an import either lands completely or
+        not at all. When a name appears more than once the last record wins. An
+        existing tournament is left untouched when the new max_players is below its
+        number of registered players.
+
+        :param data: Tournaments to import
+        :type data: list[TournamentInDBInput]
+        :param batch_size: Number of rows written per statement
+        :type batch_size: int
+        :return: IDs of created and updated tournaments and names of rejected ones
+        :rtype: TournamentImportOutput
+        """
+        records = {
+            tournament.name: {
+                "name": tournament.name,
+                "max_players": tournament.max_players,
+                "start_at": tournament.start_at,
+            }
+            for tournament in data
+        }
+        rows = list(records.values())
+        result = TournamentImportOutput()
+        try:
+            for start in range(0, len(rows), batch_size):
+                statement = pg_insert(Tournament).values(rows[start : start + batch_size])
+                statement = statement.on_conflict_do_update(
+                    index_elements=[Tournament.name],
+                    set_={
+                        "max_players": statement.excluded.max_players,
+                        "start_at": statement.excluded.start_at,
+                        "version": Tournament.version + 1,
+                    },
+                    where=Tournament.registered_count <= statement.excluded.max_players,
+                ).returning(
+                    Tournament.id,
+                    Tournament.name,
+                    # xmax is only zero on row versions created by an insert.
+                    literal_column("xmax = 0").label("inserted"),
+                )
+                for row in await self.db.execute(statement):
+                    (result.created if row.inserted else result.updated).append(row.id)
+                    del records[row.name]
+            await self.db.commit()
+        except SQLAlchemyError as e:
+            await self.db.rollback()
+            raise TournamentCreationError(f"Failed to import tournaments: {str(e)}")
+        tournament_cache.invalidate(*result.updated)
+        result.rejected = list(records)
+        return result
+
+    async def update_tournament(
         self, tournament_id: int, data: TournamentInDBInput
     ) -> TournamentInDBOutput:
         """
@@ -100,27 +390,35 @@ class TournamentRepo:
         :rtype: TournamentInDBOutput
         """
         try:
-            tournament = (
-                self.db.query(Tournament).filter(Tournament.id == tournament_id).first()
+            tournament = await self.db.get(
+                Tournament, tournament_id, with_for_update=True
             )
             if not tournament:
                 raise TournamentNotFoundError(tournament_id)
+            if data.max_players < tournament.registered_count:
+                raise TournamentCapacityError(
+                    tournament_id, tournament.registered_count
+                )
 
             tournament.name = data.name
             tournament.max_players = data.max_players
             tournament.start_at = data.start_at
+            tournament.version += 1
 
-            self.db.commit()
-            self.db.refresh(tournament)
+            await self.db.commit()
+            tournament_cache.invalidate(tournament_id)
+            await self.db.refresh(tournament)
             return TournamentInDBOutput.model_validate(tournament)
-        except IntegrityError:
-            self.db.rollback()
-            raise TournamentNameExistsError(data.name)
+        except IntegrityError as e:
+            await self.db.rollback()
+            if _is_unique_violation(e):
+                raise TournamentNameExistsError(data.name)
+            raise TournamentUpdateError(f"Failed to update tournament: {str(e)}")
         except SQLAlchemyError as e:
-            self.db.rollback()
+            await self.db.rollback()
             raise TournamentUpdateError(f"Failed to update tournament: {str(e)}")
 
-    def delete_tournament(self, tournament_id: int) -> bool:
+    async def delete_tournament(self, tournament_id: int) -> bool:
         """
         Delete a tournament.
 
@@ -130,15 +428,14 @@ class TournamentRepo:
         :rtype: bool
         """
         try:
-            tournament = (
-                self.db.query(Tournament).filter(Tournament.id == tournament_id).first()
-            )
+            tournament = await self.db.get(Tournament, tournament_id)
             if not tournament:
                 raise TournamentNotFoundError(tournament_id)
 
-            self.db.delete(tournament)
-            self.db.commit()
+            await self.db.delete(tournament)
+            await self.db.commit()
+            tournament_cache.invalidate(tournament_id)
             return True
         except SQLAlchemyError as e:
-            self.db.rollback()
+            await self.db.rollback()
             raise TournamentDeletionError(f"Failed to delete tournament: {str(e)}")
@@ -1,12 +1,26 @@
-from pydantic import BaseModel, ConfigDict, field_serializer
+from typing import Annotated
+
+from pydantic import BaseModel, ConfigDict, PlainSerializer
 from datetime import datetime, timezone
 
 
+def to_utc_string(value: datetime) -> str:
+    return value.astimezone(timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+def to_naive_utc(value: datetime | None) -> datetime | None:
+    # Timestamps are stored in TIMESTAMP WITHOUT TIME ZONE columns, which asyncpg
+    # only accepts naive values for.
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+# Datetimes are always rendered in UTC with a "Z" suffix. The serializer is bound
+# to the datetime fields only, so every other field keeps pydantic's compiled
+# serialization instead of going through Python.
+UTCDatetime = Annotated[datetime, PlainSerializer(to_utc_string, return_type=str)]
+
+
 class UTCBaseModel(BaseModel):
     model_config = ConfigDict(from_attributes=True)
-
-    @field_serializer("*")
-    def serialize_datetime(self, value: any, _info):
-        if isinstance(value, datetime):
-            return value.astimezone(timezone.utc).isoformat().replace("+00:00", "Z")
-        return value
\ No newline at end of file
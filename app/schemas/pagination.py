@@ -0,0 +1,63 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import Any, Generic, TypeVar
+
+from app.exceptions.pagination import InvalidCursorError
+from app.schemas.common import UTCBaseModel
+
+T = TypeVar("T")
+
+
+class Page(UTCBaseModel, Generic[T]):
+    items: list[T]
+    next_cursor: str | None = None
+
+
+def encode_cursor(*values: Any) -> str:
+    """
+    Encodes the sort key of the last row on a page into an opaque cursor.
+
+    :param values: Sort key values, in ORDER BY order.
+    :type values: Any
+
+    :return: URL-safe cursor string.
+    :rtype: str
+    """
+    payload = json.dumps(
+        [
+            value.isoformat() if isinstance(value, datetime) else value
+            for value in values
+        ],
+        separators=(",", ":"),
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, *types: type) -> tuple[Any, ...]:
+    """
+    Decodes a cursor produced by encode_cursor back into typed sort key values.
+
+    :param cursor: Cursor received from the client.
+    :type cursor: str
+
+    :param types: Expected type of each value (int, str or datetime).
+    :type types: type
+
+    :return: Sort key values.
+    :rtype: tuple[Any, ...]
+
+    :raises InvalidCursorError: If the cursor cannot be decoded.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError(cursor)
+        return tuple(
+            datetime.fromisoformat(value) if type_ is datetime else type_(value)
+            for value, type_ in zip(values, types, strict=True)
+        )
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError):
+        raise InvalidCursorError(cursor)
@@ -1,7 +1,7 @@
-from datetime import datetime
+from typing import Literal
 from pydantic import ConfigDict
 
-from app.schemas.common import UTCBaseModel
+from app.schemas.common import UTCBaseModel, UTCDatetime
 
 
 class PlayerInRequest(UTCBaseModel):
@@ -19,6 +19,12 @@ class PlayerInDBOutput(UTCBaseModel):
     name: str
     email: str
     tournament_id: int
-    registered_at: datetime
+    registered_at: UTCDatetime
 
-    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+
+
+class PlayerRegistrationResult(UTCBaseModel):
+    email: str
+    status: Literal["registered", "duplicate", "full"]
+    player: PlayerInDBOutput | None = None
@@ -1,26 +1,64 @@
 from datetime import datetime
-from pydantic import BaseModel, ConfigDict, computed_field
+from typing import Literal
 
-from app.schemas.common import UTCBaseModel
-from app.services.player import get_players_count_by_tournament
+from pydantic import AliasChoices, ConfigDict, Field, field_validator
+
+from app.schemas.common import UTCBaseModel, UTCDatetime, to_naive_utc
+
+# "-start_at" lists the latest tournaments first.
+TournamentSort = Literal["id", "start_at", "-start_at", "name"]
 
 
 class TournamentInDBInput(UTCBaseModel):
     name: str
-    max_players: int
-    start_at: datetime
+    max_players: int = Field(ge=0)
+    start_at: UTCDatetime
+
+    @field_validator("start_at")
+    @classmethod
+    def to_naive_utc(cls, value: datetime) -> datetime:
+        return to_naive_utc(value)
 
 
 class TournamentInDBOutput(UTCBaseModel):
     id: int
     name: str
     max_players: int
-    start_at: datetime
-    created_at: datetime
+    start_at: UTCDatetime
+    created_at: UTCDatetime
+    registered_players: int = Field(
+        default=0,
+        validation_alias=AliasChoices("registered_players", "registered_count"),
+    )
+    version: int = Field(default=0, exclude=True)
 
     model_config = ConfigDict(from_attributes=True)
 
-    @computed_field
-    def registered_players(self) -> int:
-        players_count = get_players_count_by_tournament(self.id)
-        return players_count
\ No newline at end of file
+
+class TournamentCapacity(UTCBaseModel):
+    id: int
+    max_players: int
+    registered_players: int
+    free_seats: int
+
+
+class TournamentImportOutput(UTCBaseModel):
+    created: list[int] = []
+    updated: list[int] = []
+    rejected: list[str] = []
+
+
+class TournamentFilters(UTCBaseModel):
+    # start_at range, from inclusive and before exclusive
+    starts_from: datetime | None = None
+    starts_before: datetime | None = None
+    # Case-insensitive substring and prefix of the name
+    name: str | None = Field(default=None, min_length=1)
+    name_prefix: str | None = Field(default=None, min_length=1)
+    has_free_seats: bool | None = None
+    sort: TournamentSort = "id"
+
+    @field_validator("starts_from", "starts_before")
+    @classmethod
+    def to_naive_utc(cls, value: datetime | None) -> datetime | None:
+        return to_naive_utc(value)
@@ -1,4 +1,10 @@
+import csv
+import io
+from collections import Counter
+from typing import AsyncIterator
+
 from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.exceptions.player import (
     PlayerEmailExistsError,
     PlayerCreationError,
@@ -6,102 +12,297 @@ from app.exceptions.player import (
     PlayerFetchError,
     PlayerUpdateError,
     PlayerDeletionError,
+    TournamentPlayerLimitError,
 )
+from app.config import PAGE_SIZE_DEFAULT
+from app.exceptions.pagination import InvalidCursorError
+from app.db import SessionLocal, mark_written
+from app.metrics import REGISTRATIONS
+from app.exceptions.tournament import TournamentBaseException, TournamentNotFoundError
 from app.repositories.player import PlayerRepo
-from app.schemas.player import PlayerInDBInput, PlayerInDBOutput
+from app.repositories.tournament import TournamentRepo
+from app.services import registration
+from app.schemas.pagination import Page
+from app.schemas.player import (
+    PlayerInDBInput,
+    PlayerInDBOutput,
+    PlayerInRequest,
+    PlayerRegistrationResult,
+)
+
+EXPORT_FIELDS = list(PlayerInDBOutput.model_fields)
+# Registration metric outcome of each bulk registration status.
+REGISTRATION_OUTCOMES = {"registered": "success", "full": "full", "duplicate": "duplicate"}
 
 
-def create_player(data: PlayerInDBInput) -> PlayerInDBOutput:
+async def create_player(
+    db: AsyncSession, data: PlayerInDBInput
+) -> PlayerInDBOutput:
     """
     Creates new player on the database.
 
+    :param db: Database session of the current request.
+    :type db: AsyncSession
+
     :param data: Player data.
     :type data: PlayerInDBInput
 
     :return: New player data.
     :rtype: PlayerInDBOutput
     """
-    player_repo = PlayerRepo()
+    coalescer = registration.registration_coalescer
     try:
-        new_player = player_repo.create_player(data)
+        if coalescer is not None:
+            new_player = await coalescer.register(data)
+            mark_written(db)
+        else:
+            new_player = await PlayerRepo(db).create_player(data)
+        REGISTRATIONS.labels("success").inc()
         return new_player
+    except TournamentNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except TournamentPlayerLimitError as e:
+        REGISTRATIONS.labels("full").inc()
+        raise HTTPException(status_code=409, detail=str(e))
     except PlayerEmailExistsError as e:
+        REGISTRATIONS.labels("duplicate").inc()
         raise HTTPException(status_code=409, detail=str(e))
     except PlayerCreationError as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-def get_player(player_id: int) -> PlayerInDBOutput:
+async def register_players(
+    db: AsyncSession, tournament_id: int, players: list[PlayerInRequest]
+) -> list[PlayerRegistrationResult]:
+    """
+    Registers a batch of players in a tournament.
+
+    :param db: Database session of the current request.
+    :type db: AsyncSession
+
+    :param tournament_id: Tournament ID.
+    :type tournament_id: int
+
+    :param players: Players to register, in order of priority.
+    :type players: list[PlayerInRequest]
+
+    :return: Outcome for each player, in request order.
+    :rtype: list[PlayerRegistrationResult]
+    """
+    player_repo = PlayerRepo(db)
+    try:
+        results = await player_repo.register_players(tournament_id, players)
+        for status, total in Counter(result.status for result in results).items():
+            REGISTRATIONS.labels(REGISTRATION_OUTCOMES[status]).inc(total)
+        return results
+    except TournamentNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except PlayerCreationError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+async def get_player(db: AsyncSession, player_id: int) -> PlayerInDBOutput:
     """
     Fetches single player based on player_id.
 
+    :param db: Database session of the current request.
+    :type db: AsyncSession
+
     :param player_id: Player ID.
     :type player_id: int
 
     :return: Player data.
     :rtype: PlayerInDBOutput
     """
-    player_repo = PlayerRepo()
+    player_repo = PlayerRepo(db)
     try:
-        return player_repo.get_player(player_id)
+        return await player_repo.get_player(player_id)
     except PlayerNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except PlayerFetchError as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-def get_players() -> list[PlayerInDBOutput]:
+async def get_players(db: AsyncSession) -> list[PlayerInDBOutput]:
     """
     Fetches the list of players from the database.
 
+    :param db: Database session of the current request.
+    :type db: AsyncSession
+
     :return: List of players.
     :rtype: list[PlayerInDBOutput]
     """
-    player_repo = PlayerRepo()
+    player_repo = PlayerRepo(db)
     try:
-        return player_repo.get_players()
+        return await player_repo.get_players()
     except PlayerFetchError as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-def get_players_by_tournament(tournament_id: int) -> list[PlayerInDBOutput]:
+async def get_players_by_tournament(
+    db: AsyncSession,
+    tournament_id: int,
+    limit: int = PAGE_SIZE_DEFAULT,
+    cursor: str | None = None,
+) -> Page[PlayerInDBOutput]:
     """
-    Fetches the list of players based on tournament_id.
+    Fetches one page of players based on tournament_id.
+
+    :param db: Database session of the current request.
+    :type db: AsyncSession
 
     :param tournament_id: Tournament ID.
     :type tournament_id: int
 
-    :return: List of players.
-    :rtype: list[PlayerInDBOutput]
+    :param limit: Maximum number of players on the page.
+    :type limit: int
+
+    :param cursor: Cursor of the previous page, if any.
+    :type cursor: str | None
+
+    :return: Page of players.
+    :rtype: Page[PlayerInDBOutput]
+    """
+    player_repo = PlayerRepo(db)
+    try:
+        return await player_repo.get_players_by_tournament(
+            tournament_id, limit, cursor
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except PlayerFetchError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+async def get_roster_page(
+    db: AsyncSession,
+    tournament_id: int,
+    limit: int = PAGE_SIZE_DEFAULT,
+    cursor: str | None = None,
+) -> tuple[int, Page[PlayerInDBOutput]]:
+    """
+    Fetches one page of players based on tournament_id, with the tournament
+    version it was read at.
+
+    :param db: Database session of the current request.
+    :type db: AsyncSession
+
+    :param tournament_id: Tournament ID.
+    :type tournament_id: int
+
+    :param limit: Maximum number of players on the page.
+    :type limit: int
+
+    :param cursor: Cursor of the previous page, if any.
+    :type cursor: str | None
+
+    :return: Tournament version and page of players.
+    :rtype: tuple[int, Page[PlayerInDBOutput]]
     """
-    player_repo = PlayerRepo()
+    player_repo = PlayerRepo(db)
     try:
-        return player_repo.get_players_by_tournament(tournament_id)
+        return await player_repo.get_roster_page(tournament_id, limit, cursor)
+    except TournamentNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except PlayerFetchError as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-def get_players_count_by_tournament(tournament_id: int) -> int:
+async def export_players_by_tournament(
+    db: AsyncSession, tournament_id: int, export_format: str = "ndjson"
+) -> AsyncIterator[str]:
+    """
+    Prepares a streamed export of every player in a tournament.
+
+    The tournament is looked up with the request session so a missing tournament
+    is reported before the response starts. The rows are then streamed with a
+    session of their own, because the request session is closed as soon as the
+    route returns its streaming response.
+
+    :param db: Database session of the current request.
+    :type db: AsyncSession
+
+    :param tournament_id: Tournament ID.
+    :type tournament_id: int
+
+    :param export_format: Either "ndjson" or "csv".
+    :type export_format: str
+
+    :return: Chunks of the encoded roster.
+    :rtype: AsyncIterator[str]
+    """
+    try:
+        await TournamentRepo(db).get_tournament(tournament_id)
+    except TournamentNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except TournamentBaseException as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return _export_chunks(tournament_id, export_format)
+
+
+async def _export_chunks(tournament_id: int, export_format: str) -> AsyncIterator[str]:
+    """
+    Encodes the roster of a tournament batch by batch.
+
+    :param tournament_id: Tournament ID.
+    :type tournament_id: int
+
+    :param export_format: Either "ndjson" or "csv".
+    :type export_format: str
+
+    :return: Chunks of the encoded roster.
+    :rtype: AsyncIterator[str]
+    """
+    async with SessionLocal() as db:
+        batches = PlayerRepo(db).stream_players_by_tournament(tournament_id)
+        if export_format == "csv":
+            buffer = io.StringIO()
+            writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+            writer.writeheader()
+            async for players in batches:
+                writer.writerows(player.model_dump(mode="json") for player in players)
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        else:
+            async for players in batches:
+                yield "".join(player.model_dump_json() + "\n" for player in players)
+
+
+async def get_players_count_by_tournament(
+    db: AsyncSession, tournament_id: int
+) -> int:
     """
     Fetches the number of registered players in a tournament.
 
+    :param db: Database session of the current request.
+    :type db: AsyncSession
+
     :param tournament_id: Tournament ID.
     :type tournament_id: int
 
     :return: Number of registered players.
     :rtype: int
     """
-    player_repo = PlayerRepo()
+    player_repo = PlayerRepo(db)
     try:
-        return player_repo.get_players_count_by_tournament(tournament_id)
+        return await player_repo.get_players_count_by_tournament(tournament_id)
     except PlayerFetchError as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-def update_player(player_id: int, data: PlayerInDBInput) -> PlayerInDBOutput:
+async def update_player(
+    db: AsyncSession, player_id: int, data: PlayerInDBInput
+) -> PlayerInDBOutput:
     """
     Updates the player data based on player_id.
 
+    :param db: Database session of the current request.
+    :type db: AsyncSession
+
     :param player_id: Player ID.
     :type player_id: int
 
@@ -111,31 +312,34 @@ def update_player(player_id: int, data: PlayerInDBInput) -> PlayerInDBOutput:
     :return: Updated player data.
     :rtype: PlayerInDBOutput
     """
-    player_repo = PlayerRepo()
+    player_repo = PlayerRepo(db)
     try:
-        updated_player = player_repo.update_player(player_id, data)
+        updated_player = await player_repo.update_player(player_id, data)
         return updated_player
-    except PlayerNotFoundError as e:
+    except (PlayerNotFoundError, TournamentNotFoundError) as e:
         raise HTTPException(status_code=404, detail=str(e))
-    except PlayerEmailExistsError as e:
+    except (PlayerEmailExistsError, TournamentPlayerLimitError) as e:
         raise HTTPException(status_code=409, detail=str(e))
     except PlayerUpdateError as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-def delete_player(player_id: int) -> bool:
+async def delete_player(db: AsyncSession, player_id: int) -> bool:
     """
     Deletes a player based on player_id.
 
+    :param db: Database session of the current request.
+    :type db: AsyncSession
+
     :param player_id: Player ID.
     :type player_id: int
 
     :return: True if the player was deleted successfully, False otherwise.
     :rtype: bool
     """
-    player_repo = PlayerRepo()
+    player_repo = PlayerRepo(db)
     try:
-        return player_repo.delete_player(player_id)
+        return await player_repo.delete_player(player_id)
     except PlayerNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except PlayerDeletionError as e:
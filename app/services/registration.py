@@ -0,0 +1,141 @@
+import asyncio
+from contextvars import Context
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.config import (
+    REGISTRATION_COALESCE_MAX_BATCH,
+    REGISTRATION_COALESCE_WINDOW,
+    REGISTRATION_COALESCING,
+)
+from app.db import SessionLocal
+from app.exceptions.player import (
+    PlayerCreationError,
+    PlayerEmailExistsError,
+    TournamentPlayerLimitError,
+)
+from app.exceptions.tournament import TournamentNotFoundError
+from app.repositories.player import PlayerRepo
+from app.schemas.player import PlayerInDBInput, PlayerInDBOutput, PlayerInRequest
+
+Pending = list[tuple[PlayerInRequest, asyncio.Future]]
+
+
+class RegistrationCoalescer:
+    def __init__(
+        self,
+        session_factory: async_sessionmaker[AsyncSession],
+        window: float,
+        max_batch: int,
+    ):
+        """
+        Group concurrent registrations per tournament into bulk registrations.
+
+        The first registration for a tournament opens a group that collects every
+        registration arriving within ``window`` seconds (or until ``max_batch`` are
+        waiting). The group is then written with one capacity check and one
+        multi-row insert, and each caller gets the outcome it would have had on its
+        own: its player, or the same error a single registration raises. Seats go
+        to callers in arrival order.
+
+        :param session_factory: Factory of the sessions groups are written with
+        :type session_factory: async_sessionmaker[AsyncSession]
+        :param window: Seconds a group stays open
+        :type window: float
+        :param max_batch: Registrations that close a group early
+        :type max_batch: int
+        """
+        self.session_factory = session_factory
+        self.window = window
+        self.max_batch = max_batch
+        self._groups: dict[int, Pending] = {}
+        self._writes: set[asyncio.Task] = set()
+
+    async def register(self, data: PlayerInDBInput) -> PlayerInDBOutput:
+        """
+        Register a player as part of the tournament's current group.
+
+        :param data: Player data
+        :type data: PlayerInDBInput
+        :return: Created player
+        :rtype: PlayerInDBOutput
+        :raises: TournamentNotFoundError if tournament does not exist
+        :raises: TournamentPlayerLimitError if tournament is full
+        :raises: PlayerEmailExistsError if the email is already registered
+        :raises: PlayerCreationError if the group could not be written
+        """
+        future = asyncio.get_running_loop().create_future()
+        group = self._groups.get(data.tournament_id)
+        if group is None:
+            group = self._groups[data.tournament_id] = []
+            self._spawn(self._write_after_window(data.tournament_id, group))
+        group.append((PlayerInRequest(name=data.name, email=data.email), future))
+        if len(group) >= self.max_batch and self._close(data.tournament_id, group):
+            self._spawn(self._write(data.tournament_id, group))
+        return await future
+
+    def _spawn(self, coroutine) -> None:
+        # Writes run in an empty context so their statements are not counted
+        # against the request that happened to open the group.
+        task = asyncio.create_task(coroutine, context=Context())
+        self._writes.add(task)
+        task.add_done_callback(self._writes.discard)
+
+    def _close(self, tournament_id: int, group: Pending) -> bool:
+        if self._groups.get(tournament_id) is not group:
+            return False
+        del self._groups[tournament_id]
+        return True
+
+    async def _write_after_window(self, tournament_id: int, group: Pending) -> None:
+        await asyncio.sleep(self.window)
+        if self._close(tournament_id, group):
+            await self._write(tournament_id, group)
+
+    async def _write(self, tournament_id: int, group: Pending) -> None:
+        # Takes no admission slot: the waiting registrations hold theirs without
+        # using a connection, and ADMISSION_POOL_HEADROOM covers the rest.
+        try:
+            async with self.session_factory() as db:
+                results = await PlayerRepo(db).register_players(
+                    tournament_id, [player for player, _ in group]
+                )
+        except TournamentNotFoundError as e:
+            outcomes = [e] * len(group)
+        except Exception as e:
+            outcomes = [PlayerCreationError(f"Failed to create player: {str(e)}")]
+            outcomes *= len(group)
+        else:
+            outcomes = []
+            for result in results:
+                if result.status == "registered":
+                    outcomes.append(result.player)
+                elif result.status == "duplicate":
+                    outcomes.append(PlayerEmailExistsError(result.email, tournament_id))
+                else:
+                    outcomes.append(TournamentPlayerLimitError(tournament_id))
+
+        if len(outcomes) != len(group):
+            # Never leave a registration waiting on an outcome that did not come.
+            outcomes = [
+                PlayerCreationError(
+                    f"Failed to create player: got {len(outcomes)} results "
+                    f"for {len(group)} registrations"
+                )
+            ] * len(group)
+        for (_, future), outcome in zip(group, outcomes, strict=True):
+            if future.done():
+                continue
+            if isinstance(outcome, Exception):
+                future.set_exception(outcome)
+            else:
+                future.set_result(outcome)
+
+
+registration_coalescer = (
+    RegistrationCoalescer(
+        SessionLocal, REGISTRATION_COALESCE_WINDOW, REGISTRATION_COALESCE_MAX_BATCH
+    )
+    if REGISTRATION_COALESCING
+    else None
+)
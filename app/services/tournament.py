@@ -1,7 +1,18 @@
 from fastapi import HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config import PAGE_SIZE_DEFAULT
+from app.events import SeatSubscription, seat_broadcaster
+from app.exceptions.pagination import InvalidCursorError
 from app.repositories.tournament import TournamentRepo
-from app.schemas.tournament import TournamentInDBOutput, TournamentInDBInput
+from app.schemas.pagination import Page
+from app.schemas.tournament import (
+    TournamentCapacity,
+    TournamentFilters,
+    TournamentImportOutput,
+    TournamentInDBOutput,
+    TournamentInDBInput,
+)
 from app.exceptions.tournament import (
     TournamentBaseException,
     TournamentFetchError,
@@ -10,22 +21,29 @@ from app.exceptions.tournament import (
     TournamentUpdateError,
     TournamentDeletionError,
     TournamentNameExistsError,
+    TournamentCapacityError,
+    TournamentSeatFeedError,
 )
 
 
-def create_tournament(data: TournamentInDBInput) -> TournamentInDBOutput:
+async def create_tournament(
+    db: AsyncSession, data: TournamentInDBInput
+) -> TournamentInDBOutput:
     """
     This service creates a new tournament in the database and returns tournament data.
 
+    :param db: Database session of the current request.
+    :type db: AsyncSession
+
     :param data: Input data for the new tournament.
     :type data: TournamentInDBInput
 
     :return: Tournament data for the newly created tournament.
     :rtype: TournamentInDBOutput
     """
-    tournament_repo = TournamentRepo()
+    tournament_repo = TournamentRepo(db)
     try:
-        tournament = tournament_repo.create_tournament(data)
+        tournament = await tournament_repo.create_tournament(data)
         return tournament
     except TournamentNameExistsError as e:
         raise HTTPException(status_code=409, detail=str(e))
@@ -35,19 +53,46 @@ def create_tournament(data: TournamentInDBInput) -> TournamentInDBOutput:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-def get_tournament(tournament_id: int) -> TournamentInDBOutput:
+async def import_tournaments(
+    db: AsyncSession, data: list[TournamentInDBInput]
+) -> TournamentImportOutput:
+    """
+    This service inserts or updates many tournaments at once, matched on their name.
+
+    :param db: Database session of the current request.
+    :type db: AsyncSession
+
+    :param data: Tournaments to import.
+    :type data: list[TournamentInDBInput]
+
+    :return: IDs of created and updated tournaments and names of rejected ones.
+    :rtype: TournamentImportOutput
+    """
+    tournament_repo = TournamentRepo(db)
+    try:
+        return await tournament_repo.import_tournaments(data)
+    except TournamentBaseException as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+async def get_tournament(
+    db: AsyncSession, tournament_id: int
+) -> TournamentInDBOutput:
     """
     Fetches a tournament from the database by its ID and handles exceptions.
 
+    :param db: Database session of the current request.
+    :type db: AsyncSession
+
     :param tournament_id: The ID of the tournament to fetch.
     :type tournament_id: int
 
     :return: The fetched tournament data.
     :rtype: TournamentInDBOutput
     """
-    tournament_repo = TournamentRepo()
+    tournament_repo = TournamentRepo(db)
     try:
-        tournament = tournament_repo.get_tournament(tournament_id)
+        tournament = await tournament_repo.get_tournament(tournament_id)
         return tournament
     except TournamentNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
@@ -57,29 +102,132 @@ def get_tournament(tournament_id: int) -> TournamentInDBOutput:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-def get_tournaments() -> list[TournamentInDBOutput]:
+async def get_tournament_version(db: AsyncSession, tournament_id: int) -> int:
+    """
+    Fetches the current version of a tournament, bypassing the tournament cache.
+
+    :param db: Database session of the current request.
+    :type db: AsyncSession
+
+    :param tournament_id: The ID of the tournament.
+    :type tournament_id: int
+
+    :return: The version of the tournament.
+    :rtype: int
+    """
+    tournament_repo = TournamentRepo(db)
+    try:
+        return await tournament_repo.get_tournament_version(tournament_id)
+    except TournamentNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except TournamentFetchError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+async def get_tournament_capacities(
+    db: AsyncSession, tournament_ids: list[int]
+) -> list[TournamentCapacity]:
+    """
+    Fetches the seat counts of many tournaments at once and handles exceptions.
+
+    :param db: Database session of the current request.
+    :type db: AsyncSession
+
+    :param tournament_ids: The IDs of the tournaments, without duplicates.
+    :type tournament_ids: list[int]
+
+    :return: Seat counts of the tournaments found, in the order of the IDs.
+    :rtype: list[TournamentCapacity]
+    """
+    tournament_repo = TournamentRepo(db)
+    try:
+        return await tournament_repo.get_capacities(tournament_ids)
+    except TournamentBaseException as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+async def subscribe_to_seats(
+    db: AsyncSession, tournament_id: int
+) -> tuple[TournamentInDBOutput, SeatSubscription]:
+    """
+    Subscribes to the seat counts of a tournament and fetches its current state.
+
+    The subscription is made first, so no change committed after the fetch is missed.
+    The fetch reads the primary past the tournament cache, as changes committed
+    by other workers before this process listened may not have reached it yet.
+
+    :param db: Database session of the current request.
+    :type db: AsyncSession
+
+    :param tournament_id: The ID of the tournament to follow.
+    :type tournament_id: int
+
+    :return: The tournament and the subscription to its seat counts.
+    :rtype: tuple[TournamentInDBOutput, SeatSubscription]
+    """
+    try:
+        subscription = await seat_broadcaster.subscribe(tournament_id)
+    except TournamentSeatFeedError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    try:
+        tournament = await TournamentRepo(db).get_current_tournament(tournament_id)
+    except TournamentNotFoundError as e:
+        subscription.close()
+        raise HTTPException(status_code=404, detail=str(e))
+    except TournamentBaseException as e:
+        subscription.close()
+        raise HTTPException(status_code=500, detail=str(e))
+    except BaseException:
+        subscription.close()
+        raise
+    return tournament, subscription
+
+
+async def get_tournaments(
+    db: AsyncSession,
+    limit: int = PAGE_SIZE_DEFAULT,
+    cursor: str | None = None,
+    filters: TournamentFilters | None = None,
+) -> Page[TournamentInDBOutput]:
     """
-    Fetches a list of tournaments from the repository.
+    Fetches one page of tournaments from the repository.
 
-    :return: A list of tournament data.
-    :rtype: list[TournamentInDBOutput]
+    :param db: Database session of the current request.
+    :type db: AsyncSession
+
+    :param limit: Maximum number of tournaments on the page.
+    :type limit: int
+
+    :param cursor: Cursor of the previous page, if any.
+    :type cursor: str | None
+
+    :param filters: Filters and sort order of the tournaments, if any.
+    :type filters: TournamentFilters | None
+
+    :return: A page of tournament data.
+    :rtype: Page[TournamentInDBOutput]
     """
-    tournament_repo = TournamentRepo()
+    tournament_repo = TournamentRepo(db)
     try:
-        tournaments = tournament_repo.get_tournaments()
+        tournaments = await tournament_repo.get_tournaments(limit, cursor, filters)
         return tournaments
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except TournamentFetchError as e:
         raise HTTPException(status_code=500, detail=str(e))
     except TournamentBaseException as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-def update_tournament(
-    tournament_id: int, data: TournamentInDBInput
+async def update_tournament(
+    db: AsyncSession, tournament_id: int, data: TournamentInDBInput
 ) -> TournamentInDBOutput:
     """
     Updated the existing tournament data on the database.
 
+    :param db: Database session of the current request.
+    :type db: AsyncSession
+
     :param tournament_id: The ID of the tournament to update.
     :type tournament_id: int
 
@@ -89,13 +237,15 @@ def update_tournament(
     :return: The updated tournament data.
     :rtype: TournamentInDBOutput
     """
-    tournament_repo = TournamentRepo()
+    tournament_repo = TournamentRepo(db)
     try:
-        updated_tournament = tournament_repo.update_tournament(tournament_id, data)
+        updated_tournament = await tournament_repo.update_tournament(
+            tournament_id, data
+        )
         return updated_tournament
     except TournamentNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
-    except TournamentNameExistsError as e:
+    except (TournamentNameExistsError, TournamentCapacityError) as e:
         raise HTTPException(status_code=409, detail=str(e))
     except TournamentUpdateError as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -103,19 +253,22 @@ def update_tournament(
         raise HTTPException(status_code=500, detail=str(e))
 
 
-def delete_tournament(tournament_id: int) -> bool:
+async def delete_tournament(db: AsyncSession, tournament_id: int) -> bool:
     """
     Deletes a tournament from the database.
 
+    :param db: Database session of the current request.
+    :type db: AsyncSession
+
     :param tournament_id: The ID of the tournament to delete.
     :type tournament_id: int
 
     :return: True if the tournament was deleted successfully, False otherwise.
     :rtype: bool
     """
-    tournament_repo = TournamentRepo()
+    tournament_repo = TournamentRepo(db)
     try:
-        return tournament_repo.delete_tournament(tournament_id)
+        return await tournament_repo.delete_tournament(tournament_id)
     except TournamentNotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
     except TournamentDeletionError as e:
@@ -0,0 +1,362 @@
+"""
+Load benchmark for the HTTP API.
+
+Seeds the benchmark database, drives ``app.main`` in-process through httpx with
+many concurrent clients and reports throughput and latency percentiles per
+scenario. Results can be saved as a baseline and later runs compared against it:
+
+    python -m benchmarks.run --save-baseline benchmarks/baseline.json
+    python -m benchmarks.run --compare benchmarks/baseline.json
+
+The benchmark database is wiped on every run. It defaults to DATABASE_TEST_URL
+and can be pointed elsewhere with BENCHMARK_DATABASE_URL.
+
+Before the scenarios, a fresh interpreter imports ``app.main`` and runs its
+startup against the benchmark database, the way a new worker would, and the
+import and startup times are reported with the scenarios.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from itertools import count
+from pathlib import Path
+from typing import Awaitable, Callable
+
+from httpx import ASGITransport, AsyncClient, Response
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.admission import db_limiter
+from app.cache import tournament_cache
+from app.config import (
+    DATABASE_TEST_URL,
+    DATABASE_URL,
+    DB_POOL_PREWARM,
+    _to_async_url,
+)
+from app.db import get_db
+from app.main import app
+from app.services.registration import registration_coalescer
+from benchmarks.seed import seed
+
+BENCHMARK_DATABASE_URL = os.getenv("BENCHMARK_DATABASE_URL", DATABASE_TEST_URL)
+
+Request = Callable[[AsyncClient, int], Awaitable[Response]]
+
+STARTUP_SCRIPT = """
+import asyncio, json, time
+started = time.perf_counter()
+from app.main import app
+imported = time.perf_counter()
+
+async def start():
+    async with app.router.lifespan_context(app):
+        return time.perf_counter()
+
+ready = asyncio.run(start())
+print(json.dumps({"import": imported - started, "startup": ready - imported}))
+"""
+
+
+@dataclass
+class ScenarioResult:
+    requests: int
+    errors: int
+    throughput: float
+    p50: float
+    p95: float
+    p99: float
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    """
+    Nearest-rank percentile of an already sorted list.
+
+    :param sorted_values: Samples in ascending order
+    :type sorted_values: list[float]
+    :param fraction: Percentile as a fraction, e.g. 0.95
+    :type fraction: float
+    :return: Sample at the percentile, 0.0 for an empty list
+    :rtype: float
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(fraction * len(sorted_values)), 1)
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def measure_startup(database_url: str) -> dict[str, float]:
+    """
+    Import the app and run its startup in a fresh interpreter, as a new worker does.
+
+    :param database_url: Database the app connects to and prewarms its pool with
+    :type database_url: str
+    :return: Seconds spent importing ``app.main`` and running its startup
+    :rtype: dict[str, float]
+    """
+    env = {**os.environ, "DATABASE_URL": database_url, "DATABASE_REPLICA_URLS": ""}
+    completed = subprocess.run(
+        [sys.executable, "-c", STARTUP_SCRIPT],
+        cwd=Path(__file__).resolve().parent.parent,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(completed.stdout.splitlines()[-1])
+
+
+def build_scenarios(tournament_ids: list[int]) -> dict[str, Request]:
+    """
+    Build the request of every scenario; each call sends one request.
+
+    :param tournament_ids: IDs of the seeded tournaments
+    :type tournament_ids: list[int]
+    :return: Request function per scenario name
+    :rtype: dict[str, Request]
+    """
+    emails = count()
+
+    def pick() -> int:
+        return random.choice(tournament_ids)
+
+    async def list_tournaments(client: AsyncClient, _: int) -> Response:
+        return await client.get("/tournaments", params={"limit": 50})
+
+    async def list_players(client: AsyncClient, _: int) -> Response:
+        return await client.get(f"/tournaments/{pick()}/players", params={"limit": 50})
+
+    async def get_tournament(client: AsyncClient, _: int) -> Response:
+        return await client.get(f"/tournaments/{pick()}")
+
+    async def register(client: AsyncClient, _: int) -> Response:
+        number = next(emails)
+        return await client.post(
+            f"/tournaments/{pick()}/register",
+            json={"name": f"Player {number}", "email": f"load{number}@example.com"},
+        )
+
+    async def update(client: AsyncClient, i: int) -> Response:
+        # Seeded names follow the position of the ID, so updates keep them unique.
+        position = random.randrange(len(tournament_ids))
+        return await client.put(
+            f"/tournaments/{tournament_ids[position]}",
+            json={
+                "name": f"Benchmark Tournament {position}",
+                "max_players": 100_000,
+                "start_at": (datetime(2030, 1, 1) + timedelta(minutes=i)).isoformat(),
+            },
+        )
+
+    return {
+        "list": list_tournaments,
+        "roster": list_players,
+        "get": get_tournament,
+        "register": register,
+        "update": update,
+    }
+
+
+async def run_scenario(
+    client: AsyncClient, request: Request, requests: int, concurrency: int
+) -> ScenarioResult:
+    """
+    Send ``requests`` requests from ``concurrency`` clients and time each one.
+
+    :param client: HTTP client bound to the app
+    :type client: AsyncClient
+    :param request: Request function of the scenario
+    :type request: Request
+    :param requests: Total number of requests to send
+    :type requests: int
+    :param concurrency: Number of clients sending requests at the same time
+    :type concurrency: int
+    :return: Throughput and latency of the scenario
+    :rtype: ScenarioResult
+    """
+    numbers = iter(range(requests))
+    latencies: list[float] = []
+    errors = 0
+
+    async def worker() -> None:
+        nonlocal errors
+        for i in numbers:
+            started = time.perf_counter()
+            response = await request(client, i)
+            latencies.append((time.perf_counter() - started) * 1000)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return ScenarioResult(
+        requests=requests,
+        errors=errors,
+        throughput=requests / elapsed,
+        p50=percentile(latencies, 0.50),
+        p95=percentile(latencies, 0.95),
+        p99=percentile(latencies, 0.99),
+    )
+
+
+def compare(
+    baseline: dict[str, dict], results: dict[str, ScenarioResult], tolerance: float
+) -> list[str]:
+    """
+    List the scenarios that got slower than the baseline by more than ``tolerance``.
+
+    A scenario regresses when its throughput drops or its p95 latency grows by
+    more than the tolerated fraction.
+
+    :param baseline: Saved results, keyed by scenario
+    :type baseline: dict[str, dict]
+    :param results: Results of this run, keyed by scenario
+    :type results: dict[str, ScenarioResult]
+    :param tolerance: Allowed relative change, e.g. 0.1 for 10%
+    :type tolerance: float
+    :return: One message per regression
+    :rtype: list[str]
+    """
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if result.throughput < previous["throughput"] * (1 - tolerance):
+            regressions.append(
+                f"{name}: throughput {previous['throughput']:.0f} -> "
+                f"{result.throughput:.0f} req/s"
+            )
+        if result.p95 > previous["p95"] * (1 + tolerance):
+            regressions.append(
+                f"{name}: p95 {previous['p95']:.1f} -> {result.p95:.1f} ms"
+            )
+    return regressions
+
+
+def print_report(
+    results: dict[str, ScenarioResult],
+    baseline: dict[str, dict] | None,
+    startup: dict[str, float] | None = None,
+) -> None:
+    if startup:
+        print(
+            f"worker import {startup['import'] * 1000:.0f} ms, startup "
+            f"{startup['startup'] * 1000:.0f} ms "
+            f"(prewarming {DB_POOL_PREWARM} connections)"
+        )
+    header = f"{'scenario':<10}{'requests':>10}{'errors':>8}{'req/s':>10}"
+    header += f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+    if baseline:
+        header += f"{'req/s vs base':>16}{'p95 vs base':>14}"
+    print(header)
+    for name, result in results.items():
+        line = (
+            f"{name:<10}{result.requests:>10}{result.errors:>8}"
+            f"{result.throughput:>10.0f}{result.p50:>10.1f}{result.p95:>10.1f}"
+            f"{result.p99:>10.1f}"
+        )
+        previous = (baseline or {}).get(name)
+        if previous:
+            line += f"{result.throughput / previous['throughput'] - 1:>+16.1%}"
+            line += f"{result.p95 / previous['p95'] - 1:>+14.1%}"
+        print(line)
+
+
+async def main(args: argparse.Namespace) -> int:
+    if not BENCHMARK_DATABASE_URL:
+        print("Set BENCHMARK_DATABASE_URL or DATABASE_TEST_URL.", file=sys.stderr)
+        return 2
+    if BENCHMARK_DATABASE_URL == DATABASE_URL:
+        print("Refusing to wipe DATABASE_URL for a benchmark.", file=sys.stderr)
+        return 2
+
+    startup = measure_startup(BENCHMARK_DATABASE_URL)
+    engine = create_async_engine(
+        _to_async_url(BENCHMARK_DATABASE_URL),
+        pool_size=args.concurrency,
+        max_overflow=args.concurrency,
+    )
+    tournament_ids = await seed(engine, args.tournaments, args.players)
+    SessionLocal = async_sessionmaker(bind=engine, autoflush=False)
+
+    async def override_get_db():
+        async with SessionLocal() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = override_get_db
+    if registration_coalescer is not None:
+        registration_coalescer.session_factory = SessionLocal
+    # Sized like the benchmark's pool, as the app's limit is sized like its own.
+    db_limiter.limit = 2 * args.concurrency
+    tournament_cache.clear()
+    random.seed(args.seed)
+    scenarios = build_scenarios(tournament_ids)
+    results: dict[str, ScenarioResult] = {}
+    try:
+        async with AsyncClient(
+            transport=ASGITransport(app=app), base_url="http://benchmark"
+        ) as client:
+            for name in args.scenarios:
+                request = scenarios[name]
+                await run_scenario(client, request, args.warmup, args.concurrency)
+                results[name] = await run_scenario(
+                    client, request, args.requests, args.concurrency
+                )
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+        await engine.dispose()
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+    print_report(results, baseline, startup)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as file:
+            json.dump({name: asdict(r) for name, r in results.items()}, file, indent=2)
+    if baseline:
+        regressions = compare(baseline, results, args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--tournaments", type=int, default=1000)
+    parser.add_argument("--players", type=int, default=50, help="per tournament")
+    parser.add_argument("--requests", type=int, default=2000, help="per scenario")
+    parser.add_argument("--warmup", type=int, default=100, help="per scenario")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument(
+        "--scenarios",
+        nargs="+",
+        default=["list", "roster", "get", "register", "update"],
+        choices=["list", "roster", "get", "register", "update"],
+    )
+    parser.add_argument("--seed", type=int, default=0, help="random seed")
+    parser.add_argument("--save-baseline", metavar="PATH")
+    parser.add_argument("--compare", metavar="PATH")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="allowed relative slowdown before --compare fails (default 0.2)",
+    )
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args())))
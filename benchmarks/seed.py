@@ -0,0 +1,71 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.models import Player, Tournament
+from app.models.base import Base
+
+SEED_BATCH_SIZE = 5000
+
+
+async def seed(
+    engine: AsyncEngine, tournaments: int, players_per_tournament: int
+) -> list[int]:
+    """
+    Recreate the schema and fill it with a deterministic data set.
+
+    Every tournament is seeded with ``players_per_tournament`` players and twice
+    as many seats, so the register scenario keeps finding free seats.
+
+    :param engine: Engine of the benchmark database, which is wiped
+    :type engine: AsyncEngine
+    :param tournaments: Number of tournaments to create
+    :type tournaments: int
+    :param players_per_tournament: Number of players registered in each tournament
+    :type players_per_tournament: int
+    :return: IDs of the seeded tournaments
+    :rtype: list[int]
+    """
+    start_at = datetime(2030, 1, 1)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+        tournament_ids = []
+        for start in range(0, tournaments, SEED_BATCH_SIZE):
+            rows = [
+                {
+                    "name": f"Benchmark Tournament {number}",
+                    "max_players": max(2 * players_per_tournament, 1000),
+                    "start_at": start_at + timedelta(hours=number),
+                    "registered_count": players_per_tournament,
+                }
+                for number in range(start, min(start + SEED_BATCH_SIZE, tournaments))
+            ]
+            # Ids are returned in the order of the rows, which the scenarios rely on.
+            result = await conn.execute(
+                insert(Tournament).returning(
+                    Tournament.id, sort_by_parameter_order=True
+                ),
+                rows,
+            )
+            tournament_ids.extend(result.scalars())
+
+        players = (
+            {
+                "name": f"Seed Player {number}",
+                "email": f"seed{number}@example.com",
+                "tournament_id": tournament_id,
+            }
+            for tournament_id in tournament_ids
+            for number in range(players_per_tournament)
+        )
+        batch = []
+        for player in players:
+            batch.append(player)
+            if len(batch) == SEED_BATCH_SIZE:
+                await conn.execute(insert(Player), batch)
+                batch = []
+        if batch:
+            await conn.execute(insert(Player), batch)
+    return tournament_ids
@@ -0,0 +1,111 @@
+import asyncio
+from collections import Counter
+from datetime import datetime
+
+import pytest
+import pytest_asyncio
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.admission import db_limiter
+from app.cache import tournament_cache
+from app.config import ASYNC_DATABASE_TEST_URL
+from app.db import Base, get_db
+from app.main import app
+from app.models import Player, Tournament
+from app.services import registration
+from app.services.registration import RegistrationCoalescer
+
+pytestmark = [
+    pytest.mark.asyncio,
+    pytest.mark.skipif(
+        not (ASYNC_DATABASE_TEST_URL or "").startswith("postgresql"),
+        reason="concurrent registration needs a PostgreSQL test database",
+    ),
+]
+
+REQUESTS = 2000
+MAX_PLAYERS = 50
+CONNECTIONS = 32
+
+
+@pytest_asyncio.fixture
+async def session_factory():
+    engine = create_async_engine(
+        ASYNC_DATABASE_TEST_URL,
+        pool_size=CONNECTIONS,
+        max_overflow=CONNECTIONS,
+        pool_timeout=60,
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    TestingSessionLocal = async_sessionmaker(
+        autoflush=False, expire_on_commit=False, bind=engine
+    )
+
+    async def override_get_db():
+        async with TestingSessionLocal() as db:
+            yield db
+
+    app.dependency_overrides[get_db] = override_get_db
+    tournament_cache.clear()
+    try:
+        yield TestingSessionLocal
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+        tournament_cache.clear()
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+        await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def tournament_id(session_factory):
+    async with session_factory() as db:
+        tournament = Tournament(
+            name="Popular Tournament", max_players=MAX_PLAYERS, start_at=datetime.now()
+        )
+        db.add(tournament)
+        await db.commit()
+        return tournament.id
+
+
+@pytest.mark.parametrize("coalescing", [False, True])
+async def test_parallel_registrations_never_exceed_max_players(
+    session_factory, tournament_id, coalescing, monkeypatch
+):
+    # Every request is let in; shedding load is not what is tested here.
+    monkeypatch.setattr(db_limiter, "max_queue", REQUESTS)
+    monkeypatch.setattr(db_limiter, "queue_timeout", 60)
+    if coalescing:
+        monkeypatch.setattr(
+            registration,
+            "registration_coalescer",
+            RegistrationCoalescer(session_factory, window=0.005, max_batch=500),
+        )
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+
+        async def register(i: int) -> int:
+            response = await client.post(
+                f"/tournaments/{tournament_id}/register",
+                json={"name": f"Player {i}", "email": f"player{i}@example.com"},
+            )
+            return response.status_code
+
+        statuses = Counter(
+            await asyncio.gather(*(register(i) for i in range(REQUESTS)))
+        )
+
+    assert statuses == {201: MAX_PLAYERS, 409: REQUESTS - MAX_PLAYERS}
+    async with session_factory() as db:
+        players_count = await db.scalar(
+            select(func.count(Player.id)).where(Player.tournament_id == tournament_id)
+        )
+        registered_count = await db.scalar(
+            select(Tournament.registered_count).where(Tournament.id == tournament_id)
+        )
+    assert players_count == MAX_PLAYERS
+    assert registered_count == MAX_PLAYERS
@@ -0,0 +1,49 @@
+from datetime import datetime, timedelta, timezone
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.api.responses import json_response
+from app.schemas.pagination import Page
+from app.schemas.player import PlayerInDBOutput
+from app.schemas.tournament import TournamentInDBOutput
+
+
+def test_json_response_matches_default_encoding():
+    page = Page[PlayerInDBOutput](
+        items=[
+            PlayerInDBOutput(
+                id=1,
+                name='Jögi "the Rook"',
+                email="jogi@example.com",
+                tournament_id=1,
+                registered_at=datetime(
+                    2030, 1, 1, 5, 0, 0, 123456, tzinfo=timezone(timedelta(hours=5))
+                ),
+            )
+        ],
+        next_cursor="abc",
+    )
+
+    response = json_response(page, Page[PlayerInDBOutput])
+
+    assert response.media_type == "application/json"
+    assert response.body == JSONResponse(jsonable_encoder(page)).body
+    assert b'"registered_at":"2030-01-01T00:00:00.123456Z"' in response.body
+
+
+def test_json_response_omits_tournament_version():
+    tournament = TournamentInDBOutput(
+        id=1,
+        name="Test Tournament",
+        max_players=10,
+        start_at=datetime(2030, 1, 1, tzinfo=timezone.utc),
+        created_at=datetime(2030, 1, 1, tzinfo=timezone.utc),
+        version=3,
+    )
+
+    response = json_response(tournament, TournamentInDBOutput, status_code=201)
+
+    assert response.status_code == 201
+    assert b"version" not in response.body
+    assert b'"start_at":"2030-01-01T00:00:00Z"' in response.body
@@ -1,10 +1,18 @@
 import pytest
 from unittest.mock import patch, MagicMock
 from fastapi import HTTPException
+from starlette.requests import Request
 from datetime import datetime
+from app.schemas.pagination import Page
 from app.schemas.player import PlayerInRequest, PlayerInDBInput
 from app.schemas.tournament import TournamentInDBOutput
-from app.api.tournament import register_player_api_view
+from app.api.tournament import (
+    TOURNAMENT_CACHE_CONTROL,
+    get_players_by_tournament_api_view,
+    get_tournament_api_view,
+    parse_ids,
+    register_player_api_view,
+)
 
 pytestmark = pytest.mark.asyncio
 
@@ -17,6 +25,11 @@ def mock_tournament_repo():
         yield mock_instance
 
 
+@pytest.fixture
+def mock_db():
+    return MagicMock()
+
+
 @pytest.fixture
 def tournament_output():
     return TournamentInDBOutput(
@@ -36,7 +49,7 @@ def player_request_data():
 
 class TestRegisterPlayer:
     async def test_register_player_success(
-        self, mock_tournament_repo, player_request_data, tournament_output
+        self, mock_tournament_repo, mock_db, player_request_data, tournament_output
     ):
         with (
             patch("app.api.tournament.create_player") as mock_create_player,
@@ -45,17 +58,18 @@ class TestRegisterPlayer:
             mock_get_tournament.return_value = tournament_output
             mock_create_player.return_value = None
 
-            result = await register_player_api_view(1, player_request_data)
+            result = await register_player_api_view(1, player_request_data, mock_db)
 
             expected_player_data = PlayerInDBInput(
                 **player_request_data.__dict__, tournament_id=1
             )
-            mock_create_player.assert_called_once_with(expected_player_data)
-            assert result == tournament_output
-            mock_get_tournament.assert_called_once_with(1)
+            mock_create_player.assert_called_once_with(mock_db, expected_player_data)
+            assert result.status_code == 201
+            assert result.body == tournament_output.model_dump_json().encode()
+            mock_get_tournament.assert_called_once_with(mock_db, 1)
 
     async def test_register_player_tournament_not_found(
-        self, mock_tournament_repo, player_request_data
+        self, mock_tournament_repo, mock_db, player_request_data
     ):
         with (
             patch("app.api.tournament.create_player") as mock_create_player,
@@ -66,13 +80,13 @@ class TestRegisterPlayer:
             )
 
             with pytest.raises(HTTPException) as excinfo:
-                await register_player_api_view(1, player_request_data)
+                await register_player_api_view(1, player_request_data, mock_db)
 
             assert excinfo.value.status_code == 404
             assert "Tournament with id 1 not found" in str(excinfo.value.detail)
 
     async def test_register_player_creation_error(
-        self, mock_tournament_repo, player_request_data
+        self, mock_tournament_repo, mock_db, player_request_data
     ):
         with patch("app.api.tournament.create_player") as mock_create_player:
             mock_create_player.side_effect = HTTPException(
@@ -80,13 +94,13 @@ class TestRegisterPlayer:
             )
 
             with pytest.raises(HTTPException) as excinfo:
-                await register_player_api_view(1, player_request_data)
+                await register_player_api_view(1, player_request_data, mock_db)
 
             assert excinfo.value.status_code == 500
             assert "Player creation failed" in str(excinfo.value.detail)
 
     async def test_register_player_duplicate_email(
-        self, mock_tournament_repo, player_request_data
+        self, mock_tournament_repo, mock_db, player_request_data
     ):
         with patch("app.api.tournament.create_player") as mock_create_player:
             mock_create_player.side_effect = HTTPException(
@@ -95,7 +109,7 @@ class TestRegisterPlayer:
             )
 
             with pytest.raises(HTTPException) as excinfo:
-                await register_player_api_view(1, player_request_data)
+                await register_player_api_view(1, player_request_data, mock_db)
 
             assert excinfo.value.status_code == 409
             assert (
@@ -104,7 +118,7 @@ class TestRegisterPlayer:
             )
 
     async def test_register_player_tournament_full(
-        self, mock_tournament_repo, player_request_data
+        self, mock_tournament_repo, mock_db, player_request_data
     ):
         with patch("app.api.tournament.create_player") as mock_create_player:
             mock_create_player.side_effect = HTTPException(
@@ -112,7 +126,99 @@ class TestRegisterPlayer:
             )
 
             with pytest.raises(HTTPException) as excinfo:
-                await register_player_api_view(1, player_request_data)
+                await register_player_api_view(1, player_request_data, mock_db)
 
             assert excinfo.value.status_code == 500
-            assert "Tournament is full" in str(excinfo.value.detail)
\ No newline at end of file
+            assert "Tournament is full" in str(excinfo.value.detail)
+
+
+def make_request(headers=None):
+    return Request(
+        {
+            "type": "http",
+            "method": "GET",
+            "headers": [
+                (name.lower().encode(), value.encode())
+                for name, value in (headers or {}).items()
+            ],
+        }
+    )
+
+
+class TestConditionalGet:
+    async def test_get_tournament_sets_validators(self, mock_db, tournament_output):
+        with patch("app.api.tournament.get_tournament", return_value=tournament_output):
+            result = await get_tournament_api_view(1, make_request(), mock_db)
+
+        assert result.status_code == 200
+        assert result.body == tournament_output.model_dump_json().encode()
+        assert result.headers["ETag"] == '"1-0"'
+        assert result.headers["Cache-Control"] == TOURNAMENT_CACHE_CONTROL
+
+    async def test_get_tournament_not_modified(self, mock_db, tournament_output):
+        request = make_request({"If-None-Match": 'W/"0-0", "1-0"'})
+        with patch("app.api.tournament.get_tournament", return_value=tournament_output):
+            result = await get_tournament_api_view(1, request, mock_db)
+
+        assert result.status_code == 304
+        assert result.headers["ETag"] == '"1-0"'
+        assert result.body == b""
+
+    async def test_get_tournament_modified(self, mock_db, tournament_output):
+        request = make_request({"If-None-Match": '"1-7"'})
+        with patch("app.api.tournament.get_tournament", return_value=tournament_output):
+            result = await get_tournament_api_view(1, request, mock_db)
+
+        assert result.status_code == 200
+
+    async def test_roster_etag_comes_with_the_page(self, mock_db):
+        with patch(
+            "app.api.tournament.get_roster_page", return_value=(3, Page(items=[]))
+        ), patch("app.api.tournament.get_tournament_version") as mock_version:
+            result = await get_players_by_tournament_api_view(
+                1, make_request(), 50, None, mock_db
+            )
+
+        assert result.status_code == 200
+        assert result.headers["ETag"] == '"1-3"'
+        mock_version.assert_not_called()
+
+    async def test_roster_not_modified(self, mock_db):
+        request = make_request({"If-None-Match": '"1-3"'})
+        with patch(
+            "app.api.tournament.get_tournament_version", return_value=3
+        ), patch("app.api.tournament.get_roster_page") as mock_page:
+            result = await get_players_by_tournament_api_view(1, request, 50, None, mock_db)
+
+        assert result.status_code == 304
+        assert result.headers["ETag"] == '"1-3"'
+        mock_page.assert_not_called()
+
+    async def test_roster_modified_takes_the_etag_of_the_page(self, mock_db):
+        # The roster changed again between the version check and the page read.
+        request = make_request({"If-None-Match": '"1-3"'})
+        with patch(
+            "app.api.tournament.get_tournament_version", return_value=4
+        ), patch(
+            "app.api.tournament.get_roster_page", return_value=(5, Page(items=[]))
+        ):
+            result = await get_players_by_tournament_api_view(1, request, 50, None, mock_db)
+
+        assert result.status_code == 200
+        assert result.headers["ETag"] == '"1-5"'
+
+
+class TestCapacityIds:
+    async def test_parse_ids_accepts_commas_and_repeats(self):
+        assert parse_ids(["3,1", "2", "1,,"]) == [3, 1, 2]
+
+    async def test_parse_ids_rejects_non_integers(self):
+        with pytest.raises(HTTPException) as excinfo:
+            parse_ids(["1,a"])
+        assert excinfo.value.status_code == 422
+
+    async def test_parse_ids_rejects_too_many(self):
+        with patch("app.api.tournament.CAPACITY_LOOKUP_MAX", 2):
+            with pytest.raises(HTTPException) as excinfo:
+                parse_ids(["1,2,3"])
+        assert excinfo.value.status_code == 422
@@ -0,0 +1,4 @@
+import os
+
+# Routes going over their query budget fail the test instead of only logging.
+os.environ.setdefault("QUERY_BUDGET_MODE", "raise")
@@ -1,21 +1,28 @@
-import pytest
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import pytest_asyncio
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 
-from app.config import DATABASE_TEST_URL
+from app.cache import tournament_cache
+from app.config import ASYNC_DATABASE_TEST_URL
 from app.db import Base
 
-SQLALCHEMY_DATABASE_URL = DATABASE_TEST_URL
+SQLALCHEMY_DATABASE_URL = ASYNC_DATABASE_TEST_URL
 
 
-@pytest.fixture(scope="function")
-def db_session():
-    engine = create_engine(SQLALCHEMY_DATABASE_URL)
-    TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-    Base.metadata.create_all(bind=engine)
+@pytest_asyncio.fixture(scope="function")
+async def db_session():
+    engine = create_async_engine(SQLALCHEMY_DATABASE_URL)
+    TestingSessionLocal = async_sessionmaker(
+        autoflush=False, expire_on_commit=False, bind=engine
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
     db = TestingSessionLocal()
+    tournament_cache.clear()
     try:
         yield db
     finally:
-        db.close()
-        Base.metadata.drop_all(bind=engine)
\ No newline at end of file
+        await db.close()
+        tournament_cache.clear()
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+        await engine.dispose()
@@ -1,32 +1,36 @@
 import pytest
+import pytest_asyncio
+from sqlalchemy import event, update
 from datetime import datetime
-from unittest.mock import MagicMock
 from app.models import Tournament
 from app.repositories.player import PlayerRepo
-from app.schemas.player import PlayerInDBInput
+from app.repositories.tournament import TournamentRepo
+from app.schemas.player import PlayerInDBInput, PlayerInRequest
 from app.exceptions.player import (
     PlayerNotFoundError,
     PlayerEmailExistsError,
-    PlayerCreationError,
+    TournamentPlayerLimitError,
 )
+from app.exceptions.pagination import InvalidCursorError
+from app.exceptions.tournament import TournamentNotFoundError
 from tests.repositories.config import db_session
 
+pytestmark = pytest.mark.asyncio
+
 
 @pytest.fixture
 def player_repo(db_session):
-    repo = PlayerRepo()
-    repo.db = db_session
-    repo._validate_player_registration = MagicMock()
+    repo = PlayerRepo(db_session)
     return repo
 
 
-@pytest.fixture
-def tournament(db_session):
+@pytest_asyncio.fixture
+async def tournament(db_session):
     tournament = Tournament(
         name="Test Tournament", max_players=10, start_at=datetime.now()
     )
     db_session.add(tournament)
-    db_session.commit()
+    await db_session.commit()
     return tournament
 
 
@@ -37,83 +41,291 @@ def player_data(tournament):
     )
 
 
-@pytest.fixture
-def created_player(player_repo, player_data):
-    return player_repo.create_player(player_data)
+@pytest_asyncio.fixture
+async def created_player(player_repo, player_data):
+    return await player_repo.create_player(player_data)
 
 
 class TestPlayerCreation:
-    def test_create_player(self, player_repo, player_data):
-        player = player_repo.create_player(player_data)
+    async def test_create_player(self, player_repo, player_data):
+        player = await player_repo.create_player(player_data)
         assert player.name == player_data.name
         assert player.email == player_data.email
         assert player.tournament_id == player_data.tournament_id
         assert player.id is not None
         assert isinstance(player.registered_at, datetime)
 
-    def test_create_duplicate_player(self, player_repo, player_data, created_player):
+    async def test_create_duplicate_player(self, player_repo, player_data, created_player):
         with pytest.raises(PlayerEmailExistsError) as excinfo:
-            player_repo.create_player(player_data)
+            await player_repo.create_player(player_data)
         assert (
             f"Player with email '{player_data.email}' already exists in tournament {player_data.tournament_id}"
             in str(excinfo.value)
         )
 
-    def test_tournament_full(self, player_repo, player_data):
-        player_repo._validate_player_registration.side_effect = PlayerCreationError(
-            "Tournament is full"
+    async def test_create_player_increments_registered_count(
+        self, player_repo, player_data, tournament, db_session
+    ):
+        await player_repo.create_player(player_data)
+        await db_session.refresh(tournament)
+        assert tournament.registered_count == 1
+
+    async def test_create_duplicate_player_keeps_registered_count(
+        self, player_repo, player_data, created_player, tournament, db_session
+    ):
+        with pytest.raises(PlayerEmailExistsError):
+            await player_repo.create_player(player_data)
+        await db_session.refresh(tournament)
+        assert tournament.registered_count == 1
+
+    async def test_tournament_full(self, player_repo, db_session):
+        tournament = Tournament(
+            name="Small Tournament", max_players=1, start_at=datetime.now()
+        )
+        db_session.add(tournament)
+        await db_session.commit()
+        await player_repo.create_player(
+            PlayerInDBInput(
+                name="John Doe", email="john@example.com", tournament_id=tournament.id
+            )
         )
 
-        with pytest.raises(PlayerCreationError) as excinfo:
-            player_repo.create_player(player_data)
-        assert "Tournament is full" in str(excinfo.value)
+        with pytest.raises(TournamentPlayerLimitError) as excinfo:
+            await player_repo.create_player(
+                PlayerInDBInput(
+                    name="Jane Doe",
+                    email="jane@example.com",
+                    tournament_id=tournament.id,
+                )
+            )
+        assert f"Tournament {tournament.id} has reached its player limit" in str(
+            excinfo.value
+        )
+        await db_session.refresh(tournament)
+        assert tournament.registered_count == 1
+
+    async def test_create_player_nonexistent_tournament(self, player_repo):
+        with pytest.raises(TournamentNotFoundError):
+            await player_repo.create_player(
+                PlayerInDBInput(name="John Doe", email="john@example.com", tournament_id=999)
+            )
+
+
+class TestPlayerBatchRegistration:
+    async def test_register_players(self, player_repo, db_session):
+        tournament = Tournament(
+            name="Batch Tournament", max_players=3, start_at=datetime.now()
+        )
+        db_session.add(tournament)
+        await db_session.commit()
+        await player_repo.create_player(
+            PlayerInDBInput(
+                name="John Doe", email="john@example.com", tournament_id=tournament.id
+            )
+        )
+
+        results = await player_repo.register_players(
+            tournament.id,
+            [
+                PlayerInRequest(name="John Doe", email="john@example.com"),
+                PlayerInRequest(name="Alice", email="alice@example.com"),
+                PlayerInRequest(name="Alice Again", email="alice@example.com"),
+                PlayerInRequest(name="Bob", email="bob@example.com"),
+                PlayerInRequest(name="Carol", email="carol@example.com"),
+            ],
+        )
+
+        assert [result.status for result in results] == [
+            "duplicate",
+            "registered",
+            "duplicate",
+            "registered",
+            "full",
+        ]
+        assert results[1].player.name == "Alice"
+        assert results[3].player.tournament_id == tournament.id
+        await db_session.refresh(tournament)
+        assert tournament.registered_count == 3
+
+    async def test_register_players_statements_do_not_grow_with_duplicates(
+        self, player_repo, db_session
+    ):
+        tournament = Tournament(
+            name="Busy Tournament", max_players=21, start_at=datetime.now()
+        )
+        db_session.add(tournament)
+        await db_session.commit()
+        players = [
+            PlayerInRequest(name=f"Player {i}", email=f"player{i}@example.com")
+            for i in range(20)
+        ]
+        await player_repo.register_players(tournament.id, players)
+
+        statements = []
+        event.listen(
+            db_session.bind.sync_engine,
+            "before_cursor_execute",
+            lambda *args: statements.append(args[2]),
+        )
+        results = await player_repo.register_players(
+            tournament.id,
+            players + [PlayerInRequest(name="Last", email="last@example.com")],
+        )
+
+        assert [result.status for result in results].count("duplicate") == 20
+        assert results[-1].status == "registered"
+        assert len(statements) == 4
+
+    async def test_register_players_nonexistent_tournament(self, player_repo):
+        with pytest.raises(TournamentNotFoundError):
+            await player_repo.register_players(
+                999, [PlayerInRequest(name="John Doe", email="john@example.com")]
+            )
 
 
 class TestPlayerRetrieval:
-    def test_get_player(self, player_repo, created_player):
-        player = player_repo.get_player(created_player.id)
+    async def test_get_player(self, player_repo, created_player):
+        player = await player_repo.get_player(created_player.id)
         assert player.id == created_player.id
         assert player.name == created_player.name
         assert player.email == created_player.email
 
-    def test_get_nonexistent_player(self, player_repo):
+    async def test_get_nonexistent_player(self, player_repo):
         with pytest.raises(PlayerNotFoundError) as excinfo:
-            player_repo.get_player(999)
+            await player_repo.get_player(999)
         assert "Player with id 999 not found" in str(excinfo.value)
 
-    def test_get_players(self, player_repo, created_player):
-        players = player_repo.get_players()
+    async def test_get_players(self, player_repo, created_player):
+        players = await player_repo.get_players()
         assert len(players) >= 1
         assert any(player.id == created_player.id for player in players)
 
-    def test_get_players_by_tournament(self, player_repo, created_player):
-        players = player_repo.get_players_by_tournament(created_player.tournament_id)
-        assert len(players) >= 1
-        assert any(player.id == created_player.id for player in players)
+    async def test_get_players_by_tournament(self, player_repo, created_player):
+        players = await player_repo.get_players_by_tournament(created_player.tournament_id)
+        assert len(players.items) >= 1
+        assert any(player.id == created_player.id for player in players.items)
+        assert players.next_cursor is None
+
+    async def test_get_players_by_tournament_pages(self, player_repo, tournament):
+        created_ids = []
+        for i in range(5):
+            player = await player_repo.create_player(
+                PlayerInDBInput(
+                    name=f"Player {i}",
+                    email=f"player{i}@example.com",
+                    tournament_id=tournament.id,
+                )
+            )
+            created_ids.append(player.id)
+
+        seen_ids = []
+        cursor = None
+        while True:
+            page = await player_repo.get_players_by_tournament(
+                tournament.id, limit=2, cursor=cursor
+            )
+            assert len(page.items) <= 2
+            seen_ids.extend(player.id for player in page.items)
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+        assert seen_ids == created_ids
+
+    async def test_get_players_by_tournament_invalid_cursor(
+        self, player_repo, tournament
+    ):
+        with pytest.raises(InvalidCursorError):
+            await player_repo.get_players_by_tournament(
+                tournament.id, cursor="not-a-cursor"
+            )
+
+    async def test_get_roster_page_reads_the_version_with_the_page(
+        self, player_repo, tournament, db_session
+    ):
+        version, page = await player_repo.get_roster_page(tournament.id)
+        assert page.items == []
+        assert page.next_cursor is None
+
+        for i in range(3):
+            await player_repo.create_player(
+                PlayerInDBInput(
+                    name=f"Player {i}",
+                    email=f"player{i}@example.com",
+                    tournament_id=tournament.id,
+                )
+            )
+        tournament_repo = TournamentRepo(db_session)
+        # Cache the tournament, then change the roster behind the cache's back.
+        cached = await tournament_repo.get_tournament(tournament.id)
+        await db_session.execute(
+            update(Tournament)
+            .where(Tournament.id == tournament.id)
+            .values(version=Tournament.version + 1)
+        )
+        await db_session.commit()
+
+        new_version, page = await player_repo.get_roster_page(tournament.id, limit=2)
+        assert new_version == version + 4
+        assert (await tournament_repo.get_tournament(tournament.id)) == cached
+        assert new_version == await tournament_repo.get_tournament_version(tournament.id)
+        assert [player.name for player in page.items] == ["Player 0", "Player 1"]
+
+        _, page = await player_repo.get_roster_page(
+            tournament.id, limit=2, cursor=page.next_cursor
+        )
+        assert [player.name for player in page.items] == ["Player 2"]
+        assert page.next_cursor is None
+
+    async def test_get_roster_page_of_missing_tournament(self, player_repo):
+        with pytest.raises(TournamentNotFoundError):
+            await player_repo.get_roster_page(999)
+        with pytest.raises(TournamentNotFoundError):
+            await TournamentRepo(player_repo.db).get_tournament_version(999)
+
+    async def test_stream_players_by_tournament(self, player_repo, tournament):
+        created_ids = []
+        for i in range(5):
+            player = await player_repo.create_player(
+                PlayerInDBInput(
+                    name=f"Player {i}",
+                    email=f"player{i}@example.com",
+                    tournament_id=tournament.id,
+                )
+            )
+            created_ids.append(player.id)
+
+        batches = [
+            batch
+            async for batch in player_repo.stream_players_by_tournament(
+                tournament.id, batch_size=2
+            )
+        ]
+        assert [len(batch) for batch in batches] == [2, 2, 1]
+        assert [player.id for batch in batches for player in batch] == created_ids
 
-    def test_get_players_count_by_tournament(self, player_repo, created_player):
-        count = player_repo.get_players_count_by_tournament(
+    async def test_get_players_count_by_tournament(self, player_repo, created_player):
+        count = await player_repo.get_players_count_by_tournament(
             created_player.tournament_id
         )
         assert count >= 1
 
 
 class TestPlayerUpdate:
-    def test_update_player(self, player_repo, created_player, tournament):
+    async def test_update_player(self, player_repo, created_player, tournament):
         updated_data = PlayerInDBInput(
             name="Jane Doe", email="jane@example.com", tournament_id=tournament.id
         )
-        updated_player = player_repo.update_player(created_player.id, updated_data)
+        updated_player = await player_repo.update_player(created_player.id, updated_data)
         assert updated_player.name == updated_data.name
         assert updated_player.email == updated_data.email
         assert updated_player.tournament_id == updated_data.tournament_id
 
-    def test_update_nonexistent_player(self, player_repo, player_data):
+    async def test_update_nonexistent_player(self, player_repo, player_data):
         with pytest.raises(PlayerNotFoundError) as excinfo:
-            player_repo.update_player(999, player_data)
+            await player_repo.update_player(999, player_data)
         assert "Player with id 999 not found" in str(excinfo.value)
 
-    def test_update_duplicate_email(
+    async def test_update_duplicate_email(
         self, player_repo, created_player, tournament, db_session
     ):
         another_player_data = PlayerInDBInput(
@@ -121,28 +333,28 @@ class TestPlayerUpdate:
             email="another@example.com",
             tournament_id=tournament.id,
         )
-        another_player = player_repo.create_player(another_player_data)
+        another_player = await player_repo.create_player(another_player_data)
 
         update_data = PlayerInDBInput(
             name="Updated Name", email=created_player.email, tournament_id=tournament.id
         )
 
         with pytest.raises(PlayerEmailExistsError) as excinfo:
-            player_repo.update_player(another_player.id, update_data)
+            await player_repo.update_player(another_player.id, update_data)
         assert (
-            f"Player with email '{created_player.email}' already exists in tournament {tournament.id}"
+            f"Player with email '{created_player.email}' already exists in tournament {update_data.tournament_id}"
             in str(excinfo.value)
         )
 
 
 class TestPlayerDeletion:
-    def test_delete_player(self, player_repo, created_player):
-        assert player_repo.delete_player(created_player.id) is True
+    async def test_delete_player(self, player_repo, created_player):
+        assert await player_repo.delete_player(created_player.id) is True
         with pytest.raises(PlayerNotFoundError) as excinfo:
-            player_repo.get_player(created_player.id)
+            await player_repo.get_player(created_player.id)
         assert f"Player with id {created_player.id} not found" in str(excinfo.value)
 
-    def test_delete_nonexistent_player(self, player_repo):
+    async def test_delete_nonexistent_player(self, player_repo):
         with pytest.raises(PlayerNotFoundError) as excinfo:
-            player_repo.delete_player(999)
+            await player_repo.delete_player(999)
         assert "Player with id 999 not found" in str(excinfo.value)
\ No newline at end of file
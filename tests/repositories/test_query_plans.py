@@ -0,0 +1,167 @@
+import pytest
+import pytest_asyncio
+from datetime import datetime
+from sqlalchemy import event, insert, text
+
+from app.cache import tournament_cache
+from app.config import ASYNC_DATABASE_TEST_URL
+from app.models import Player, Tournament
+from app.repositories.player import PlayerRepo
+from app.repositories.tournament import TournamentRepo
+from app.schemas.pagination import encode_cursor
+from app.schemas.player import PlayerInDBInput, PlayerInRequest
+from app.schemas.tournament import TournamentFilters
+from tests.repositories.config import db_session
+
+pytestmark = [
+    pytest.mark.asyncio,
+    pytest.mark.skipif(
+        not (ASYNC_DATABASE_TEST_URL or "").startswith("postgresql"),
+        reason="query plans are checked against PostgreSQL",
+    ),
+]
+
+# Every statement these repository calls send must be able to use an index.
+HOT_PATHS = {
+    "get_tournament": lambda t, p, ids: t.get_tournament(ids["tournament"]),
+    "get_capacities": lambda t, p, ids: t.get_capacities([ids["tournament"], 1, 2]),
+    "get_tournaments_page": lambda t, p, ids: t.get_tournaments(
+        limit=10, cursor=encode_cursor(ids["tournament"])
+    ),
+    "search_tournaments_by_start": lambda t, p, ids: t.get_tournaments(
+        limit=10,
+        cursor=encode_cursor(datetime(2030, 1, 1), ids["tournament"]),
+        filters=TournamentFilters(
+            starts_from=datetime(2029, 1, 1),
+            starts_before=datetime(2031, 1, 1),
+            has_free_seats=True,
+            sort="-start_at",
+        ),
+    ),
+    "search_tournaments_by_name": lambda t, p, ids: t.get_tournaments(
+        limit=10,
+        cursor=encode_cursor("Plan Tournament 5"),
+        filters=TournamentFilters(sort="name"),
+    ),
+    "get_players_by_tournament": lambda t, p, ids: p.get_players_by_tournament(
+        ids["tournament"], limit=10
+    ),
+    "get_players_by_tournament_page": lambda t, p, ids: p.get_players_by_tournament(
+        ids["tournament"], limit=10, cursor=encode_cursor(datetime(2030, 1, 1), 1)
+    ),
+    "get_roster_page": lambda t, p, ids: p.get_roster_page(ids["tournament"], limit=10),
+    "get_roster_page_after": lambda t, p, ids: p.get_roster_page(
+        ids["tournament"], limit=10, cursor=encode_cursor(datetime(2030, 1, 1), 1)
+    ),
+    "get_tournament_version": lambda t, p, ids: t.get_tournament_version(
+        ids["tournament"]
+    ),
+    "get_players_count_by_tournament": lambda t, p, ids: (
+        p.get_players_count_by_tournament(ids["tournament"])
+    ),
+    "get_player": lambda t, p, ids: p.get_player(ids["player"]),
+    "create_player": lambda t, p, ids: p.create_player(
+        PlayerInDBInput(
+            name="New Player",
+            email="new@example.com",
+            tournament_id=ids["tournament"],
+        )
+    ),
+    "register_players": lambda t, p, ids: p.register_players(
+        ids["tournament"], [PlayerInRequest(name="Batch", email="batch@example.com")]
+    ),
+    "delete_player": lambda t, p, ids: p.delete_player(ids["player"]),
+}
+
+
+async def _collect(call):
+    items = []
+    async for batch in call:
+        items.extend(batch)
+    return items
+
+
+HOT_PATHS["stream_players_by_tournament"] = lambda t, p, ids: _collect(
+    p.stream_players_by_tournament(ids["tournament"])
+)
+
+
+TOURNAMENTS = 1000
+PLAYERS_PER_TOURNAMENT = 20
+
+
+@pytest_asyncio.fixture
+async def ids(db_session):
+    # Plans are only meaningful on tables large enough for the planner to prefer
+    # an index over reading every page, and with fresh statistics.
+    tournament_ids = (
+        await db_session.scalars(
+            insert(Tournament).returning(Tournament.id),
+            [
+                {
+                    "name": f"Plan Tournament {number}",
+                    "max_players": 100,
+                    "start_at": datetime(2030, 1, 1),
+                    "registered_count": PLAYERS_PER_TOURNAMENT,
+                }
+                for number in range(TOURNAMENTS)
+            ],
+        )
+    ).all()
+    player_ids = (
+        await db_session.scalars(
+            insert(Player).returning(Player.id),
+            [
+                {
+                    "name": f"Player {number}",
+                    "email": f"player{number}@example.com",
+                    "tournament_id": tournament_id,
+                }
+                for tournament_id in tournament_ids
+                for number in range(PLAYERS_PER_TOURNAMENT)
+            ],
+        )
+    ).all()
+    await db_session.execute(text("ANALYZE tournaments"))
+    await db_session.execute(text("ANALYZE players"))
+    await db_session.commit()
+    tournament_cache.clear()
+    middle = len(tournament_ids) // 2
+    return {
+        "tournament": tournament_ids[middle],
+        "player": player_ids[middle * PLAYERS_PER_TOURNAMENT],
+    }
+
+
+def _seq_scans(plan: dict) -> list[str]:
+    scans = []
+    if plan["Node Type"] == "Seq Scan":
+        scans.append(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        scans.extend(_seq_scans(child))
+    return scans
+
+
+@pytest.mark.parametrize("name", sorted(HOT_PATHS))
+async def test_hot_path_uses_indexes(name, db_session, ids):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    engine = db_session.bind.sync_engine
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        await HOT_PATHS[name](TournamentRepo(db_session), PlayerRepo(db_session), ids)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    await db_session.rollback()
+
+    assert statements
+    async with db_session.bind.connect() as conn:
+        for statement, parameters in statements:
+            result = await conn.exec_driver_sql(
+                f"EXPLAIN (FORMAT JSON) {statement}", parameters
+            )
+            plan = result.scalar()[0]["Plan"]
+            assert _seq_scans(plan) == [], f"sequential scan in {statement}"
@@ -1,15 +1,27 @@
 import pytest
+import pytest_asyncio
 from datetime import datetime
+from pydantic import ValidationError
+from sqlalchemy import event
+from app.cache import tournament_cache
+from app.repositories.player import PlayerRepo
 from app.repositories.tournament import TournamentRepo
-from app.schemas.tournament import TournamentInDBInput
-from app.exceptions.tournament import TournamentNotFoundError, TournamentNameExistsError
+from app.schemas.player import PlayerInDBInput
+from app.schemas.tournament import TournamentFilters, TournamentInDBInput
+from app.exceptions.pagination import InvalidCursorError
+from app.exceptions.tournament import (
+    TournamentCreationError,
+    TournamentNameExistsError,
+    TournamentNotFoundError,
+)
 from tests.repositories.config import db_session
 
+pytestmark = pytest.mark.asyncio
+
 
 @pytest.fixture
 def tournament_repo(db_session):
-    repo = TournamentRepo()
-    repo.db = db_session
+    repo = TournamentRepo(db_session)
     return repo
 
 
@@ -20,32 +32,97 @@ def tournament_data():
     )
 
 
-@pytest.fixture
-def created_tournament(tournament_repo, tournament_data):
-    return tournament_repo.create_tournament(tournament_data)
+@pytest_asyncio.fixture
+async def created_tournament(tournament_repo, tournament_data):
+    return await tournament_repo.create_tournament(tournament_data)
 
 
 class TestTournamentCreation:
-    def test_create_tournament(self, tournament_repo, tournament_data):
-        tournament = tournament_repo.create_tournament(tournament_data)
+    async def test_create_tournament(self, tournament_repo, tournament_data):
+        tournament = await tournament_repo.create_tournament(tournament_data)
         assert tournament.name == tournament_data.name
         assert tournament.max_players == tournament_data.max_players
         assert isinstance(tournament.start_at, datetime)
         assert tournament.id is not None
 
-    def test_create_duplicate_tournament(
+    async def test_create_duplicate_tournament(
         self, tournament_repo, tournament_data, created_tournament
     ):
         with pytest.raises(TournamentNameExistsError) as excinfo:
-            tournament_repo.create_tournament(tournament_data)
+            await tournament_repo.create_tournament(tournament_data)
         assert f"Tournament with name '{tournament_data.name}' already exists" in str(
             excinfo.value
         )
 
 
+    async def test_negative_capacity_is_not_a_name_conflict(self, tournament_repo):
+        with pytest.raises(ValidationError):
+            TournamentInDBInput(
+                name="Negative Tournament", max_players=-1, start_at=datetime.now()
+            )
+        # Past validation, the database's CHECK constraint still rejects it.
+        data = TournamentInDBInput.model_construct(
+            name="Negative Tournament", max_players=-1, start_at=datetime.now()
+        )
+        with pytest.raises(TournamentCreationError):
+            await tournament_repo.create_tournament(data)
+
+
+class TestTournamentImport:
+    async def test_import_tournaments(
+        self, tournament_repo, created_tournament, db_session
+    ):
+        start_at = datetime(2030, 1, 1)
+        result = await tournament_repo.import_tournaments(
+            [
+                TournamentInDBInput(name="Season 1", max_players=4, start_at=start_at),
+                TournamentInDBInput(name="Season 2", max_players=4, start_at=start_at),
+                TournamentInDBInput(name="Season 1", max_players=8, start_at=start_at),
+                TournamentInDBInput(
+                    name=created_tournament.name, max_players=20, start_at=start_at
+                ),
+            ],
+            batch_size=2,
+        )
+
+        assert len(result.created) == 2
+        assert result.updated == [created_tournament.id]
+        assert result.rejected == []
+        season = await tournament_repo.get_tournament(result.created[0])
+        assert season.name == "Season 1"
+        assert season.max_players == 8
+        updated = await tournament_repo.get_tournament(created_tournament.id)
+        assert updated.max_players == 20
+
+    async def test_import_tournaments_rejects_capacity_below_registered(
+        self, tournament_repo, created_tournament, db_session
+    ):
+        await PlayerRepo(db_session).create_player(
+            PlayerInDBInput(
+                name="John Doe",
+                email="john@example.com",
+                tournament_id=created_tournament.id,
+            )
+        )
+
+        result = await tournament_repo.import_tournaments(
+            [
+                TournamentInDBInput(
+                    name=created_tournament.name,
+                    max_players=0,
+                    start_at=datetime.now(),
+                )
+            ]
+        )
+
+        assert result.created == []
+        assert result.updated == []
+        assert result.rejected == [created_tournament.name]
+
+
 class TestTournamentRetrieval:
-    def test_get_tournament(self, tournament_repo, created_tournament):
-        tournament = tournament_repo.get_tournament(created_tournament.id)
+    async def test_get_tournament(self, tournament_repo, created_tournament):
+        tournament = await tournament_repo.get_tournament(created_tournament.id)
         assert tournament.id == created_tournament.id
         assert tournament.name == created_tournament.name
         assert tournament.max_players == created_tournament.max_players
@@ -53,23 +130,330 @@ class TestTournamentRetrieval:
             abs((tournament.start_at - created_tournament.start_at).total_seconds()) < 1
         )
 
-    def test_get_nonexistent_tournament(self, tournament_repo):
+    async def test_get_tournament_registered_players(
+        self, tournament_repo, created_tournament, db_session
+    ):
+        player_repo = PlayerRepo(db_session)
+        player = await player_repo.create_player(
+            PlayerInDBInput(
+                name="John Doe",
+                email="john@example.com",
+                tournament_id=created_tournament.id,
+            )
+        )
+
+        tournament = await tournament_repo.get_tournament(created_tournament.id)
+        assert tournament.registered_players == 1
+
+        await player_repo.delete_player(player.id)
+        tournament = await tournament_repo.get_tournament(created_tournament.id)
+        assert tournament.registered_players == 0
+
+    async def test_get_tournament_is_cached_until_update(
+        self, tournament_repo, created_tournament, tournament_data, db_session
+    ):
+        queries = []
+        event.listen(
+            db_session.bind.sync_engine,
+            "before_cursor_execute",
+            lambda *args: queries.append(args[2]),
+        )
+        await tournament_repo.get_tournament(created_tournament.id)
+        await tournament_repo.get_tournament(created_tournament.id)
+        assert len(queries) == 1
+
+        await tournament_repo.update_tournament(
+            created_tournament.id,
+            TournamentInDBInput(
+                name="Renamed Tournament",
+                max_players=tournament_data.max_players,
+                start_at=tournament_data.start_at,
+            ),
+        )
+        tournament = await tournament_repo.get_tournament(created_tournament.id)
+        assert tournament.name == "Renamed Tournament"
+
+    async def test_get_tournament_not_cached_when_invalidated_during_read(
+        self, tournament_repo, created_tournament, db_session
+    ):
+        # A write committing while the SELECT runs invalidates the entry before
+        # the read stores what it saw.
+        engine = db_session.bind.sync_engine
+        listener = lambda *args: tournament_cache.invalidate(created_tournament.id)
+        event.listen(engine, "after_cursor_execute", listener)
+        try:
+            await tournament_repo.get_tournament(created_tournament.id)
+            await tournament_repo.get_capacities([created_tournament.id])
+        finally:
+            event.remove(engine, "after_cursor_execute", listener)
+
+        assert tournament_cache.get(created_tournament.id) is None
+
+    async def test_get_tournament_cache_invalidated_by_registration(
+        self, tournament_repo, created_tournament, db_session
+    ):
+        await tournament_repo.get_tournament(created_tournament.id)
+        await PlayerRepo(db_session).create_player(
+            PlayerInDBInput(
+                name="John Doe",
+                email="john@example.com",
+                tournament_id=created_tournament.id,
+            )
+        )
+        tournament = await tournament_repo.get_tournament(created_tournament.id)
+        assert tournament.registered_players == 1
+
+    async def test_version_bumped_by_tournament_and_roster_changes(
+        self, tournament_repo, created_tournament, tournament_data, db_session
+    ):
+        assert (await tournament_repo.get_tournament(created_tournament.id)).version == 1
+        player = await PlayerRepo(db_session).create_player(
+            PlayerInDBInput(
+                name="John Doe",
+                email="john@example.com",
+                tournament_id=created_tournament.id,
+            )
+        )
+        assert (await tournament_repo.get_tournament(created_tournament.id)).version == 2
+        await PlayerRepo(db_session).update_player(
+            player.id,
+            PlayerInDBInput(
+                name="Johnny Doe",
+                email="john@example.com",
+                tournament_id=created_tournament.id,
+            ),
+        )
+        assert (await tournament_repo.get_tournament(created_tournament.id)).version == 3
+        updated = await tournament_repo.update_tournament(
+            created_tournament.id, tournament_data
+        )
+        assert updated.version == 4
+
+    async def test_get_nonexistent_tournament(self, tournament_repo):
         with pytest.raises(TournamentNotFoundError) as excinfo:
-            tournament_repo.get_tournament(999)
+            await tournament_repo.get_tournament(999)
         assert "Tournament with id 999 not found" in str(excinfo.value)
 
-    def test_get_tournaments(self, tournament_repo, created_tournament):
-        tournaments = tournament_repo.get_tournaments()
-        assert len(tournaments) >= 1
-        assert any(tournament.id == created_tournament.id for tournament in tournaments)
+    async def test_get_tournaments(self, tournament_repo, created_tournament):
+        tournaments = await tournament_repo.get_tournaments()
+        assert len(tournaments.items) >= 1
+        assert any(
+            tournament.id == created_tournament.id for tournament in tournaments.items
+        )
+
+    async def test_get_tournaments_pages(self, tournament_repo, created_tournament):
+        for i in range(4):
+            await tournament_repo.create_tournament(
+                TournamentInDBInput(
+                    name=f"Paged Tournament {i}", max_players=5, start_at=datetime.now()
+                )
+            )
+
+        first_page = await tournament_repo.get_tournaments(limit=3)
+        second_page = await tournament_repo.get_tournaments(
+            limit=3, cursor=first_page.next_cursor
+        )
+
+        assert len(first_page.items) == 3
+        assert len(second_page.items) == 2
+        assert second_page.next_cursor is None
+        ids = [tournament.id for tournament in first_page.items + second_page.items]
+        assert ids == sorted(set(ids))
+
+    async def test_get_tournaments_invalid_cursor(self, tournament_repo):
+        with pytest.raises(InvalidCursorError):
+            await tournament_repo.get_tournaments(cursor="bm90IGEgY3Vyc29y")
+
+    async def test_get_tournaments_loads_counts_in_one_query(
+        self, tournament_repo, created_tournament, db_session
+    ):
+        for i in range(3):
+            other = await tournament_repo.create_tournament(
+                TournamentInDBInput(
+                    name=f"Other Tournament {i}", max_players=5, start_at=datetime.now()
+                )
+            )
+            await PlayerRepo(db_session).create_player(
+                PlayerInDBInput(
+                    name="Player", email="p@example.com", tournament_id=other.id
+                )
+            )
+
+        statements = []
+        engine = db_session.bind.sync_engine
+        listener = lambda *args: statements.append(args[2])
+        event.listen(engine, "before_cursor_execute", listener)
+        try:
+            tournaments = await tournament_repo.get_tournaments()
+        finally:
+            event.remove(engine, "before_cursor_execute", listener)
+
+        assert len(statements) == 1
+        counts = {
+            tournament.name: tournament.registered_players
+            for tournament in tournaments.items
+        }
+        assert counts[created_tournament.name] == 0
+        assert counts["Other Tournament 0"] == 1
+
+
+class TestTournamentSearch:
+    @pytest_asyncio.fixture
+    async def tournaments(self, tournament_repo, db_session):
+        created = {}
+        for day, name, max_players in [
+            (3, "Spring Open", 1),
+            (1, "Winter Cup", 5),
+            (4, "Spring Cup", 5),
+            (2, "Summer 100% Open", 5),
+        ]:
+            created[name] = await tournament_repo.create_tournament(
+                TournamentInDBInput(
+                    name=name, max_players=max_players, start_at=datetime(2030, 1, day)
+                )
+            )
+        await PlayerRepo(db_session).create_player(
+            PlayerInDBInput(
+                name="Player",
+                email="p@example.com",
+                tournament_id=created["Spring Open"].id,
+            )
+        )
+        return created
+
+    async def _names(self, tournament_repo, limit=50, **filters):
+        page = await tournament_repo.get_tournaments(
+            limit=limit, filters=TournamentFilters(**filters)
+        )
+        return [tournament.name for tournament in page.items]
+
+    async def test_start_range(self, tournament_repo, tournaments):
+        names = await self._names(
+            tournament_repo,
+            starts_from=datetime(2030, 1, 2),
+            starts_before=datetime(2030, 1, 4),
+            sort="start_at",
+        )
+        assert names == ["Summer 100% Open", "Spring Open"]
+
+    async def test_name_contains_ignores_case(self, tournament_repo, tournaments):
+        names = await self._names(tournament_repo, name="cup", sort="name")
+        assert names == ["Spring Cup", "Winter Cup"]
+
+    async def test_name_prefix(self, tournament_repo, tournaments):
+        names = await self._names(tournament_repo, name_prefix="spring", sort="name")
+        assert names == ["Spring Cup", "Spring Open"]
+
+    async def test_name_wildcards_are_literal(self, tournament_repo, tournaments):
+        assert await self._names(tournament_repo, name="100%") == ["Summer 100% Open"]
+        assert await self._names(tournament_repo, name="_") == []
+
+    async def test_has_free_seats(self, tournament_repo, tournaments):
+        assert "Spring Open" not in await self._names(
+            tournament_repo, has_free_seats=True
+        )
+        assert await self._names(tournament_repo, has_free_seats=False) == [
+            "Spring Open"
+        ]
+
+    async def test_sorted_pages(self, tournament_repo, tournaments):
+        for sort, expected in [
+            ("-start_at", ["Spring Cup", "Spring Open", "Summer 100% Open", "Winter Cup"]),
+            ("name", ["Spring Cup", "Spring Open", "Summer 100% Open", "Winter Cup"]),
+        ]:
+            names, cursor = [], None
+            while True:
+                page = await tournament_repo.get_tournaments(
+                    limit=3, cursor=cursor, filters=TournamentFilters(sort=sort)
+                )
+                names.extend(tournament.name for tournament in page.items)
+                cursor = page.next_cursor
+                if cursor is None:
+                    break
+            assert names == expected
+
+    async def test_aware_start_range_is_compared_in_utc(
+        self, tournament_repo, tournaments
+    ):
+        names = await self._names(
+            tournament_repo, starts_from="2030-01-04T01:00:00+02:00"
+        )
+        assert names == ["Spring Cup"]
+
+
+class TestTournamentCapacities:
+    @pytest_asyncio.fixture
+    async def tournament_ids(self, tournament_repo, db_session):
+        ids = []
+        for i in range(4):
+            tournament = await tournament_repo.create_tournament(
+                TournamentInDBInput(
+                    name=f"Storefront Tournament {i}",
+                    max_players=2,
+                    start_at=datetime.now(),
+                )
+            )
+            ids.append(tournament.id)
+        for number in range(2):
+            await PlayerRepo(db_session).create_player(
+                PlayerInDBInput(
+                    name=f"Player {number}",
+                    email=f"player{number}@example.com",
+                    tournament_id=ids[0],
+                )
+            )
+        await PlayerRepo(db_session).create_player(
+            PlayerInDBInput(name="Player", email="p@example.com", tournament_id=ids[1])
+        )
+        tournament_cache.clear()
+        return ids
+
+    @staticmethod
+    def count_statements(db_session) -> list[str]:
+        statements = []
+        event.listen(
+            db_session.bind.sync_engine,
+            "before_cursor_execute",
+            lambda *args: statements.append(args[2]),
+        )
+        return statements
+
+    async def test_get_capacities_in_one_query(
+        self, tournament_repo, tournament_ids, db_session
+    ):
+        statements = self.count_statements(db_session)
+
+        capacities = await tournament_repo.get_capacities(
+            [tournament_ids[2], tournament_ids[0], 999999, tournament_ids[1]]
+        )
+
+        assert len(statements) == 1
+        assert [
+            (capacity.id, capacity.registered_players, capacity.free_seats)
+            for capacity in capacities
+        ] == [(tournament_ids[2], 0, 2), (tournament_ids[0], 2, 0), (tournament_ids[1], 1, 1)]
+
+    async def test_get_capacities_reads_only_uncached_tournaments(
+        self, tournament_repo, tournament_ids, db_session
+    ):
+        await tournament_repo.get_capacities(tournament_ids[:2])
+        statements = self.count_statements(db_session)
+
+        cached = await tournament_repo.get_capacities(tournament_ids[:2])
+        assert statements == []
+
+        mixed = await tournament_repo.get_capacities(tournament_ids)
+        assert len(statements) == 1
+        assert mixed[:2] == cached
+        assert [capacity.id for capacity in mixed] == tournament_ids
 
 
 class TestTournamentUpdate:
-    def test_update_tournament(self, tournament_repo, created_tournament):
+    async def test_update_tournament(self, tournament_repo, created_tournament):
         updated_data = TournamentInDBInput(
             name="Test Tournament 2", max_players=15, start_at=datetime.now()
         )
-        updated_tournament = tournament_repo.update_tournament(
+        updated_tournament = await tournament_repo.update_tournament(
             created_tournament.id, updated_data
         )
 
@@ -78,18 +462,18 @@ class TestTournamentUpdate:
         assert updated_tournament.max_players == updated_data.max_players
 
 
-    def test_update_nonexistent_tournament(self, tournament_repo, tournament_data):
+    async def test_update_nonexistent_tournament(self, tournament_repo, tournament_data):
         with pytest.raises(TournamentNotFoundError) as excinfo:
-            tournament_repo.update_tournament(999, tournament_data)
+            await tournament_repo.update_tournament(999, tournament_data)
         assert "Tournament with id 999 not found" in str(excinfo.value)
 
-    def test_update_duplicate_name(
+    async def test_update_duplicate_name(
         self, tournament_repo, created_tournament, db_session
     ):
         another_tournament_data = TournamentInDBInput(
             name="Another Tournament", max_players=8, start_at=datetime.now()
         )
-        another_tournament = tournament_repo.create_tournament(another_tournament_data)
+        another_tournament = await tournament_repo.create_tournament(another_tournament_data)
 
         update_data = TournamentInDBInput(
             name=created_tournament.name,
@@ -98,7 +482,7 @@ class TestTournamentUpdate:
         )
 
         with pytest.raises(TournamentNameExistsError) as excinfo:
-            tournament_repo.update_tournament(another_tournament.id, update_data)
+            await tournament_repo.update_tournament(another_tournament.id, update_data)
         assert (
             f"Tournament with name '{created_tournament.name}' already exists"
             in str(excinfo.value)
@@ -106,15 +490,15 @@ class TestTournamentUpdate:
 
 
 class TestTournamentDeletion:
-    def test_delete_tournament(self, tournament_repo, created_tournament):
-        assert tournament_repo.delete_tournament(created_tournament.id) is True
+    async def test_delete_tournament(self, tournament_repo, created_tournament):
+        assert await tournament_repo.delete_tournament(created_tournament.id) is True
         with pytest.raises(TournamentNotFoundError) as excinfo:
-            tournament_repo.get_tournament(created_tournament.id)
+            await tournament_repo.get_tournament(created_tournament.id)
         assert f"Tournament with id {created_tournament.id} not found" in str(
             excinfo.value
         )
 
-    def test_delete_nonexistent_tournament(self, tournament_repo):
+    async def test_delete_nonexistent_tournament(self, tournament_repo):
         with pytest.raises(TournamentNotFoundError) as excinfo:
-            tournament_repo.delete_tournament(999)
+            await tournament_repo.delete_tournament(999)
         assert "Tournament with id 999 not found" in str(excinfo.value)
\ No newline at end of file
@@ -1,9 +1,15 @@
 import pytest
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 from fastapi import HTTPException
+from prometheus_client import REGISTRY
 from datetime import datetime
 
-from app.schemas.player import PlayerInDBInput, PlayerInDBOutput
+from app.schemas.player import (
+    PlayerInDBInput,
+    PlayerInDBOutput,
+    PlayerInRequest,
+    PlayerRegistrationResult,
+)
 from app.exceptions.player import (
     PlayerNotFoundError,
     PlayerFetchError,
@@ -12,22 +18,40 @@ from app.exceptions.player import (
     PlayerDeletionError,
     PlayerEmailExistsError
 )
+from app.exceptions.tournament import TournamentNotFoundError
 from app.services.player import (
     create_player,
+    export_players_by_tournament,
     get_player,
     get_players,
     get_players_by_tournament,
     get_players_count_by_tournament,
+    register_players,
     update_player,
     delete_player
 )
 
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def mock_db():
+    return MagicMock()
+
 
 @pytest.fixture
 def mock_player_repo():
     with patch("app.services.player.PlayerRepo") as mock_repo:
         # Configure the mock to return a mock instance
-        mock_instance = MagicMock()
+        mock_instance = AsyncMock()
+        mock_repo.return_value = mock_instance
+        yield mock_instance
+
+
+@pytest.fixture
+def mock_tournament_repo():
+    with patch("app.services.player.TournamentRepo") as mock_repo:
+        mock_instance = AsyncMock()
         mock_repo.return_value = mock_instance
         yield mock_instance
 
@@ -52,164 +76,262 @@ def player_output():
     )
 
 
+async def _batches(*batches):
+    for batch in batches:
+        yield batch
+
+
 class TestPlayerCreation:
-    def test_create_player_success(self, mock_player_repo, player_data, player_output):
+    async def test_create_player_success(self, mock_db, mock_player_repo, player_data, player_output):
         mock_player_repo.create_player.return_value = player_output
 
-        result = create_player(player_data)
+        result = await create_player(mock_db, player_data)
 
         assert result == player_output
         mock_player_repo.create_player.assert_called_once_with(player_data)
 
-    def test_create_player_email_exists(self, mock_player_repo, player_data):
+    async def test_create_player_counts_outcomes(self, mock_db, mock_player_repo, player_data, player_output):
+        def registrations(outcome):
+            return REGISTRY.get_sample_value(
+                "player_registrations_total", {"outcome": outcome}
+            ) or 0.0
+
+        success, duplicate = registrations("success"), registrations("duplicate")
+        mock_player_repo.create_player.return_value = player_output
+        await create_player(mock_db, player_data)
+        mock_player_repo.create_player.side_effect = PlayerEmailExistsError()
+        with pytest.raises(HTTPException):
+            await create_player(mock_db, player_data)
+
+        assert registrations("success") == success + 1
+        assert registrations("duplicate") == duplicate + 1
+
+    async def test_create_player_email_exists(self, mock_db, mock_player_repo, player_data):
         mock_player_repo.create_player.side_effect = PlayerEmailExistsError(
             email=player_data.email, tournament_id=player_data.tournament_id
         )
 
         with pytest.raises(HTTPException) as excinfo:
-            create_player(player_data)
+            await create_player(mock_db, player_data)
         assert excinfo.value.status_code == 409
         assert f"Player with email '{player_data.email}'" in str(excinfo.value.detail)
 
-    def test_create_player_creation_error(self, mock_player_repo, player_data):
+    async def test_create_player_creation_error(self, mock_db, mock_player_repo, player_data):
         mock_player_repo.create_player.side_effect = PlayerCreationError("Creation error")
 
         with pytest.raises(HTTPException) as excinfo:
-            create_player(player_data)
+            await create_player(mock_db, player_data)
         assert excinfo.value.status_code == 500
         assert "Creation error" in str(excinfo.value.detail)
 
+    async def test_create_player_tournament_not_found(self, mock_db, mock_player_repo, player_data):
+        mock_player_repo.create_player.side_effect = TournamentNotFoundError(1)
+
+        with pytest.raises(HTTPException) as excinfo:
+            await create_player(mock_db, player_data)
+        assert excinfo.value.status_code == 404
+        assert "Tournament with id 1 not found" in str(excinfo.value.detail)
+
+
+class TestPlayerBatchRegistration:
+    async def test_register_players_success(self, mock_db, mock_player_repo, player_output):
+        players = [PlayerInRequest(name="Test Player", email="test@example.com")]
+        results = [
+            PlayerRegistrationResult(
+                email="test@example.com", status="registered", player=player_output
+            )
+        ]
+        mock_player_repo.register_players.return_value = results
+
+        assert await register_players(mock_db, 1, players) == results
+        mock_player_repo.register_players.assert_called_once_with(1, players)
+
+    async def test_register_players_tournament_not_found(self, mock_db, mock_player_repo):
+        mock_player_repo.register_players.side_effect = TournamentNotFoundError(1)
+
+        with pytest.raises(HTTPException) as excinfo:
+            await register_players(mock_db, 1, [])
+        assert excinfo.value.status_code == 404
+
+    async def test_register_players_creation_error(self, mock_db, mock_player_repo):
+        mock_player_repo.register_players.side_effect = PlayerCreationError("Insert failed")
+
+        with pytest.raises(HTTPException) as excinfo:
+            await register_players(mock_db, 1, [])
+        assert excinfo.value.status_code == 500
+        assert "Insert failed" in str(excinfo.value.detail)
+
 
 class TestPlayerRetrieval:
-    def test_get_player_success(self, mock_player_repo, player_output):
+    async def test_get_player_success(self, mock_db, mock_player_repo, player_output):
         mock_player_repo.get_player.return_value = player_output
 
-        result = get_player(1)
+        result = await get_player(mock_db, 1)
 
         assert result == player_output
         mock_player_repo.get_player.assert_called_once_with(1)
 
-    def test_get_player_not_found(self, mock_player_repo):
+    async def test_get_player_not_found(self, mock_db, mock_player_repo):
         mock_player_repo.get_player.side_effect = PlayerNotFoundError(1)
 
         with pytest.raises(HTTPException) as excinfo:
-            get_player(1)
+            await get_player(mock_db, 1)
         assert excinfo.value.status_code == 404
         assert "Player with id 1 not found" in str(excinfo.value.detail)
 
-    def test_get_player_fetch_error(self, mock_player_repo):
+    async def test_get_player_fetch_error(self, mock_db, mock_player_repo):
         mock_player_repo.get_player.side_effect = PlayerFetchError("Fetch error")
 
         with pytest.raises(HTTPException) as excinfo:
-            get_player(1)
+            await get_player(mock_db, 1)
         assert excinfo.value.status_code == 500
         assert "Fetch error" in str(excinfo.value.detail)
 
-    def test_get_players_success(self, mock_player_repo, player_output):
+    async def test_get_players_success(self, mock_db, mock_player_repo, player_output):
         mock_player_repo.get_players.return_value = [player_output]
 
-        result = get_players()
+        result = await get_players(mock_db)
 
         assert result == [player_output]
         mock_player_repo.get_players.assert_called_once()
 
-    def test_get_players_fetch_error(self, mock_player_repo):
+    async def test_get_players_fetch_error(self, mock_db, mock_player_repo):
         mock_player_repo.get_players.side_effect = PlayerFetchError("Fetch error")
 
         with pytest.raises(HTTPException) as excinfo:
-            get_players()
+            await get_players(mock_db)
         assert excinfo.value.status_code == 500
         assert "Fetch error" in str(excinfo.value.detail)
 
-    def test_get_players_by_tournament_success(self, mock_player_repo, player_output):
+    async def test_get_players_by_tournament_success(self, mock_db, mock_player_repo, player_output):
         mock_player_repo.get_players_by_tournament.return_value = [player_output]
 
-        result = get_players_by_tournament(1)
+        result = await get_players_by_tournament(mock_db, 1)
 
         assert result == [player_output]
-        mock_player_repo.get_players_by_tournament.assert_called_once_with(1)
+        mock_player_repo.get_players_by_tournament.assert_called_once_with(1, 50, None)
 
-    def test_get_players_by_tournament_error(self, mock_player_repo):
+    async def test_get_players_by_tournament_error(self, mock_db, mock_player_repo):
         mock_player_repo.get_players_by_tournament.side_effect = PlayerFetchError("Fetch error")
 
         with pytest.raises(HTTPException) as excinfo:
-            get_players_by_tournament(1)
+            await get_players_by_tournament(mock_db, 1)
         assert excinfo.value.status_code == 500
         assert "Fetch error" in str(excinfo.value.detail)
 
-    def test_get_players_count_by_tournament_success(self, mock_player_repo):
+    async def test_export_players_by_tournament_ndjson(
+        self, mock_db, mock_player_repo, mock_tournament_repo, player_output
+    ):
+        mock_player_repo.stream_players_by_tournament = MagicMock(
+            return_value=_batches([player_output, player_output], [player_output])
+        )
+
+        with patch("app.services.player.SessionLocal", MagicMock()):
+            chunks = await export_players_by_tournament(mock_db, 1, "ndjson")
+            body = "".join([chunk async for chunk in chunks])
+
+        lines = body.splitlines()
+        assert len(lines) == 3
+        assert all(line == player_output.model_dump_json() for line in lines)
+
+    async def test_export_players_by_tournament_csv(
+        self, mock_db, mock_player_repo, mock_tournament_repo, player_output
+    ):
+        mock_player_repo.stream_players_by_tournament = MagicMock(
+            return_value=_batches([player_output], [player_output])
+        )
+
+        with patch("app.services.player.SessionLocal", MagicMock()):
+            chunks = await export_players_by_tournament(mock_db, 1, "csv")
+            body = "".join([chunk async for chunk in chunks])
+
+        rows = body.splitlines()
+        assert rows[0] == "id,name,email,tournament_id,registered_at"
+        assert len(rows) == 3
+        assert rows[1].startswith("1,Test Player,test@example.com,1,")
+
+    async def test_export_players_by_tournament_not_found(
+        self, mock_db, mock_tournament_repo
+    ):
+        mock_tournament_repo.get_tournament.side_effect = TournamentNotFoundError(1)
+
+        with pytest.raises(HTTPException) as excinfo:
+            await export_players_by_tournament(mock_db, 1)
+        assert excinfo.value.status_code == 404
+
+    async def test_get_players_count_by_tournament_success(self, mock_db, mock_player_repo):
         mock_player_repo.get_players_count_by_tournament.return_value = 5
 
-        result = get_players_count_by_tournament(1)
+        result = await get_players_count_by_tournament(mock_db, 1)
 
         assert result == 5
         mock_player_repo.get_players_count_by_tournament.assert_called_once_with(1)
 
-    def test_get_players_count_by_tournament_error(self, mock_player_repo):
+    async def test_get_players_count_by_tournament_error(self, mock_db, mock_player_repo):
         mock_player_repo.get_players_count_by_tournament.side_effect = PlayerFetchError("Fetch error")
 
         with pytest.raises(HTTPException) as excinfo:
-            get_players_count_by_tournament(1)
+            await get_players_count_by_tournament(mock_db, 1)
         assert excinfo.value.status_code == 500
         assert "Fetch error" in str(excinfo.value.detail)
 
 
 class TestPlayerUpdate:
-    def test_update_player_success(self, mock_player_repo, player_data, player_output):
+    async def test_update_player_success(self, mock_db, mock_player_repo, player_data, player_output):
         mock_player_repo.update_player.return_value = player_output
 
-        result = update_player(1, player_data)
+        result = await update_player(mock_db, 1, player_data)
 
         assert result == player_output
         mock_player_repo.update_player.assert_called_once_with(1, player_data)
 
-    def test_update_player_not_found(self, mock_player_repo, player_data):
+    async def test_update_player_not_found(self, mock_db, mock_player_repo, player_data):
         mock_player_repo.update_player.side_effect = PlayerNotFoundError(1)
 
         with pytest.raises(HTTPException) as excinfo:
-            update_player(1, player_data)
+            await update_player(mock_db, 1, player_data)
         assert excinfo.value.status_code == 404
 
-    def test_update_player_email_exists(self, mock_player_repo, player_data):
+    async def test_update_player_email_exists(self, mock_db, mock_player_repo, player_data):
         mock_player_repo.update_player.side_effect = PlayerEmailExistsError(
             email=player_data.email, tournament_id=player_data.tournament_id
         )
 
         with pytest.raises(HTTPException) as excinfo:
-            update_player(1, player_data)
+            await update_player(mock_db, 1, player_data)
         assert excinfo.value.status_code == 409
         assert f"Player with email '{player_data.email}'" in str(excinfo.value.detail)
 
-    def test_update_player_error(self, mock_player_repo, player_data):
+    async def test_update_player_error(self, mock_db, mock_player_repo, player_data):
         mock_player_repo.update_player.side_effect = PlayerUpdateError("Update error")
 
         with pytest.raises(HTTPException) as excinfo:
-            update_player(1, player_data)
+            await update_player(mock_db, 1, player_data)
         assert excinfo.value.status_code == 500
         assert "Update error" in str(excinfo.value.detail)
 
 
 class TestPlayerDeletion:
-    def test_delete_player_success(self, mock_player_repo):
+    async def test_delete_player_success(self, mock_db, mock_player_repo):
         mock_player_repo.delete_player.return_value = True
 
-        result = delete_player(1)
+        result = await delete_player(mock_db, 1)
 
         assert result is True
         mock_player_repo.delete_player.assert_called_once_with(1)
 
-    def test_delete_player_not_found(self, mock_player_repo):
+    async def test_delete_player_not_found(self, mock_db, mock_player_repo):
         mock_player_repo.delete_player.side_effect = PlayerNotFoundError(1)
 
         with pytest.raises(HTTPException) as excinfo:
-            delete_player(1)
+            await delete_player(mock_db, 1)
         assert excinfo.value.status_code == 404
         assert "Player with id 1 not found" in str(excinfo.value.detail)
 
-    def test_delete_player_error(self, mock_player_repo):
+    async def test_delete_player_error(self, mock_db, mock_player_repo):
         mock_player_repo.delete_player.side_effect = PlayerDeletionError("Deletion error")
 
         with pytest.raises(HTTPException) as excinfo:
-            delete_player(1)
+            await delete_player(mock_db, 1)
         assert excinfo.value.status_code == 500
         assert "Deletion error" in str(excinfo.value.detail)
\ No newline at end of file
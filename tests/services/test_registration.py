@@ -0,0 +1,167 @@
+import asyncio
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.exceptions.player import (
+    PlayerCreationError,
+    PlayerEmailExistsError,
+    TournamentPlayerLimitError,
+)
+from app.exceptions.tournament import TournamentNotFoundError
+from app.schemas.player import (
+    PlayerInDBInput,
+    PlayerInDBOutput,
+    PlayerInRequest,
+    PlayerRegistrationResult,
+)
+from app.services.registration import RegistrationCoalescer
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def mock_player_repo():
+    with patch("app.services.registration.PlayerRepo") as mock_repo:
+        mock_instance = AsyncMock()
+        mock_repo.return_value = mock_instance
+        yield mock_instance
+
+
+@pytest.fixture
+def session_factory():
+    session = MagicMock()
+    session.__aenter__ = AsyncMock(return_value=session)
+    session.__aexit__ = AsyncMock(return_value=None)
+    return MagicMock(return_value=session)
+
+
+def player_input(number: int, tournament_id: int = 1) -> PlayerInDBInput:
+    return PlayerInDBInput(
+        name=f"Player {number}",
+        email=f"player{number}@example.com",
+        tournament_id=tournament_id,
+    )
+
+
+def player_output(number: int, tournament_id: int = 1) -> PlayerInDBOutput:
+    return PlayerInDBOutput(
+        id=number,
+        name=f"Player {number}",
+        email=f"player{number}@example.com",
+        tournament_id=tournament_id,
+        registered_at=datetime(2030, 1, 1),
+    )
+
+
+def registered(tournament_id: int, players: list[PlayerInRequest]):
+    return [
+        PlayerRegistrationResult(
+            email=player.email,
+            status="registered",
+            player=player_output(int(player.name.split()[-1]), tournament_id),
+        )
+        for player in players
+    ]
+
+
+class TestRegistrationCoalescer:
+    async def test_concurrent_registrations_share_one_write(
+        self, session_factory, mock_player_repo
+    ):
+        mock_player_repo.register_players.side_effect = registered
+        coalescer = RegistrationCoalescer(session_factory, window=0.01, max_batch=100)
+
+        players = await asyncio.gather(
+            *(coalescer.register(player_input(i)) for i in range(5))
+        )
+
+        assert [player.id for player in players] == list(range(5))
+        mock_player_repo.register_players.assert_awaited_once()
+        tournament_id, batch = mock_player_repo.register_players.await_args.args
+        assert tournament_id == 1
+        assert [player.email for player in batch] == [
+            f"player{i}@example.com" for i in range(5)
+        ]
+
+    async def test_groups_are_per_tournament(self, session_factory, mock_player_repo):
+        mock_player_repo.register_players.side_effect = registered
+        coalescer = RegistrationCoalescer(session_factory, window=0.01, max_batch=100)
+
+        players = await asyncio.gather(
+            coalescer.register(player_input(1, tournament_id=1)),
+            coalescer.register(player_input(2, tournament_id=2)),
+            coalescer.register(player_input(3, tournament_id=1)),
+        )
+
+        assert [player.tournament_id for player in players] == [1, 2, 1]
+        assert mock_player_repo.register_players.await_count == 2
+
+    async def test_full_group_is_written_without_waiting(
+        self, session_factory, mock_player_repo
+    ):
+        mock_player_repo.register_players.side_effect = registered
+        coalescer = RegistrationCoalescer(session_factory, window=60, max_batch=2)
+
+        players = await asyncio.wait_for(
+            asyncio.gather(*(coalescer.register(player_input(i)) for i in range(2))),
+            timeout=5,
+        )
+
+        assert len(players) == 2
+
+    async def test_each_request_gets_its_own_outcome(
+        self, session_factory, mock_player_repo
+    ):
+        mock_player_repo.register_players.return_value = [
+            PlayerRegistrationResult(
+                email="player0@example.com", status="registered", player=player_output(0)
+            ),
+            PlayerRegistrationResult(email="player1@example.com", status="duplicate"),
+            PlayerRegistrationResult(email="player2@example.com", status="full"),
+        ]
+        coalescer = RegistrationCoalescer(session_factory, window=0.01, max_batch=100)
+
+        outcomes = await asyncio.gather(
+            *(coalescer.register(player_input(i)) for i in range(3)),
+            return_exceptions=True,
+        )
+
+        assert outcomes[0] == player_output(0)
+        assert isinstance(outcomes[1], PlayerEmailExistsError)
+        assert isinstance(outcomes[2], TournamentPlayerLimitError)
+
+    async def test_tournament_not_found(self, session_factory, mock_player_repo):
+        mock_player_repo.register_players.side_effect = TournamentNotFoundError(1)
+        coalescer = RegistrationCoalescer(session_factory, window=0.01, max_batch=100)
+
+        outcomes = await asyncio.gather(
+            *(coalescer.register(player_input(i)) for i in range(2)),
+            return_exceptions=True,
+        )
+
+        assert all(isinstance(outcome, TournamentNotFoundError) for outcome in outcomes)
+
+    async def test_write_error(self, session_factory, mock_player_repo):
+        mock_player_repo.register_players.side_effect = PlayerCreationError("boom")
+        coalescer = RegistrationCoalescer(session_factory, window=0.01, max_batch=100)
+
+        with pytest.raises(PlayerCreationError):
+            await coalescer.register(player_input(1))
+
+    async def test_missing_results_fail_every_registration(
+        self, session_factory, mock_player_repo
+    ):
+        mock_player_repo.register_players.return_value = registered(1, [])
+        coalescer = RegistrationCoalescer(session_factory, window=0.01, max_batch=100)
+
+        outcomes = await asyncio.wait_for(
+            asyncio.gather(
+                *(coalescer.register(player_input(i)) for i in range(2)),
+                return_exceptions=True,
+            ),
+            timeout=5,
+        )
+
+        assert all(isinstance(outcome, PlayerCreationError) for outcome in outcomes)
@@ -1,9 +1,13 @@
 import pytest
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 from fastapi import HTTPException
 from datetime import datetime
 
-from app.schemas.tournament import TournamentInDBInput, TournamentInDBOutput
+from app.schemas.tournament import (
+    TournamentImportOutput,
+    TournamentInDBInput,
+    TournamentInDBOutput,
+)
 from app.exceptions.tournament import (
     TournamentBaseException,
     TournamentNotFoundError,
@@ -11,25 +15,43 @@ from app.exceptions.tournament import (
     TournamentCreationError,
     TournamentUpdateError,
     TournamentDeletionError,
-    TournamentNameExistsError
+    TournamentNameExistsError,
+    TournamentSeatFeedError,
 )
+from app.exceptions.pagination import InvalidCursorError
 from app.services.tournament import (
     create_tournament,
     get_tournament,
     get_tournaments,
+    import_tournaments,
     update_tournament,
-    delete_tournament
+    delete_tournament,
+    subscribe_to_seats,
 )
 
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def mock_db():
+    return MagicMock()
+
 
 @pytest.fixture
 def mock_tournament_repo():
     with patch("app.services.tournament.TournamentRepo") as mock_repo:
-        mock_instance = MagicMock()
+        mock_instance = AsyncMock()
         mock_repo.return_value = mock_instance
         yield mock_instance
 
 
+@pytest.fixture
+def mock_seat_broadcaster():
+    with patch("app.services.tournament.seat_broadcaster") as mock_broadcaster:
+        mock_broadcaster.subscribe = AsyncMock(return_value=MagicMock())
+        yield mock_broadcaster
+
+
 @pytest.fixture
 def tournament_data():
     return TournamentInDBInput(
@@ -51,168 +73,222 @@ def tournament_output():
 
 
 class TestTournamentCreation:
-    def test_create_tournament_success(self, mock_tournament_repo, tournament_data, tournament_output):
+    async def test_create_tournament_success(self, mock_db, mock_tournament_repo, tournament_data, tournament_output):
         mock_tournament_repo.create_tournament.return_value = tournament_output
 
-        result = create_tournament(tournament_data)
+        result = await create_tournament(mock_db, tournament_data)
 
         assert result == tournament_output
         mock_tournament_repo.create_tournament.assert_called_once_with(tournament_data)
 
-    def test_create_tournament_name_exists(self, mock_tournament_repo, tournament_data):
+    async def test_create_tournament_name_exists(self, mock_db, mock_tournament_repo, tournament_data):
         mock_tournament_repo.create_tournament.side_effect = TournamentNameExistsError(tournament_data.name)
 
         with pytest.raises(HTTPException) as excinfo:
-            create_tournament(tournament_data)
+            await create_tournament(mock_db, tournament_data)
         assert excinfo.value.status_code == 409
         assert f"Tournament with name '{tournament_data.name}' already exists" in str(excinfo.value.detail)
 
-    def test_create_tournament_creation_error(self, mock_tournament_repo, tournament_data):
+    async def test_create_tournament_creation_error(self, mock_db, mock_tournament_repo, tournament_data):
         mock_tournament_repo.create_tournament.side_effect = TournamentCreationError("Creation error")
 
         with pytest.raises(HTTPException) as excinfo:
-            create_tournament(tournament_data)
+            await create_tournament(mock_db, tournament_data)
         assert excinfo.value.status_code == 500
         assert "Creation error" in str(excinfo.value.detail)
 
-    def test_create_tournament_base_exception(self, mock_tournament_repo, tournament_data):
+    async def test_create_tournament_base_exception(self, mock_db, mock_tournament_repo, tournament_data):
         mock_tournament_repo.create_tournament.side_effect = TournamentBaseException("Base exception")
 
         with pytest.raises(HTTPException) as excinfo:
-            create_tournament(tournament_data)
+            await create_tournament(mock_db, tournament_data)
         assert excinfo.value.status_code == 500
         assert "Base exception" in str(excinfo.value.detail)
 
 
+class TestTournamentImport:
+    async def test_import_tournaments_success(self, mock_db, mock_tournament_repo, tournament_data):
+        output = TournamentImportOutput(created=[1], updated=[2])
+        mock_tournament_repo.import_tournaments.return_value = output
+
+        result = await import_tournaments(mock_db, [tournament_data])
+
+        assert result == output
+        mock_tournament_repo.import_tournaments.assert_called_once_with([tournament_data])
+
+    async def test_import_tournaments_creation_error(self, mock_db, mock_tournament_repo, tournament_data):
+        mock_tournament_repo.import_tournaments.side_effect = TournamentCreationError("Import error")
+
+        with pytest.raises(HTTPException) as excinfo:
+            await import_tournaments(mock_db, [tournament_data])
+        assert excinfo.value.status_code == 500
+        assert "Import error" in str(excinfo.value.detail)
+
+
 class TestTournamentRetrieval:
-    def test_get_tournament_success(self, mock_tournament_repo, tournament_output):
+    async def test_get_tournament_success(self, mock_db, mock_tournament_repo, tournament_output):
         mock_tournament_repo.get_tournament.return_value = tournament_output
 
-        result = get_tournament(1)
+        result = await get_tournament(mock_db, 1)
 
         assert result == tournament_output
         mock_tournament_repo.get_tournament.assert_called_once_with(1)
 
-    def test_get_tournament_not_found(self, mock_tournament_repo):
+    async def test_get_tournament_not_found(self, mock_db, mock_tournament_repo):
         mock_tournament_repo.get_tournament.side_effect = TournamentNotFoundError(1)
 
         with pytest.raises(HTTPException) as excinfo:
-            get_tournament(1)
+            await get_tournament(mock_db, 1)
         assert excinfo.value.status_code == 404
         assert "Tournament with id 1 not found" in str(excinfo.value.detail)
 
-    def test_get_tournament_fetch_error(self, mock_tournament_repo):
+    async def test_get_tournament_fetch_error(self, mock_db, mock_tournament_repo):
         mock_tournament_repo.get_tournament.side_effect = TournamentFetchError("Fetch error")
 
         with pytest.raises(HTTPException) as excinfo:
-            get_tournament(1)
+            await get_tournament(mock_db, 1)
         assert excinfo.value.status_code == 500
         assert "Fetch error" in str(excinfo.value.detail)
 
-    def test_get_tournament_base_exception(self, mock_tournament_repo):
+    async def test_get_tournament_base_exception(self, mock_db, mock_tournament_repo):
         mock_tournament_repo.get_tournament.side_effect = TournamentBaseException("Base exception")
 
         with pytest.raises(HTTPException) as excinfo:
-            get_tournament(1)
+            await get_tournament(mock_db, 1)
         assert excinfo.value.status_code == 500
         assert "Base exception" in str(excinfo.value.detail)
 
-    def test_get_tournaments_success(self, mock_tournament_repo, tournament_output):
+    async def test_get_tournaments_success(self, mock_db, mock_tournament_repo, tournament_output):
         mock_tournament_repo.get_tournaments.return_value = [tournament_output]
 
-        result = get_tournaments()
+        result = await get_tournaments(mock_db)
 
         assert result == [tournament_output]
-        mock_tournament_repo.get_tournaments.assert_called_once()
+        mock_tournament_repo.get_tournaments.assert_called_once_with(50, None, None)
 
-    def test_get_tournaments_fetch_error(self, mock_tournament_repo):
+    async def test_get_tournaments_invalid_cursor(self, mock_db, mock_tournament_repo):
+        mock_tournament_repo.get_tournaments.side_effect = InvalidCursorError("abc")
+
+        with pytest.raises(HTTPException) as excinfo:
+            await get_tournaments(mock_db, cursor="abc")
+        assert excinfo.value.status_code == 400
+        assert "Invalid pagination cursor 'abc'" in str(excinfo.value.detail)
+
+    async def test_get_tournaments_fetch_error(self, mock_db, mock_tournament_repo):
         mock_tournament_repo.get_tournaments.side_effect = TournamentFetchError("Fetch error")
 
         with pytest.raises(HTTPException) as excinfo:
-            get_tournaments()
+            await get_tournaments(mock_db)
         assert excinfo.value.status_code == 500
         assert "Fetch error" in str(excinfo.value.detail)
 
-    def test_get_tournaments_base_exception(self, mock_tournament_repo):
+    async def test_get_tournaments_base_exception(self, mock_db, mock_tournament_repo):
         mock_tournament_repo.get_tournaments.side_effect = TournamentBaseException("Base exception")
 
         with pytest.raises(HTTPException) as excinfo:
-            get_tournaments()
+            await get_tournaments(mock_db)
         assert excinfo.value.status_code == 500
         assert "Base exception" in str(excinfo.value.detail)
 
 
 class TestTournamentUpdate:
-    def test_update_tournament_success(self, mock_tournament_repo, tournament_data, tournament_output):
+    async def test_update_tournament_success(self, mock_db, mock_tournament_repo, tournament_data, tournament_output):
         mock_tournament_repo.update_tournament.return_value = tournament_output
 
-        result = update_tournament(1, tournament_data)
+        result = await update_tournament(mock_db, 1, tournament_data)
 
         assert result == tournament_output
         mock_tournament_repo.update_tournament.assert_called_once_with(1, tournament_data)
 
-    def test_update_tournament_not_found(self, mock_tournament_repo, tournament_data):
+    async def test_update_tournament_not_found(self, mock_db, mock_tournament_repo, tournament_data):
         mock_tournament_repo.update_tournament.side_effect = TournamentNotFoundError(1)
 
         with pytest.raises(HTTPException) as excinfo:
-            update_tournament(1, tournament_data)
+            await update_tournament(mock_db, 1, tournament_data)
         assert excinfo.value.status_code == 404
         assert "Tournament with id 1 not found" in str(excinfo.value.detail)
 
-    def test_update_tournament_name_exists(self, mock_tournament_repo, tournament_data):
+    async def test_update_tournament_name_exists(self, mock_db, mock_tournament_repo, tournament_data):
         mock_tournament_repo.update_tournament.side_effect = TournamentNameExistsError(tournament_data.name)
 
         with pytest.raises(HTTPException) as excinfo:
-            update_tournament(1, tournament_data)
+            await update_tournament(mock_db, 1, tournament_data)
         assert excinfo.value.status_code == 409
         assert f"Tournament with name '{tournament_data.name}' already exists" in str(excinfo.value.detail)
 
-    def test_update_tournament_update_error(self, mock_tournament_repo, tournament_data):
+    async def test_update_tournament_update_error(self, mock_db, mock_tournament_repo, tournament_data):
         mock_tournament_repo.update_tournament.side_effect = TournamentUpdateError("Update error")
 
         with pytest.raises(HTTPException) as excinfo:
-            update_tournament(1, tournament_data)
+            await update_tournament(mock_db, 1, tournament_data)
         assert excinfo.value.status_code == 500
         assert "Update error" in str(excinfo.value.detail)
 
-    def test_update_tournament_base_exception(self, mock_tournament_repo, tournament_data):
+    async def test_update_tournament_base_exception(self, mock_db, mock_tournament_repo, tournament_data):
         mock_tournament_repo.update_tournament.side_effect = TournamentBaseException("Base exception")
 
         with pytest.raises(HTTPException) as excinfo:
-            update_tournament(1, tournament_data)
+            await update_tournament(mock_db, 1, tournament_data)
         assert excinfo.value.status_code == 500
         assert "Base exception" in str(excinfo.value.detail)
 
 
 class TestTournamentDeletion:
-    def test_delete_tournament_success(self, mock_tournament_repo):
+    async def test_delete_tournament_success(self, mock_db, mock_tournament_repo):
         mock_tournament_repo.delete_tournament.return_value = True
 
-        result = delete_tournament(1)
+        result = await delete_tournament(mock_db, 1)
 
         assert result is True
         mock_tournament_repo.delete_tournament.assert_called_once_with(1)
 
-    def test_delete_tournament_not_found(self, mock_tournament_repo):
+    async def test_delete_tournament_not_found(self, mock_db, mock_tournament_repo):
         mock_tournament_repo.delete_tournament.side_effect = TournamentNotFoundError(1)
 
         with pytest.raises(HTTPException) as excinfo:
-            delete_tournament(1)
+            await delete_tournament(mock_db, 1)
         assert excinfo.value.status_code == 404
         assert "Tournament with id 1 not found" in str(excinfo.value.detail)
 
-    def test_delete_tournament_deletion_error(self, mock_tournament_repo):
+    async def test_delete_tournament_deletion_error(self, mock_db, mock_tournament_repo):
         mock_tournament_repo.delete_tournament.side_effect = TournamentDeletionError("Deletion error")
 
         with pytest.raises(HTTPException) as excinfo:
-            delete_tournament(1)
+            await delete_tournament(mock_db, 1)
         assert excinfo.value.status_code == 500
         assert "Deletion error" in str(excinfo.value.detail)
 
-    def test_delete_tournament_base_exception(self, mock_tournament_repo):
+    async def test_delete_tournament_base_exception(self, mock_db, mock_tournament_repo):
         mock_tournament_repo.delete_tournament.side_effect = TournamentBaseException("Base exception")
 
         with pytest.raises(HTTPException) as excinfo:
-            delete_tournament(1)
+            await delete_tournament(mock_db, 1)
         assert excinfo.value.status_code == 500
-        assert "Base exception" in str(excinfo.value.detail)
\ No newline at end of file
+        assert "Base exception" in str(excinfo.value.detail)
+
+
+class TestSeatSubscription:
+    async def test_subscribe_to_seats_success(self, mock_db, mock_tournament_repo, mock_seat_broadcaster, tournament_output):
+        mock_tournament_repo.get_current_tournament.return_value = tournament_output
+
+        tournament, subscription = await subscribe_to_seats(mock_db, 1)
+
+        assert tournament == tournament_output
+        assert subscription == mock_seat_broadcaster.subscribe.return_value
+        mock_seat_broadcaster.subscribe.assert_awaited_once_with(1)
+
+    async def test_subscribe_to_seats_not_found(self, mock_db, mock_tournament_repo, mock_seat_broadcaster):
+        mock_tournament_repo.get_current_tournament.side_effect = TournamentNotFoundError(1)
+
+        with pytest.raises(HTTPException) as excinfo:
+            await subscribe_to_seats(mock_db, 1)
+        assert excinfo.value.status_code == 404
+        mock_seat_broadcaster.subscribe.return_value.close.assert_called_once()
+
+    async def test_subscribe_to_seats_feed_error(self, mock_db, mock_tournament_repo, mock_seat_broadcaster):
+        mock_seat_broadcaster.subscribe.side_effect = TournamentSeatFeedError()
+
+        with pytest.raises(HTTPException) as excinfo:
+            await subscribe_to_seats(mock_db, 1)
+        assert excinfo.value.status_code == 503
+        mock_tournament_repo.get_current_tournament.assert_not_called()
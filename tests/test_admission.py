@@ -0,0 +1,144 @@
+import asyncio
+
+import pytest
+from fastapi import Depends, FastAPI, HTTPException, Request
+from httpx import ASGITransport, AsyncClient
+
+from app import admission
+from app.admission import (
+    AdmittedStreamingResponse,
+    ConcurrencyLimiter,
+    TokenBuckets,
+    admission_control,
+)
+
+pytestmark = pytest.mark.asyncio
+
+
+class TestConcurrencyLimiter:
+    async def test_admits_up_to_the_limit_then_queues(self):
+        limiter = ConcurrencyLimiter(limit=2, max_queue=1, queue_timeout=5)
+
+        assert await limiter.acquire()
+        assert await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        assert limiter.waiting == 1
+        assert not await limiter.acquire()
+
+        limiter.release()
+        assert await waiter
+        assert limiter.active == 2
+        assert limiter.waiting == 0
+
+    async def test_waiting_past_the_timeout_is_refused(self):
+        limiter = ConcurrencyLimiter(limit=1, max_queue=10, queue_timeout=0.01)
+
+        assert await limiter.acquire()
+        assert not await limiter.acquire()
+        assert limiter.waiting == 0
+
+        limiter.release()
+        assert limiter.active == 0
+
+    async def test_cancelled_waiter_leaves_the_queue(self):
+        limiter = ConcurrencyLimiter(limit=1, max_queue=10, queue_timeout=5)
+        await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+        assert limiter.waiting == 0
+        limiter.release()
+        assert limiter.active == 0
+
+    async def test_zero_limit_disables_it(self):
+        limiter = ConcurrencyLimiter(limit=0, max_queue=0, queue_timeout=0)
+
+        assert all([await limiter.acquire() for _ in range(100)])
+
+
+class TestTokenBuckets:
+    async def test_burst_then_rate(self, monkeypatch):
+        now = [100.0]
+        monkeypatch.setattr(admission, "monotonic", lambda: now[0])
+        buckets = TokenBuckets(rate=2, burst=3)
+
+        assert [buckets.take("a") for _ in range(3)] == [0, 0, 0]
+        assert buckets.take("a") == pytest.approx(0.5)
+        assert buckets.take("b") == 0
+
+        now[0] += 0.5
+        assert buckets.take("a") == 0
+        assert buckets.take("a") == pytest.approx(0.5)
+
+    async def test_zero_rate_disables_it(self):
+        buckets = TokenBuckets(rate=0, burst=0)
+
+        assert all(buckets.take("a") == 0 for _ in range(100))
+
+
+async def test_dependency_sheds_with_retry_after():
+    limiter = ConcurrencyLimiter(limit=1, max_queue=0, queue_timeout=1)
+    buckets = TokenBuckets(rate=0.1, burst=1)
+    release = asyncio.Event()
+    app = FastAPI()
+
+    @app.post("/things", dependencies=[Depends(admission_control(limiter, buckets))])
+    async def create_thing():
+        await release.wait()
+        return {}
+
+    @app.get("/things", dependencies=[Depends(admission_control(limiter))])
+    async def get_things():
+        return []
+
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        first = asyncio.create_task(client.post("/things"))
+        while limiter.active == 0:
+            await asyncio.sleep(0.001)
+
+        busy = await client.get("/things")
+        limited = await client.post("/things")
+        release.set()
+        assert (await first).status_code == 200
+        assert (await client.get("/things")).status_code == 200
+
+    assert busy.status_code == 503
+    assert busy.headers["Retry-After"] == "1"
+    assert limited.status_code == 429
+    assert limited.headers["Retry-After"] == "10"
+    assert limiter.active == 0
+
+
+async def test_streamed_responses_keep_the_slot_until_sent():
+    limiter = ConcurrencyLimiter(limit=1, max_queue=0, queue_timeout=1)
+    active_while_streaming = []
+    app = FastAPI()
+
+    async def chunks():
+        for chunk in ("a", "b"):
+            active_while_streaming.append(limiter.active)
+            yield chunk
+
+    @app.get("/export", dependencies=[Depends(admission_control(limiter))])
+    async def export(request: Request, fail: bool = False):
+        if fail:
+            raise HTTPException(status_code=404, detail="Not found")
+        return AdmittedStreamingResponse(request, chunks())
+
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        response = await client.get("/export")
+        assert limiter.active == 0
+        assert (await client.get("/export", params={"fail": True})).status_code == 404
+        assert limiter.active == 0
+
+    assert response.text == "ab"
+    assert active_while_streaming == [1, 1]
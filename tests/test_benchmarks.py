@@ -0,0 +1,34 @@
+from benchmarks.run import ScenarioResult, compare, percentile
+
+
+def test_percentile_nearest_rank():
+    samples = [float(value) for value in range(1, 101)]
+    assert percentile(samples, 0.50) == 50.0
+    assert percentile(samples, 0.95) == 95.0
+    assert percentile(samples, 0.99) == 99.0
+    assert percentile([], 0.99) == 0.0
+
+
+def test_compare_flags_throughput_and_latency_regressions():
+    baseline = {
+        "get": {"throughput": 1000.0, "p95": 10.0},
+        "list": {"throughput": 500.0, "p95": 20.0},
+    }
+    results = {
+        "get": ScenarioResult(
+            requests=100, errors=0, throughput=950.0, p50=5.0, p95=10.5, p99=12.0
+        ),
+        "list": ScenarioResult(
+            requests=100, errors=0, throughput=400.0, p50=10.0, p95=30.0, p99=40.0
+        ),
+        "update": ScenarioResult(
+            requests=100, errors=0, throughput=1.0, p50=1.0, p95=1.0, p99=1.0
+        ),
+    }
+
+    regressions = compare(baseline, results, tolerance=0.1)
+
+    assert regressions == [
+        "list: throughput 500 -> 400 req/s",
+        "list: p95 20.0 -> 30.0 ms",
+    ]
@@ -0,0 +1,70 @@
+from unittest.mock import patch
+
+from app.cache import TTLCache
+
+
+def test_get_counts_hits_and_misses():
+    cache = TTLCache(maxsize=2, ttl=60)
+    assert cache.get(1) is None
+    cache.set(1, "one")
+    assert cache.get(1) == "one"
+    assert cache.stats() == {"size": 1, "maxsize": 2, "hits": 1, "misses": 1}
+
+
+def test_set_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set(1, "one")
+    cache.set(2, "two")
+    cache.get(1)
+    cache.set(3, "three")
+    assert cache.get(2) is None
+    assert cache.get(1) == "one"
+    assert cache.get(3) == "three"
+
+
+def test_get_drops_expired_entries():
+    cache = TTLCache(maxsize=2, ttl=5)
+    with patch("app.cache.monotonic", return_value=100.0):
+        cache.set(1, "one")
+    with patch("app.cache.monotonic", return_value=105.0):
+        assert cache.get(1) is None
+    assert cache.stats()["size"] == 0
+
+
+def test_invalidate_and_disabled_cache():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set(1, "one")
+    cache.invalidate(1, 2)
+    assert cache.get(1) is None
+
+    disabled = TTLCache(maxsize=0, ttl=60)
+    disabled.set(1, "one")
+    assert disabled.get(1) is None
+
+
+def test_set_drops_values_read_before_an_invalidation():
+    cache = TTLCache(maxsize=2, ttl=60)
+    generation = cache.generation(1)
+    cache.invalidate(1)
+    cache.set(1, "stale", generation)
+    assert cache.get(1) is None
+
+    cache.set(1, "fresh", cache.generation(1))
+    assert cache.get(1) == "fresh"
+
+
+def test_clear_changes_every_generation():
+    cache = TTLCache(maxsize=2, ttl=60)
+    generation = cache.generation(1)
+    cache.clear()
+    cache.set(1, "stale", generation)
+    assert cache.get(1) is None
+
+
+def test_invalidated_within():
+    cache = TTLCache(maxsize=2, ttl=60)
+    assert not cache.invalidated_within(1, 60)
+
+    cache.invalidate(1)
+    assert cache.invalidated_within(1, 60)
+    assert not cache.invalidated_within(1, 0)
@@ -0,0 +1,63 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+import app.db
+from app.config import ASYNC_DATABASE_TEST_URL
+from app.main import app as application
+
+pytestmark = pytest.mark.skipif(
+    not (ASYNC_DATABASE_TEST_URL or "").startswith("postgresql"),
+    reason="engine startup is checked against PostgreSQL",
+)
+
+
+@pytest.fixture
+def test_database(monkeypatch):
+    # The app may already have been started by another test in this process.
+    monkeypatch.setattr(app.db, "engine", None)
+    monkeypatch.setattr(app.db, "ASYNC_DATABASE_URL", ASYNC_DATABASE_TEST_URL)
+    monkeypatch.setattr("app.main.DB_POOL_PREWARM", 3)
+    yield
+    app.db.SessionLocal.configure(bind=None, replicas=None)
+
+
+def test_importing_the_app_does_not_create_an_engine():
+    code = (
+        "import sys, app.main, app.db; "
+        "print(app.db.engine is None, 'asyncpg' in sys.modules)"
+    )
+    completed = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=Path(__file__).resolve().parent.parent,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert completed.stdout.split() == ["True", "False"]
+
+
+@pytest.mark.asyncio
+async def test_lifespan_creates_and_prewarms_the_engine(test_database):
+    async with application.router.lifespan_context(application):
+        engine = app.db.engine
+        assert engine is not None
+        assert app.db.SessionLocal.kw["bind"] is engine
+        assert engine.pool.checkedin() == 3
+
+    assert app.db.engine is None
+    assert app.db.SessionLocal.kw["bind"] is None
+
+
+@pytest.mark.asyncio
+async def test_engine_is_created_on_first_request_without_lifespan(test_database):
+    async with AsyncClient(
+        transport=ASGITransport(app=application), base_url="http://test"
+    ) as client:
+        await client.get("/tournaments/0")
+
+    assert app.db.engine is not None
+    await app.db.dispose_engine()
@@ -0,0 +1,241 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import text, update
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.api.tournament import seat_events
+from app.cache import tournament_cache
+from app.config import ASYNC_DATABASE_TEST_URL
+from app.db import Base
+from app.events import SeatBroadcaster
+from app.exceptions.tournament import TournamentSeatFeedError
+from app.models import Tournament
+from app.repositories.player import PlayerRepo
+from app.repositories.tournament import TournamentRepo
+from app.schemas.player import PlayerInDBInput
+from app.schemas.tournament import TournamentInDBInput
+from app.services.tournament import subscribe_to_seats
+
+pytestmark = [
+    pytest.mark.asyncio,
+    pytest.mark.skipif(
+        not (ASYNC_DATABASE_TEST_URL or "").startswith("postgresql"),
+        reason="seat counts are published with PostgreSQL NOTIFY",
+    ),
+]
+
+UNREACHABLE_URL = "postgresql+asyncpg://postgres@127.0.0.1:1/app"
+
+
+@pytest_asyncio.fixture
+async def session_factory():
+    engine = create_async_engine(ASYNC_DATABASE_TEST_URL)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    tournament_cache.clear()
+    try:
+        yield async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+    finally:
+        tournament_cache.clear()
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+        await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def broadcaster(session_factory):
+    broadcaster = SeatBroadcaster(ASYNC_DATABASE_TEST_URL)
+    try:
+        yield broadcaster
+    finally:
+        await broadcaster.close()
+
+
+@pytest_asyncio.fixture
+async def tournament_ids(session_factory):
+    ids = []
+    async with session_factory() as db:
+        for i in range(2):
+            tournament = await TournamentRepo(db).create_tournament(
+                TournamentInDBInput(
+                    name=f"Lobby Tournament {i}", max_players=10, start_at=datetime.now()
+                )
+            )
+            ids.append(tournament.id)
+    return ids
+
+
+async def register(session_factory, tournament_id: int, number: int) -> None:
+    async with session_factory() as db:
+        await PlayerRepo(db).create_player(
+            PlayerInDBInput(
+                name=f"Player {number}",
+                email=f"player{number}@example.com",
+                tournament_id=tournament_id,
+            )
+        )
+
+
+async def test_committed_registrations_reach_the_tournament_subscribers(
+    session_factory, broadcaster, tournament_ids
+):
+    watched, other = tournament_ids
+    subscriptions = [await broadcaster.subscribe(watched) for _ in range(3)]
+    unrelated = await broadcaster.subscribe(other)
+
+    await register(session_factory, watched, 1)
+
+    for subscription in subscriptions:
+        seats = await asyncio.wait_for(subscription.get(), timeout=5)
+        assert seats == {
+            "id": watched,
+            "registered_players": 1,
+            "max_players": 10,
+            "version": 2,
+        }
+    assert unrelated._latest.empty()
+
+
+async def test_rolled_back_changes_are_not_published(
+    session_factory, broadcaster, tournament_ids
+):
+    subscription = await broadcaster.subscribe(tournament_ids[0])
+
+    async with session_factory() as db:
+        await db.execute(
+            update(Tournament)
+            .where(Tournament.id == tournament_ids[0])
+            .values(max_players=20)
+        )
+        await db.rollback()
+    await register(session_factory, tournament_ids[0], 1)
+
+    seats = await asyncio.wait_for(subscription.get(), timeout=5)
+    assert seats["max_players"] == 10
+    assert seats["registered_players"] == 1
+
+
+async def test_slow_subscribers_only_keep_the_latest_counts(
+    session_factory, broadcaster, tournament_ids
+):
+    subscription = await broadcaster.subscribe(tournament_ids[0])
+    # A second subscription read right away tells when both were notified.
+    probe = await broadcaster.subscribe(tournament_ids[0])
+
+    for number in range(3):
+        await register(session_factory, tournament_ids[0], number)
+        await asyncio.wait_for(probe.get(), timeout=5)
+
+    seats = await subscription.get()
+    assert seats["registered_players"] == 3
+    assert subscription._latest.empty()
+
+
+async def test_notifications_drop_cached_tournaments(
+    session_factory, broadcaster, tournament_ids
+):
+    subscription = await broadcaster.subscribe(tournament_ids[0])
+    async with session_factory() as db:
+        await TournamentRepo(db).get_tournament(tournament_ids[0])
+    assert tournament_cache.get(tournament_ids[0]) is not None
+
+    async with session_factory() as db:
+        await db.execute(
+            update(Tournament)
+            .where(Tournament.id == tournament_ids[0])
+            .values(max_players=20)
+        )
+        await db.commit()
+    await asyncio.wait_for(subscription.get(), timeout=5)
+
+    assert tournament_cache.get(tournament_ids[0]) is None
+
+
+async def test_subscription_reads_current_counts_past_the_cache(
+    session_factory, broadcaster, tournament_ids, monkeypatch
+):
+    monkeypatch.setattr("app.services.tournament.seat_broadcaster", broadcaster)
+    async with session_factory() as db:
+        await TournamentRepo(db).get_tournament(tournament_ids[0])
+    # Changed by another worker before this one listens: the cache is not told.
+    async with session_factory() as db:
+        await db.execute(
+            update(Tournament)
+            .where(Tournament.id == tournament_ids[0])
+            .values(max_players=20)
+        )
+        await db.commit()
+    assert tournament_cache.get(tournament_ids[0]).max_players == 10
+
+    async with session_factory() as db:
+        tournament, subscription = await subscribe_to_seats(db, tournament_ids[0])
+    subscription.close()
+
+    assert tournament.max_players == 20
+
+
+async def test_stream_sends_current_counts_then_changes(
+    session_factory, broadcaster, tournament_ids
+):
+    subscription = await broadcaster.subscribe(tournament_ids[0])
+    async with session_factory() as db:
+        tournament = await TournamentRepo(db).get_tournament(tournament_ids[0])
+    events = seat_events(tournament, subscription)
+
+    first = await anext(events)
+    # Counts not newer than the ones sent are skipped.
+    subscription.offer(
+        {"id": tournament.id, "registered_players": 0, "max_players": 10, "version": 1}
+    )
+    await register(session_factory, tournament_ids[0], 1)
+    second = await asyncio.wait_for(anext(events), timeout=5)
+    await events.aclose()
+
+    assert first == (
+        "retry: 1000\n"
+        "event: seats\n"
+        f'data: {{"id": {tournament.id}, "registered_players": 0, "max_players": 10}}\n\n'
+    )
+    assert second == (
+        "event: seats\n"
+        f'data: {{"id": {tournament.id}, "registered_players": 1, "max_players": 10}}\n\n'
+    )
+    assert broadcaster.subscribers == 0
+
+
+async def test_lost_connection_ends_the_streams(
+    session_factory, broadcaster, tournament_ids
+):
+    subscription = await broadcaster.subscribe(tournament_ids[0])
+    async with session_factory() as db:
+        tournament = await TournamentRepo(db).get_tournament(tournament_ids[0])
+    events = seat_events(tournament, subscription)
+    await anext(events)
+
+    async with session_factory() as db:
+        await db.execute(
+            text(
+                "SELECT pg_terminate_backend(pid) FROM pg_stat_activity "
+                "WHERE query LIKE 'LISTEN%' AND pid <> pg_backend_pid()"
+            )
+        )
+
+    with pytest.raises(StopAsyncIteration):
+        await asyncio.wait_for(anext(events), timeout=5)
+    assert broadcaster.subscribers == 0
+
+    # The next subscriber opens a new connection.
+    subscription = await broadcaster.subscribe(tournament_ids[0])
+    await register(session_factory, tournament_ids[0], 1)
+    assert (await asyncio.wait_for(subscription.get(), timeout=5)) is not None
+
+
+async def test_unreachable_database_fails_the_subscription():
+    broadcaster = SeatBroadcaster(UNREACHABLE_URL)
+
+    with pytest.raises(TournamentSeatFeedError):
+        await broadcaster.subscribe(1)
+    assert broadcaster.subscribers == 0
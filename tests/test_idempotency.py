@@ -0,0 +1,205 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI, HTTPException, Response
+from httpx import ASGITransport, AsyncClient
+from pydantic import BaseModel
+
+from app.cache import TTLCache
+from app.idempotency import IdempotencyMiddleware
+
+pytestmark = pytest.mark.asyncio
+
+
+class Thing(BaseModel):
+    name: str
+
+
+class ThingsApp:
+    """App creating numbered things; counts how often the route really ran."""
+
+    def __init__(self):
+        self.calls = 0
+        self.release = asyncio.Event()
+        self.release.set()
+        self.busy = 0
+        self.cache = TTLCache(maxsize=100, ttl=60)
+        self.app = FastAPI()
+        self.app.add_middleware(
+            IdempotencyMiddleware, paths={"/things"}, cache=self.cache
+        )
+
+        @self.app.post("/things", status_code=201)
+        async def create_thing(thing: Thing, response: Response):
+            self.calls += 1
+            response.set_cookie("session", f"session-{self.calls}")
+            await self.release.wait()
+            if self.busy:
+                self.busy -= 1
+                raise HTTPException(
+                    status_code=429,
+                    detail="Too many requests",
+                    headers={"Retry-After": "1"},
+                )
+            if thing.name == "broken":
+                raise HTTPException(status_code=503, detail="Try again")
+            if thing.name == "taken":
+                raise HTTPException(status_code=409, detail="Thing already exists")
+            return {"id": self.calls, "name": thing.name}
+
+        @self.app.post("/other", status_code=201)
+        async def create_other(thing: Thing):
+            self.calls += 1
+            return {"id": self.calls}
+
+    def client(self) -> AsyncClient:
+        return AsyncClient(transport=ASGITransport(app=self.app), base_url="http://test")
+
+
+@pytest.fixture
+def things():
+    return ThingsApp()
+
+
+async def test_retry_replays_the_first_response(things):
+    async with things.client() as client:
+        first = await client.post(
+            "/things", json={"name": "a"}, headers={"Idempotency-Key": "k1"}
+        )
+        retry = await client.post(
+            "/things", json={"name": "a"}, headers={"Idempotency-Key": "k1"}
+        )
+
+    assert things.calls == 1
+    assert retry.status_code == first.status_code == 201
+    assert retry.json() == first.json() == {"id": 1, "name": "a"}
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert "idempotent-replayed" not in first.headers
+
+
+async def test_client_errors_are_replayed(things):
+    async with things.client() as client:
+        for _ in range(2):
+            response = await client.post(
+                "/things", json={"name": "taken"}, headers={"Idempotency-Key": "k1"}
+            )
+            assert response.status_code == 409
+
+    assert things.calls == 1
+
+
+async def test_server_errors_are_not_stored(things):
+    async with things.client() as client:
+        for _ in range(2):
+            response = await client.post(
+                "/things", json={"name": "broken"}, headers={"Idempotency-Key": "k1"}
+            )
+            assert response.status_code == 503
+
+    assert things.calls == 2
+
+
+async def test_rate_limited_requests_are_not_stored(things):
+    things.busy = 1
+    async with things.client() as client:
+        limited = await client.post(
+            "/things", json={"name": "a"}, headers={"Idempotency-Key": "k1"}
+        )
+        retry = await client.post(
+            "/things", json={"name": "a"}, headers={"Idempotency-Key": "k1"}
+        )
+
+    assert limited.status_code == 429
+    assert retry.status_code == 201
+    assert retry.json() == {"id": 2, "name": "a"}
+    assert "idempotent-replayed" not in retry.headers
+    assert things.calls == 2
+
+
+async def test_key_reused_with_another_body(things):
+    async with things.client() as client:
+        await client.post("/things", json={"name": "a"}, headers={"Idempotency-Key": "k1"})
+        response = await client.post(
+            "/things", json={"name": "b"}, headers={"Idempotency-Key": "k1"}
+        )
+
+    assert response.status_code == 422
+    assert things.calls == 1
+
+
+async def test_retry_while_the_first_request_runs(things):
+    things.release.clear()
+    async with things.client() as client:
+        first = asyncio.create_task(
+            client.post("/things", json={"name": "a"}, headers={"Idempotency-Key": "k1"})
+        )
+        while things.calls == 0:
+            await asyncio.sleep(0.001)
+        retry = await client.post(
+            "/things", json={"name": "a"}, headers={"Idempotency-Key": "k1"}
+        )
+        things.release.set()
+        assert (await first).status_code == 201
+
+    assert retry.status_code == 409
+    assert things.calls == 1
+
+
+async def test_requests_without_a_key_or_on_other_routes_always_run(things):
+    async with things.client() as client:
+        for _ in range(2):
+            await client.post("/things", json={"name": "a"})
+            await client.post("/other", json={"name": "a"}, headers={"Idempotency-Key": "k1"})
+
+    assert things.calls == 4
+
+
+async def test_keys_are_distinct(things):
+    async with things.client() as client:
+        await client.post("/things", json={"name": "a"}, headers={"Idempotency-Key": "k1"})
+        response = await client.post(
+            "/things", json={"name": "a"}, headers={"Idempotency-Key": "k2"}
+        )
+
+    assert response.json() == {"id": 2, "name": "a"}
+
+
+async def test_keys_are_scoped_to_the_client(things):
+    async with things.client() as client:
+        first = await client.post(
+            "/things",
+            json={"name": "a"},
+            headers={"Idempotency-Key": "k1", "X-Client-Id": "alice"},
+        )
+        other = await client.post(
+            "/things",
+            json={"name": "b"},
+            headers={"Idempotency-Key": "k1", "X-Client-Id": "bob"},
+        )
+
+    assert first.status_code == other.status_code == 201
+    assert other.json() == {"id": 2, "name": "b"}
+
+
+async def test_cookies_are_not_replayed(things):
+    async with things.client() as client:
+        first = await client.post(
+            "/things", json={"name": "a"}, headers={"Idempotency-Key": "k1"}
+        )
+        retry = await client.post(
+            "/things", json={"name": "a"}, headers={"Idempotency-Key": "k1"}
+        )
+
+    assert first.headers["set-cookie"].startswith("session=session-1")
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert "set-cookie" not in retry.headers
+
+
+async def test_overlong_key_is_rejected(things):
+    async with things.client() as client:
+        response = await client.post(
+            "/things", json={"name": "a"}, headers={"Idempotency-Key": "k" * 256}
+        )
+
+    assert response.status_code == 400
+    assert things.calls == 0
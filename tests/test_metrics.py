@@ -0,0 +1,154 @@
+import pytest
+import pytest_asyncio
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from prometheus_client import REGISTRY
+from sqlalchemy import event
+
+import app.db
+from app.cache import tournament_cache
+from app.config import ASYNC_DATABASE_TEST_URL
+from app.main import app as application
+from app.metrics import MetricsMiddleware, request_stats
+
+pytestmark = pytest.mark.asyncio
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+async def test_middleware_records_route_latency_and_queries():
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/things/{thing_id}")
+    async def get_thing(thing_id: int):
+        stats = request_stats.get()
+        stats.queries += 2
+        stats.db_time += 0.5
+        return {"id": thing_id}
+
+    route = "/things/{thing_id}"
+    requests_before = sample(
+        "http_request_duration_seconds_count", method="GET", route=route, status="200"
+    )
+    queries_before = sample("db_queries_per_request_sum", route=route)
+    db_time_before = sample("db_time_per_request_seconds_sum", route=route)
+
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        assert (await client.get("/things/1")).status_code == 200
+        assert (await client.get("/things/2")).status_code == 200
+        assert (await client.get("/missing")).status_code == 404
+
+    assert sample(
+        "http_request_duration_seconds_count", method="GET", route=route, status="200"
+    ) == requests_before + 2
+    assert sample("db_queries_per_request_sum", route=route) == queries_before + 4
+    assert sample("db_time_per_request_seconds_sum", route=route) == db_time_before + 1.0
+    assert sample(
+        "http_request_duration_seconds_count",
+        method="GET",
+        route="unmatched",
+        status="404",
+    ) >= 1
+    assert request_stats.get() is None
+
+
+@pytest_asyncio.fixture
+async def app_engine(monkeypatch):
+    # The engine of the app itself, with its timed pool and statement listeners.
+    monkeypatch.setattr(app.db, "engine", None)
+    monkeypatch.setattr(app.db, "ASYNC_DATABASE_URL", ASYNC_DATABASE_TEST_URL)
+    engine = app.db.init_engine()
+    async with engine.begin() as conn:
+        await conn.run_sync(app.db.Base.metadata.create_all)
+    tournament_cache.clear()
+    try:
+        yield engine
+    finally:
+        tournament_cache.clear()
+        async with engine.begin() as conn:
+            await conn.run_sync(app.db.Base.metadata.drop_all)
+        await app.db.dispose_engine()
+
+
+@pytest.mark.skipif(
+    not (ASYNC_DATABASE_TEST_URL or "").startswith("postgresql"),
+    reason="statements are counted against PostgreSQL",
+)
+async def test_database_metrics_match_the_statements_run(app_engine):
+    statements = []
+    checkouts = []
+    event.listen(
+        app_engine.sync_engine,
+        "before_cursor_execute",
+        lambda *args: statements.append(args[2]),
+    )
+    event.listen(
+        app_engine.sync_engine.pool, "checkout", lambda *args: checkouts.append(1)
+    )
+
+    async def measure(client, method, url, route, status, **kwargs):
+        statements.clear()
+        checkouts.clear()
+        before = {
+            "queries": sample("db_queries_per_request_sum", route=route),
+            "requests": sample("db_queries_per_request_count", route=route),
+            "db_time": sample("db_time_per_request_seconds_sum", route=route),
+            "latency": sample(
+                "http_request_duration_seconds_sum",
+                method=method,
+                route=route,
+                status=str(status),
+            ),
+            "pool_waits": sample("db_pool_checkout_wait_seconds_count"),
+        }
+        response = await client.request(method, url, **kwargs)
+        assert response.status_code == status
+        assert statements and checkouts
+        assert sample("db_queries_per_request_sum", route=route) == (
+            before["queries"] + len(statements)
+        )
+        requests = sample("db_queries_per_request_count", route=route)
+        assert requests == before["requests"] + 1
+        db_time = (
+            sample("db_time_per_request_seconds_sum", route=route) - before["db_time"]
+        )
+        latency = sample(
+            "http_request_duration_seconds_sum",
+            method=method,
+            route=route,
+            status=str(status),
+        ) - before["latency"]
+        assert 0 < db_time <= latency
+        assert sample("db_pool_checkout_wait_seconds_count") == (
+            before["pool_waits"] + len(checkouts)
+        )
+        return response
+
+    async with AsyncClient(
+        transport=ASGITransport(app=application), base_url="http://test"
+    ) as client:
+        created = await measure(
+            client,
+            "POST",
+            "/tournaments",
+            "/tournaments",
+            201,
+            json={
+                "name": "Metered Tournament",
+                "max_players": 10,
+                "start_at": "2030-01-01T10:00:00",
+            },
+        )
+        tournament_cache.clear()
+        await measure(
+            client,
+            "GET",
+            f"/tournaments/{created.json()['id']}",
+            "/tournaments/{tournament_id}",
+            200,
+        )
@@ -0,0 +1,53 @@
+import logging
+
+import pytest
+from fastapi import Depends, FastAPI
+from httpx import ASGITransport, AsyncClient
+
+from app.exceptions.query_budget import QueryBudgetExceededError
+from app.metrics import MetricsMiddleware, request_stats
+from app.query_budget import query_budget
+
+pytestmark = pytest.mark.asyncio
+
+STATEMENT = "SELECT players.id FROM players WHERE players.tournament_id = $1"
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/players/{count}", dependencies=[Depends(query_budget(2))])
+    async def run_queries(count: int):
+        stats = request_stats.get()
+        for _ in range(count):
+            stats.queries += 1
+            stats.statements[STATEMENT] += 1
+        return {"queries": count}
+
+    return AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+
+
+async def test_within_budget(client):
+    async with client:
+        assert (await client.get("/players/2")).status_code == 200
+
+
+async def test_over_budget_raises(client, monkeypatch):
+    monkeypatch.setattr("app.query_budget.QUERY_BUDGET_MODE", "raise")
+    async with client:
+        with pytest.raises(QueryBudgetExceededError) as excinfo:
+            await client.get("/players/5")
+    assert excinfo.value.route == "/players/{count}"
+    assert excinfo.value.queries == 5
+    assert excinfo.value.repeated == [(STATEMENT, 5)]
+    assert f"5x {STATEMENT}" in excinfo.value.message
+
+
+async def test_over_budget_warns(client, monkeypatch, caplog):
+    monkeypatch.setattr("app.query_budget.QUERY_BUDGET_MODE", "warn")
+    async with client:
+        with caplog.at_level(logging.WARNING, logger="app.query_budget"):
+            assert (await client.get("/players/3")).status_code == 200
+    assert "ran 3 queries, over its budget of 2" in caplog.text
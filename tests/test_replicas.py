@@ -0,0 +1,257 @@
+from collections import Counter
+from datetime import datetime
+from itertools import count
+
+import pytest
+import pytest_asyncio
+from fastapi import Depends, FastAPI
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.cache import tournament_cache
+from app.config import ASYNC_DATABASE_TEST_URL
+from app import db as app_db
+from app.db import (
+    CLIENT_COOKIE,
+    CLIENT_HEADER,
+    Base,
+    ClientCookieMiddleware,
+    ReplicaSet,
+    RoutingSession,
+    get_db,
+    mark_written,
+)
+from app.repositories.player import PlayerRepo
+from app.repositories.tournament import TournamentRepo
+from app.schemas.tournament import TournamentInDBInput
+
+pytestmark = [
+    pytest.mark.asyncio,
+    pytest.mark.skipif(
+        not (ASYNC_DATABASE_TEST_URL or "").startswith("postgresql"),
+        reason="replica routing is checked against PostgreSQL",
+    ),
+]
+
+# Nothing listens there, so connecting is refused right away.
+UNREACHABLE_URL = "postgresql+asyncpg://postgres@127.0.0.1:1/app"
+
+
+class Cluster:
+    """A primary and replicas; the "replicas" are other engines on the test database."""
+
+    def __init__(self, replica_urls: list[str]):
+        self.primary = create_async_engine(ASYNC_DATABASE_TEST_URL)
+        self.replica_engines = [create_async_engine(url) for url in replica_urls]
+        self.replicas = ReplicaSet(
+            self.replica_engines, sticky_seconds=60, retry_seconds=60
+        )
+        self.SessionLocal = async_sessionmaker(
+            bind=self.primary,
+            autoflush=False,
+            expire_on_commit=False,
+            sync_session_class=RoutingSession,
+            replicas=self.replicas,
+        )
+        self.statements: Counter[str] = Counter()
+        for name, engine in [("primary", self.primary)] + [
+            (f"replica{i}", engine) for i, engine in enumerate(self.replica_engines)
+        ]:
+            event.listen(engine.sync_engine, "before_cursor_execute", self._count(name))
+
+    def _count(self, name: str):
+        def count(conn, cursor, statement, parameters, context, executemany):
+            self.statements[name] += 1
+
+        return count
+
+    async def dispose(self) -> None:
+        for engine in [self.primary, *self.replica_engines]:
+            await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def schema():
+    engine = create_async_engine(ASYNC_DATABASE_TEST_URL)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    tournament_cache.clear()
+    try:
+        yield
+    finally:
+        tournament_cache.clear()
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+        await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def cluster(schema):
+    cluster = Cluster([ASYNC_DATABASE_TEST_URL, ASYNC_DATABASE_TEST_URL])
+    try:
+        yield cluster
+    finally:
+        await cluster.dispose()
+
+
+@pytest_asyncio.fixture
+async def tournament_id(cluster):
+    async with cluster.SessionLocal() as db:
+        tournament = await TournamentRepo(db).create_tournament(
+            TournamentInDBInput(
+                name="Replicated Tournament", max_players=10, start_at=datetime.now()
+            )
+        )
+    cluster.replicas.recent_writers.clear()
+    cluster.statements.clear()
+    tournament_cache.clear()
+    return tournament.id
+
+
+async def test_reads_are_spread_over_replicas(cluster, tournament_id):
+    for _ in range(4):
+        async with cluster.SessionLocal(client="reader") as db:
+            await TournamentRepo(db).get_tournaments()
+            await PlayerRepo(db).get_players_count_by_tournament(tournament_id)
+
+    assert cluster.statements == {"replica0": 4, "replica1": 4}
+
+
+async def test_writes_go_to_the_primary(cluster, tournament_id):
+    async with cluster.SessionLocal(client="writer") as db:
+        await TournamentRepo(db).update_tournament(
+            tournament_id,
+            TournamentInDBInput(
+                name="Renamed Tournament", max_players=20, start_at=datetime.now()
+            ),
+        )
+
+    assert set(cluster.statements) == {"primary"}
+
+
+async def test_reads_after_a_write_stay_on_the_primary(cluster, tournament_id):
+    async with cluster.SessionLocal(client="writer") as db:
+        await TournamentRepo(db).create_tournament(
+            TournamentInDBInput(
+                name="Another Tournament", max_players=10, start_at=datetime.now()
+            )
+        )
+        await TournamentRepo(db).get_tournaments()
+    async with cluster.SessionLocal(client="writer") as db:
+        await TournamentRepo(db).get_tournaments()
+    async with cluster.SessionLocal(client="other") as db:
+        await TournamentRepo(db).get_tournaments()
+
+    assert cluster.statements["primary"] == cluster.statements.total() - 1
+    assert cluster.statements["replica0"] == 1
+
+
+async def test_writes_through_another_session_are_sticky(cluster, tournament_id):
+    async with cluster.SessionLocal(client="writer") as db:
+        mark_written(db)
+        await TournamentRepo(db).get_tournaments()
+
+    assert set(cluster.statements) == {"primary"}
+
+
+async def test_stickiness_follows_the_client_cookie_not_the_address(
+    cluster, tournament_id, monkeypatch
+):
+    monkeypatch.setattr(app_db, "SessionLocal", cluster.SessionLocal)
+    monkeypatch.setattr(app_db, "init_engine", lambda: None)
+    app = FastAPI()
+    app.add_middleware(ClientCookieMiddleware)
+    numbers = count()
+
+    @app.post("/tournaments")
+    async def create(db=Depends(get_db)):
+        await TournamentRepo(db).create_tournament(
+            TournamentInDBInput(
+                name=f"Sticky Tournament {next(numbers)}",
+                max_players=10,
+                start_at=datetime.now(),
+            )
+        )
+
+    @app.get("/tournaments")
+    async def read(db=Depends(get_db)):
+        await TournamentRepo(db).get_tournaments()
+
+    # Both clients come from the same address.
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as writer:
+        async with AsyncClient(transport=transport, base_url="http://test") as other:
+            read_only = await other.get("/tournaments")
+            written = await writer.post("/tournaments")
+            cluster.statements.clear()
+            await writer.get("/tournaments")
+            assert set(cluster.statements) == {"primary"}
+
+            cluster.statements.clear()
+            await other.get("/tournaments")
+            assert "primary" not in cluster.statements
+
+    assert CLIENT_COOKIE not in read_only.cookies
+    assert written.cookies[CLIENT_COOKIE]
+
+    # Clients not keeping cookies send their own ID instead.
+    headers = {CLIENT_HEADER: "api-client-1"}
+    async with AsyncClient(transport=transport, base_url="http://test") as api:
+        written = await api.post("/tournaments", headers=headers)
+        cluster.statements.clear()
+        await api.get("/tournaments", headers=headers)
+        assert set(cluster.statements) == {"primary"}
+    assert CLIENT_COOKIE not in written.cookies
+
+
+async def test_replica_reads_are_cached_once_replicas_caught_up(
+    cluster, tournament_id, monkeypatch
+):
+    # The fixture's cache clear counts as a write the replicas may lag behind.
+    async with cluster.SessionLocal(client="reader") as db:
+        await TournamentRepo(db).get_tournament(tournament_id)
+        await TournamentRepo(db).get_capacities([tournament_id])
+    assert tournament_cache.get(tournament_id) is None
+
+    async with cluster.SessionLocal(client="writer") as db:
+        mark_written(db)
+        await TournamentRepo(db).get_tournament(tournament_id)
+    assert tournament_cache.get(tournament_id) is not None
+    assert cluster.statements == {"replica0": 1, "replica1": 1, "primary": 1}
+
+    monkeypatch.setattr(
+        "app.repositories.tournament.DB_REPLICA_STICKY_SECONDS", 0
+    )
+    tournament_cache.clear()
+    cluster.statements.clear()
+    async with cluster.SessionLocal(client="reader") as db:
+        await TournamentRepo(db).get_tournament(tournament_id)
+    assert tournament_cache.get(tournament_id) is not None
+    assert set(cluster.statements) == {"replica0"}
+
+
+async def test_unreachable_replica_falls_back_to_the_primary(schema):
+    cluster = Cluster([UNREACHABLE_URL])
+    try:
+        for _ in range(2):
+            async with cluster.SessionLocal(client="reader") as db:
+                page = await TournamentRepo(db).get_tournaments()
+            assert page.items == []
+
+        assert cluster.replicas.is_down(cluster.replicas.engines[0])
+        assert cluster.statements == {"primary": 2}
+    finally:
+        await cluster.dispose()
+
+
+async def test_sessions_without_replicas_use_the_primary(schema):
+    cluster = Cluster([])
+    cluster.SessionLocal.configure(replicas=None)
+    try:
+        async with cluster.SessionLocal() as db:
+            await TournamentRepo(db).get_tournaments()
+
+        assert cluster.statements == {"primary": 1}
+    finally:
+        await cluster.dispose()